@@ -26,6 +26,8 @@ B
 Examples
   001 - Get Baseline Products list
   002 - Get Offline Products List
+  003 - Get Products Catalogue, page by page
+  004 - Get New Products List, polled for latencies
   011 - Get Product Detail
   111 - Get Baseline Orders List
   131 - Create Order
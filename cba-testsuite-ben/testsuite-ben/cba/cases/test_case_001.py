@@ -4,6 +4,7 @@ from typing import List
 import requests
 from yasube.cases.base import BaseListTestCase
 from yasube.shared.metrics import Metric, MetricName, MetricUom
+from yasube.utils.json import response_json
 
 DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
 
@@ -16,7 +17,7 @@ class TestCase001(BaseListTestCase):
 
     def append_extra_response_metrics(self, response: requests.Response, metrics: List[Metric]):
         if response is not None and response.status_code == 200:
-            products = response.json()["value"]
+            products = response_json(response)["value"]
             for product in products:
                 try:
                     eviction_date = datetime.datetime.strptime(product['EvictionDate'], DATETIME_FORMAT)
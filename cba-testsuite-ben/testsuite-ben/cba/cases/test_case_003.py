@@ -0,0 +1,8 @@
+from yasube.cases.base import BaseCatalogueTestCase
+
+
+class TestCase003(BaseCatalogueTestCase):
+    class Meta:
+        key = "TestCase003"
+        name = "GET Products Catalogue"
+        resource_path = "Products"
@@ -0,0 +1,8 @@
+from yasube.cases.base import BaseLatencyTestCase
+
+
+class TestCase004(BaseLatencyTestCase):
+    class Meta:
+        key = "TestCase004"
+        name = "GET New Products List"
+        resource_path = "Products"
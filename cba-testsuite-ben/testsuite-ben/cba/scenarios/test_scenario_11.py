@@ -0,0 +1,8 @@
+from yasube.scenarios.base import BaseTestCatalogueScenario
+
+from cba.cases.test_case_003 import TestCase003
+
+
+class TestScenario11(BaseTestCatalogueScenario):
+
+    list_test_case_class = TestCase003
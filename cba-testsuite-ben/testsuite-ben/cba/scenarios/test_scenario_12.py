@@ -0,0 +1,8 @@
+from yasube.scenarios.base import BaseTestLatencyScenario
+
+from cba.cases.test_case_004 import TestCase004
+
+
+class TestScenario12(BaseTestLatencyScenario):
+
+    list_test_case_class = TestCase004
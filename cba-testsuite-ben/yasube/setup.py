@@ -31,7 +31,7 @@ setup(
     ],
     entry_points={
         'console_scripts': [
-            'yasube=yasube.bin.main:app',
+            'yasube=yasube.bin.main:cli',
         ]
     },
     install_requires=[
@@ -42,8 +42,14 @@ setup(
         'typer==0.4.1',
         'Cerberus==1.3.4',
         'geopandas',
+        'numpy',
         'typing_extensions',
     ],
+    extras_require={
+        'async': ['aiohttp'],
+        'fastjson': ['orjson'],
+        'parquet': ['pyarrow'],
+    },
     tests_require=[
         'tox',
     ]
@@ -0,0 +1,132 @@
+import json
+import math
+
+import numpy as np
+import pytest
+
+from yasube.shared.comparison import (
+    STATISTICS,
+    absolute_delta,
+    bootstrap_interval,
+    compare_results,
+    load_results,
+    mann_whitney,
+    parse_thresholds,
+    relative_delta,
+)
+
+
+def interval(baseline, candidate, statistic="median", delta=relative_delta, resamples=2000, seed=0):
+    return bootstrap_interval(
+        np.asarray(baseline, dtype=float),
+        np.asarray(candidate, dtype=float),
+        STATISTICS[statistic],
+        delta,
+        resamples,
+        0.95,
+        np.random.default_rng(seed),
+    )
+
+
+def test_bootstrap_of_constant_samples():
+    assert interval([10] * 50, [12] * 50) == (pytest.approx(20), pytest.approx(20))
+    assert interval([10] * 50, [12] * 50, delta=absolute_delta) == (pytest.approx(2), pytest.approx(2))
+
+
+def test_bootstrap_interval_holds_the_shift():
+    rng = np.random.default_rng(1)
+    baseline = rng.lognormal(3, 0.3, 500)
+    low, high = interval(baseline, baseline * 1.5, statistic="mean")
+    assert low < 50 < high
+    assert high - low < 20
+
+
+def test_bootstrap_interval_holds_no_change():
+    rng = np.random.default_rng(2)
+    low, high = interval(rng.normal(100, 10, 300), rng.normal(100, 10, 300))
+    assert low < 0 < high
+
+
+def test_bootstrap_is_reproducible_with_a_seed():
+    rng = np.random.default_rng(3)
+    baseline, candidate = rng.normal(100, 10, 100), rng.normal(105, 10, 100)
+    assert interval(baseline, candidate, seed=7) == interval(baseline, candidate, seed=7)
+
+
+def test_bootstrap_in_several_chunks(monkeypatch):
+    # Resamples are drawn in chunks bounding the memory: the interval does not depend on them
+    rng = np.random.default_rng(4)
+    baseline, candidate = rng.normal(100, 10, 100), rng.normal(110, 10, 100)
+    expected = interval(baseline, candidate, resamples=500)
+    monkeypatch.setattr("yasube.shared.comparison.BOOTSTRAP_CHUNK", 1000)
+    low, high = interval(baseline, candidate, resamples=500)
+    assert low == pytest.approx(expected[0], abs=3)
+    assert high == pytest.approx(expected[1], abs=3)
+
+
+def test_bootstrap_of_a_zero_baseline():
+    assert all(math.isnan(bound) for bound in interval([0] * 10, [0] * 10))
+
+
+def test_mann_whitney_of_identical_samples():
+    values = np.arange(30, dtype=float)
+    assert mann_whitney(values, values) == 1.0
+    assert mann_whitney(np.full(30, 5.0), np.full(30, 5.0)) == 1.0
+
+
+def test_mann_whitney_of_separated_samples():
+    # U is 0: the p-value is that of the normal approximation with continuity correction
+    n = 20
+    p_value = mann_whitney(np.arange(n, dtype=float), np.arange(n, 2 * n, dtype=float))
+    z = (n * n / 2 - 0.5) / math.sqrt(n * n * (2 * n + 1) / 12)
+    assert p_value == pytest.approx(math.erfc(z / math.sqrt(2)))
+    assert p_value < 1e-5
+
+
+def test_mann_whitney_is_symmetric():
+    rng = np.random.default_rng(5)
+    baseline, candidate = rng.normal(100, 10, 40), rng.normal(106, 10, 60)
+    assert mann_whitney(baseline, candidate) == pytest.approx(mann_whitney(candidate, baseline))
+
+
+def test_mann_whitney_with_ties():
+    # Reference value of scipy.stats.mannwhitneyu(..., method="asymptotic")
+    baseline = np.array([1, 2, 2, 3, 3, 3, 4, 4, 5, 6], dtype=float)
+    candidate = np.array([3, 4, 4, 5, 5, 6, 6, 7, 7, 8], dtype=float)
+    assert mann_whitney(baseline, candidate) == pytest.approx(0.0093320, rel=1e-5)
+
+
+def test_mann_whitney_tells_a_shift_from_noise():
+    rng = np.random.default_rng(6)
+    baseline = rng.lognormal(3, 0.5, 200)
+    assert mann_whitney(baseline, rng.lognormal(3, 0.5, 200)) > 0.01
+    assert mann_whitney(baseline, rng.lognormal(3.3, 0.5, 200)) < 0.001
+
+
+def test_parse_thresholds():
+    assert parse_thresholds(["5", "errorRate=1"], 10.0) == (5.0, {"errorRate": 1.0})
+    assert parse_thresholds([], 10.0) == (10.0, {})
+    with pytest.raises(ValueError):
+        parse_thresholds(["fast"], 10.0)
+
+
+def write_results(path, throughput, avg_response_time):
+    metrics = [
+        {"name": "avgResponseTime", "uom": "ms", "value": avg_response_time},
+        # The throughput is written as a string
+        {"name": "throughput", "uom": "bytes/s", "value": f"{throughput}"},
+        {"name": "p99ResponseTime", "uom": "ms", "value": -1},
+        {"name": "exception", "uom": "", "value": True},
+    ]
+    path.write_text(json.dumps({"testResults": [{"testName": "Download", "scenario": "TS03", "metrics": metrics}]}))
+    return str(path)
+
+
+def test_results_files_compare_the_throughput(tmp_path):
+    baseline = load_results(write_results(tmp_path / "baseline.json", 1000.5, 10))
+    candidate = load_results(write_results(tmp_path / "candidate.json", 500.25, 10))
+    assert sorted(baseline.values[("TS03",)]) == ["avgResponseTime", "throughput"]
+    comparisons = {comparison.metric: comparison for comparison in compare_results(baseline, candidate)}
+    assert comparisons["throughput"].delta == pytest.approx(-50)
+    assert comparisons["throughput"].regression
+    assert not comparisons["avgResponseTime"].regression
@@ -0,0 +1,46 @@
+import pytest
+
+from yasube.shared.concurrency import InFlight
+
+
+def run(monkeypatch, events):
+    """Feeds the (instant, change) events to a new InFlight, as if they happened at those instants."""
+    in_flight = InFlight()
+    for instant, change in events:
+        monkeypatch.setattr("yasube.shared.concurrency.time.perf_counter", lambda: instant)
+        if change > 0:
+            in_flight.start()
+        else:
+            in_flight.end()
+    return in_flight
+
+
+def test_no_request():
+    in_flight = InFlight()
+    assert in_flight.average() is None
+    assert in_flight.peak() == 0
+
+
+def test_request_not_ended(monkeypatch):
+    in_flight = run(monkeypatch, [(0.0, 1)])
+    assert in_flight.average() is None
+    assert in_flight.peak() == 1
+
+
+def test_overlapping_requests(monkeypatch):
+    # One request over [0, 4], another over [1, 3]: two in flight half of the time
+    in_flight = run(monkeypatch, [(0.0, 1), (1.0, 1), (3.0, -1), (4.0, -1)])
+    assert in_flight.average() == pytest.approx(1.5)
+    assert in_flight.peak() == 2
+
+
+def test_idle_time_between_requests(monkeypatch):
+    in_flight = run(monkeypatch, [(0.0, 1), (1.0, -1), (3.0, 1), (4.0, -1)])
+    assert in_flight.average() == pytest.approx(0.5)
+    assert in_flight.peak() == 1
+
+
+def test_request_ending_as_another_starts(monkeypatch):
+    in_flight = run(monkeypatch, [(0.0, 1), (2.0, -1), (2.0, 1), (4.0, -1)])
+    assert in_flight.average() == pytest.approx(1)
+    assert in_flight.peak() == 1
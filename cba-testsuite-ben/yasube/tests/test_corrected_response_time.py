@@ -0,0 +1,95 @@
+import datetime
+import logging
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from yasube.cases.base import GetMixin
+from yasube.shared.arrivals import ArrivalSchedule
+from yasube.shared.metrics import MetricName, Sample
+from yasube.shared.reducers import MetricColumns, MetricReducer
+
+
+def scheduled_case(rate: float = 10):
+    """Stands for a test case scheduling its requests at the given rate."""
+    return SimpleNamespace(arrival_schedule=ArrivalSchedule(rate), logger=logging.getLogger(__name__))
+
+
+def response(elapsed_ms: float):
+    return SimpleNamespace(elapsed=datetime.timedelta(milliseconds=elapsed_ms))
+
+
+def sample(response_time: float, queue_time: float = None) -> Sample:
+    sample = Sample()
+    sample.queue_time = queue_time
+    GetMixin._set_success_metrics(scheduled_case(), response(response_time), sample)
+    return sample
+
+
+def test_constant_schedule():
+    schedule = ArrivalSchedule(4)
+    slots = [schedule.next_slot() for _ in range(3)]
+    assert slots[1] - slots[0] == pytest.approx(0.25)
+    assert slots[2] - slots[1] == pytest.approx(0.25)
+    assert ArrivalSchedule.delay(slots[0] - 1) == 0.0
+
+
+def test_late_request_queues():
+    case = scheduled_case()
+    sample = Sample()
+    slot = time.monotonic() - 0.25
+    GetMixin._set_arrival_metrics(case, slot, sample)
+    assert sample.queue_time == pytest.approx(250, abs=50)
+    expected_start = datetime.datetime.utcnow() - datetime.timedelta(seconds=0.25)
+    assert abs((sample.scheduled_start_time - expected_start).total_seconds()) < 0.05
+
+
+def test_request_on_schedule_does_not_queue():
+    sample = Sample()
+    GetMixin._set_arrival_metrics(scheduled_case(), time.monotonic() + 1, sample)
+    assert sample.queue_time == 0.0
+
+
+def test_unscheduled_request_has_no_queue_time():
+    sample = Sample()
+    GetMixin._set_arrival_metrics(SimpleNamespace(arrival_schedule=None), None, sample)
+    assert sample.queue_time is None
+    assert sample.scheduled_start_time is None
+
+
+def test_corrected_response_time_adds_the_queue_time():
+    late = sample(100, queue_time=250)
+    assert late.response_time == pytest.approx(100)
+    assert late.corrected_response_time == pytest.approx(350)
+    assert sample(100).corrected_response_time == pytest.approx(100)
+
+
+def test_failed_request_has_no_corrected_response_time():
+    failed = Sample()
+    GetMixin._set_error_metrics(scheduled_case(), ConnectionError("refused"), failed)
+    assert failed.corrected_response_time == -1
+    assert failed.exception is True
+
+
+def test_corrected_reducers():
+    failed = Sample()
+    GetMixin._set_error_metrics(scheduled_case(), ConnectionError("refused"), failed)
+    failed.queue_time = 0.0
+    samples = [sample(100, queue_time=0.0), sample(100, queue_time=500), sample(200, queue_time=0.0), failed]
+    columns = MetricColumns(samples)
+
+    assert MetricReducer.reduce_avg_response_time(columns).value == 133
+    assert MetricReducer.reduce_peak_response_time(columns).value == 200
+    # Failed requests are left out of the averages of the response times
+    assert MetricReducer.reduce_avg_corrected_response_time(columns).value == 300
+    assert MetricReducer.reduce_peak_corrected_response_time(columns).value == 600
+    assert MetricReducer.reduce_avg_queue_time(columns).value == 125
+    assert MetricReducer.reduce_peak_queue_time(columns).value == 500
+
+
+def test_corrected_reducers_without_samples():
+    columns = MetricColumns([])
+    assert MetricReducer.reduce_avg_corrected_response_time(columns).value == -1
+    assert MetricReducer.reduce_peak_corrected_response_time(columns).value == 0
+    assert MetricReducer.reduce_avg_queue_time(columns).name == MetricName.AVG_QUEUE_TIME
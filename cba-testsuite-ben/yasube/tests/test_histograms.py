@@ -0,0 +1,70 @@
+import math
+import random
+
+import pytest
+
+from yasube.shared.histograms import Histogram
+
+
+def test_empty_histogram():
+    histogram = Histogram()
+    assert histogram.count == 0
+    assert histogram.percentile(50) == 0.0
+    assert histogram.stddev == 0.0
+
+
+def test_small_values_are_exact():
+    # Below the sub-bucket count, every unit has its own bucket
+    histogram = Histogram(resolution=1)
+    for value in range(1, 101):
+        histogram.record(value)
+    assert histogram.percentile(50) == 50
+    assert histogram.percentile(99) == 99
+    assert histogram.percentile(100) == 100
+
+
+@pytest.mark.parametrize("value", [1, 2047, 2048, 2049, 4095, 4096, 123_456, 10**9])
+def test_bucket_bounds(value):
+    histogram = Histogram(resolution=1)
+    index = histogram._index(value)
+    highest = histogram._highest_equivalent_units(index)
+    # The bucket of a value ends at or after it, within the precision of the histogram
+    assert value <= highest <= value * (1 + 10**-histogram.significant_figures)
+    assert histogram._index(highest) == index
+    assert histogram._index(highest + 1) == index + 1
+
+
+def test_percentiles_within_precision():
+    rng = random.Random(42)
+    values = sorted(rng.lognormvariate(5, 1) for _ in range(10_000))
+    histogram = Histogram()
+    for value in values:
+        histogram.record(value)
+    for percentile in (50, 90, 99, 99.9):
+        expected = values[math.ceil(percentile / 100 * len(values)) - 1]
+        assert histogram.percentile(percentile) == pytest.approx(expected, rel=1e-3, abs=histogram.resolution)
+    assert histogram.percentile(100) == values[-1]
+
+
+def test_mean_and_stddev_are_exact():
+    histogram = Histogram()
+    for value in (2, 4, 4, 4, 5, 5, 7, 9):
+        histogram.record(value)
+    assert histogram.count == 8
+    assert histogram.mean == pytest.approx(5)
+    assert histogram.stddev == pytest.approx(2)
+    assert histogram.max == 9
+
+
+def test_negative_values_are_ignored():
+    histogram = Histogram()
+    histogram.record(-1)
+    assert histogram.count == 0
+
+
+def test_values_past_the_highest_are_clamped():
+    histogram = Histogram(resolution=1, highest=1000)
+    histogram.record(5000)
+    assert histogram.count == 1
+    assert histogram.max == 5000
+    assert histogram.percentile(100) <= 5000
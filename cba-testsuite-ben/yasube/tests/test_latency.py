@@ -0,0 +1,103 @@
+from datetime import datetime, timezone
+
+from yasube.shared.latency import Watermark, product_latencies
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def product(id_: str, published: str) -> dict:
+    return {"Id": id_, "PublicationDate": published}
+
+
+def ids(products):
+    return [p["Id"] for p in products]
+
+
+def test_products_before_the_watermark_are_dropped():
+    watermark = Watermark(START)
+    products = [product("a", "2023-12-31T23:59:59.999Z"), product("b", "2024-01-01T00:00:00.000Z")]
+    assert ids(watermark.advance(products)) == ["b"]
+
+
+def test_watermark_advances_to_the_latest_product():
+    watermark = Watermark(START)
+    watermark.advance([product("a", "2024-01-01T00:00:01.000Z"), product("b", "2024-01-01T00:00:02.500Z")])
+    assert watermark.value == datetime(2024, 1, 1, 0, 0, 2, 500000, tzinfo=timezone.utc)
+    assert watermark.filter() == "PublicationDate ge 2024-01-01T00:00:02.500Z"
+
+
+def test_products_seen_at_the_watermark_are_not_returned_again():
+    watermark = Watermark(START)
+    first = [product("a", "2024-01-01T00:00:01.000Z"), product("b", "2024-01-01T00:00:01.000Z")]
+    assert ids(watermark.advance(first)) == ["a", "b"]
+    # The next poll asks from the watermark included
+    second = first + [product("c", "2024-01-01T00:00:01.000Z")]
+    assert ids(watermark.advance(second)) == ["c"]
+    assert watermark.advance(second) == []
+
+
+def test_watermark_is_truncated_to_the_millisecond():
+    watermark = Watermark(datetime(2024, 1, 1, 0, 0, 1, 123456, tzinfo=timezone.utc))
+    assert watermark.value.microsecond == 123000
+    assert ids(watermark.advance([product("a", "2024-01-01T00:00:01.123000Z")])) == ["a"]
+
+
+def test_product_published_later_between_the_ids_seen():
+    watermark = Watermark(START)
+    first = [product("a", "2024-01-01T00:00:01.000Z"), product("c", "2024-01-01T00:00:01.000Z")]
+    assert ids(watermark.advance(first)) == ["a", "c"]
+    assert watermark.filter() == "PublicationDate ge 2024-01-01T00:00:01.000Z"
+    # b is published afterwards within the same millisecond, but sorts between a and c
+    page = [product(id_, "2024-01-01T00:00:01.000Z") for id_ in ("a", "b", "c")]
+    assert ids(watermark.advance(page)) == ["b"]
+
+
+def test_full_page_at_the_watermark_goes_on_from_its_last_id():
+    watermark = Watermark(START)
+    page = [product(str(i), "2024-01-01T00:00:01.000Z") for i in range(3)]
+    assert len(watermark.advance(page, full_page=True)) == 3
+    assert watermark.filter() == (
+        "(PublicationDate gt 2024-01-01T00:00:01.000Z"
+        " or (PublicationDate eq 2024-01-01T00:00:01.000Z and Id gt 2))"
+    )
+    # The rest of the millisecond, then the polls start from the watermark again
+    assert ids(watermark.advance([product("3", "2024-01-01T00:00:01.000Z")])) == ["3"]
+    assert watermark.filter() == "PublicationDate ge 2024-01-01T00:00:01.000Z"
+
+
+def test_full_page_past_the_watermark_goes_on_from_its_last_id():
+    watermark = Watermark(START)
+    page = [product("a", "2024-01-01T00:00:01.000Z"), product("b", "2024-01-01T00:00:02.000Z")]
+    watermark.advance(page, full_page=True)
+    assert watermark.filter().endswith("and Id gt b))")
+
+
+def test_full_page_of_products_seen_does_not_stall():
+    watermark = Watermark(START)
+    page = [product(str(i), "2024-01-01T00:00:01.000Z") for i in range(3)]
+    watermark.advance(page)
+    assert watermark.advance(page, full_page=True) == []
+    assert "Id gt 2" in watermark.filter()
+
+
+def test_products_without_publication_date_are_dropped():
+    watermark = Watermark(START)
+    assert watermark.advance([{"Id": "a"}]) == []
+    assert watermark.value == START
+
+
+def test_product_latencies():
+    availability, operational = product_latencies(
+        {
+            "PublicationDate": "2024-01-01T01:00:00.000Z",
+            "ContentDate": {"Start": "2024-01-01T00:00:00.000Z", "End": "2024-01-01T00:10:00.000Z"},
+            "OriginDate": "2024-01-01T00:59:30.000Z",
+        }
+    )
+    assert availability == 3000
+    assert operational == 30
+
+
+def test_product_latencies_unknown():
+    assert product_latencies({}) == (None, None)
+    assert product_latencies({"PublicationDate": "2024-01-01T01:00:00.000Z"}) == (None, None)
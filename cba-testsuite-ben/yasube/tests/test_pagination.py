@@ -0,0 +1,100 @@
+from typing import List, Optional
+
+from yasube.shared.metrics import Sample
+from yasube.shared.pagination import Page, Traversal
+
+URL = "http://localhost/odata/v1/Products"
+
+
+def traverse(traversal: Traversal, pages: List[Optional[Page]]) -> List[str]:
+    """Requests the pages one at a time, answering them in turn, and returns the urls requested."""
+    urls = []
+    pages = iter(pages)
+    while (url := traversal.next_url()) is not None:
+        urls.append(url)
+        traversal.add(Sample(), next(pages))
+    return urls
+
+
+def test_skip_stops_at_the_total():
+    traversal = Traversal(URL, {"page_size": 10})
+    urls = traverse(traversal, [Page(10, 25, None), Page(10, None, None), Page(5, None, None)])
+    assert urls == [
+        f"{URL}?$top=10&$skip=0&$count=true",
+        f"{URL}?$top=10&$skip=10",
+        f"{URL}?$top=10&$skip=20",
+    ]
+    assert traversal.total == 25
+    assert traversal.read == 25
+
+
+def test_skip_steps_by_the_items_served():
+    # The server caps the page size below the one requested
+    traversal = Traversal(URL, {"page_size": 10})
+    urls = traverse(traversal, [Page(4, 10, None), Page(4, None, None), Page(2, None, None)])
+    assert urls[1:] == [f"{URL}?$top=10&$skip=4", f"{URL}?$top=10&$skip=8"]
+    assert traversal.read == 10
+
+
+def test_skip_does_not_stop_on_short_pages():
+    traversal = Traversal(URL, {"page_size": 10})
+    traverse(traversal, [Page(10, 30, None), Page(3, None, None), Page(10, None, None), Page(7, None, None)])
+    assert traversal.requested == 3
+    assert traversal.read == 23
+
+
+def test_skip_stops_on_an_empty_page():
+    traversal = Traversal(URL, {"page_size": 10})
+    traverse(traversal, [Page(10, None, None), Page(10, None, None), Page(0, None, None)])
+    assert traversal.requested == 3
+    assert traversal.read == 20
+
+
+def test_skip_stops_on_a_failure_when_the_total_is_unknown():
+    traversal = Traversal(URL, {"page_size": 10})
+    traverse(traversal, [Page(10, None, None), None])
+    assert traversal.requested == 2
+    assert traversal.next_url() is None
+
+
+def test_skip_goes_on_after_a_failure_when_the_total_is_known():
+    traversal = Traversal(URL, {"page_size": 10})
+    traverse(traversal, [Page(10, 30, None), None, Page(10, None, None)])
+    assert traversal.requested == 3
+    assert traversal.read == 20
+
+
+def test_max_pages():
+    traversal = Traversal(URL, {"page_size": 10, "max_pages": 2})
+    traverse(traversal, [Page(10, 100, None), Page(10, None, None)])
+    assert traversal.requested == 2
+    assert traversal.next_url() is None
+
+
+def test_next_link_is_followed_until_missing():
+    traversal = Traversal(URL, {"page_size": 10, "pagination": "next_link", "pages_in_flight": 4})
+    assert traversal.concurrency == 1
+    urls = traverse(
+        traversal,
+        [Page(10, 25, f"{URL}?$skiptoken=a"), Page(10, None, "Products?$skiptoken=b"), Page(5, None, None)],
+    )
+    assert urls == [f"{URL}?$top=10&$skip=0&$count=true", f"{URL}?$skiptoken=a", f"{URL}?$skiptoken=b"]
+    assert traversal.read == 25
+
+
+def test_next_link_stops_on_a_failure():
+    traversal = Traversal(URL, {"page_size": 10, "pagination": "next_link"})
+    traverse(traversal, [Page(10, 25, f"{URL}?$skiptoken=a"), None])
+    assert traversal.requested == 2
+    assert traversal.next_url() is None
+
+
+def test_pages_in_flight():
+    traversal = Traversal(URL, {"page_size": 10, "pages_in_flight": 3})
+    assert traversal.concurrency == 3
+    first = traversal.next_url()
+    traversal.add(Sample(), Page(10, 40, None))
+    urls = [traversal.next_url() for _ in range(traversal.concurrency)]
+    assert first.endswith("$skip=0&$count=true")
+    assert urls == [f"{URL}?$top=10&$skip={skip}" for skip in (10, 20, 30)]
+    assert traversal.next_url() is None
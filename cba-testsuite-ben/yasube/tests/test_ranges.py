@@ -0,0 +1,34 @@
+import pytest
+
+from yasube.utils.ranges import split_range
+
+
+@pytest.mark.parametrize(
+    "size, count, expected",
+    [
+        (10, 1, [(0, 9)]),
+        (10, 2, [(0, 4), (5, 9)]),
+        (10, 3, [(0, 3), (4, 6), (7, 9)]),
+        # No more ranges than bytes
+        (2, 4, [(0, 0), (1, 1)]),
+        (1, 1, [(0, 0)]),
+        (5, 0, [(0, 4)]),
+    ],
+)
+def test_split_range(size, count, expected):
+    assert split_range(size, count) == expected
+
+
+def test_split_range_empty():
+    assert split_range(0, 4) == []
+
+
+@pytest.mark.parametrize("size, count", [(1, 3), (1_048_576, 3), (1_000_003, 7), (10, 10)])
+def test_split_range_covers_the_resource(size, count):
+    ranges = split_range(size, count)
+    assert ranges[0][0] == 0
+    assert ranges[-1][1] == size - 1
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert start == end + 1
+    lengths = [end - start + 1 for start, end in ranges]
+    assert max(lengths) - min(lengths) <= 1
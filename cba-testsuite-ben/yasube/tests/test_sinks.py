@@ -0,0 +1,46 @@
+import io
+import socket
+from types import SimpleNamespace
+
+import pytest
+from urllib3.exceptions import ProtocolError, ReadTimeoutError
+from urllib3.response import HTTPResponse
+
+from yasube.shared.sinks import DiscardSink
+
+
+class BrokenFile(io.RawIOBase):
+    """Socket file serving a first chunk of the body, then raising the given error."""
+
+    def __init__(self, error: Exception):
+        self.error = error
+        self.served = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self.served:
+            raise self.error
+        self.served = True
+        buffer[:4] = b"body"
+        return 4
+
+
+def response(fp, headers=None):
+    return SimpleNamespace(raw=HTTPResponse(body=fp, headers=headers or {}, preload_content=False))
+
+
+def test_discard_sink_reads_the_whole_body():
+    assert DiscardSink(4).consume(response(io.BytesIO(b"0123456789"))) == 10
+
+
+@pytest.mark.parametrize(
+    "error, expected",
+    [(socket.timeout("timed out"), ReadTimeoutError), (ConnectionResetError("reset"), ProtocolError)],
+)
+def test_discard_sink_translates_the_errors_as_urllib3(error, expected):
+    broken = response(BrokenFile(error))
+    with pytest.raises(expected):
+        DiscardSink(8).consume(broken)
+    assert broken.raw.closed
@@ -0,0 +1,88 @@
+"""
+Import time regression benchmark of the yasube CLI.
+
+Each round imports the CLI in a fresh interpreter, as the schedulers do when
+they spawn yasube, and checks that the configuration commands (--echo and
+--dryrun) do not import the modules only needed to run the scenarios.
+The benchmark fails if one of them is imported, or if the median import time
+exceeds the budget.
+
+    python -m yasube.benchmarks.import_time --rounds 10 --budget 0.5
+"""
+import json
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+import typer
+
+# Module imported by the console script
+CLI_MODULE = "yasube.bin.main"
+
+# Modules only needed to run the scenarios, or to expand GEO templates
+RUN_ONLY_MODULES = [
+    "aiohttp",
+    "geopandas",
+    "prefect",
+    "requests",
+    "requests_oauthlib",
+    "yasube.cases",
+    "yasube.scenarios",
+    "yasube.shared.planner",
+    "yasube.shared.url_helper",
+]
+
+# Measures the import in a fresh interpreter, printing the results as json
+PROBE = f"""
+import json, sys
+from timeit import default_timer as timer
+start = timer()
+import {CLI_MODULE}
+elapsed = timer() - start
+print(json.dumps({{
+    "elapsed": elapsed,
+    "imported": [m for m in {RUN_ONLY_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+
+def probe() -> Dict:
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE], check=True, capture_output=True, text=True
+    )
+    return json.loads(result.stdout)
+
+
+def main(
+    rounds: int = typer.Option(10, help="Number of fresh interpreters to time."),
+    budget: float = typer.Option(0.5, help="Maximum median import time, in seconds."),
+) -> None:
+    """Times the import of the yasube CLI and checks which modules it imports."""
+    # The first round warms up the bytecode cache
+    probe()
+    results = [probe() for _ in range(rounds)]
+
+    timings: List[float] = [r["elapsed"] for r in results]
+    median = statistics.median(timings)
+    typer.echo(
+        f"{CLI_MODULE}: median {median * 1000:.0f} ms, "
+        f"min {min(timings) * 1000:.0f} ms, max {max(timings) * 1000:.0f} ms "
+        f"over {rounds} round(s), budget {budget * 1000:.0f} ms"
+    )
+
+    failed = False
+    imported = sorted({m for r in results for m in r["imported"]})
+    if imported:
+        typer.secho(f"Imported at startup: {imported}", fg=typer.colors.RED)
+        failed = True
+    if median > budget:
+        typer.secho("Import time over budget", fg=typer.colors.RED)
+        failed = True
+
+    if failed:
+        raise typer.Exit(1)
+
+
+if __name__ == "__main__":
+    typer.run(main)
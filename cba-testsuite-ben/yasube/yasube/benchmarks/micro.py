@@ -0,0 +1,318 @@
+"""
+Micro-benchmarks of the hot paths of yasube: templates, picking, reducers,
+results serialization and the overhead of a list test case, on its own and
+mapped by Prefect.
+
+They run offline: the list test case is given synthetic responses by a
+transport adapter mounted on the session of its platform. Each benchmark
+reports the operations per second, e.g. requests reduced or runs of the
+test case, the best of several rounds, along with the peak and retained
+memory allocated by a single call.
+Results can be saved as a baseline, and compared to it: the suite fails if
+a benchmark is slower, or allocates more, than the baseline by more than
+the tolerance.
+
+    python -m yasube.benchmarks.micro --save baseline.json
+    python -m yasube.benchmarks.micro --baseline baseline.json --tolerance 0.2
+"""
+import datetime
+import fnmatch
+import json
+import logging
+import platform
+import random
+import timeit
+import tracemalloc
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+import requests
+import typer
+from prefect import Flow, unmapped
+from prefect.engine.serializers import JSONSerializer
+
+from yasube.cases.base import BaseListTestCase
+from yasube.cases.common import build_test_results, pick_random_pks, split_test_results
+from yasube.shared.concurrency import InFlight
+from yasube.shared.histograms import Histogram
+from yasube.shared.metrics import Metric, MetricName, MetricUom, Sample
+from yasube.shared.platforms import Platform
+from yasube.shared.reducers import MetricColumns, MetricReducer
+from yasube.shared.url_helper import Template, UrlHelper
+
+# Root uri of the synthetic platform, never resolved
+ROOT_URI = "http://yasube.bench/odata/v1/"
+
+# Query of the list benchmarks, as found in the configuration
+QUERY = "$orderby=PublicationDate desc&$top=100&$filter=startswith(Name,'S1') and ContentDate/Start ge {{NOW-7D}}"
+
+# Products per synthetic list response, and requests per synthetic test
+PRODUCTS = 100
+REQUESTS = 10_000
+
+# Runs of the list test case mapped by Prefect in a single flow
+MAPPED_RUNS = 100
+
+# A benchmark is set up once, and returns the operation to time along with
+# the number of units it processes per call, and their name
+Operation = Callable[[], object]
+Setup = Callable[[], Tuple[Operation, int, str]]
+
+
+class Result(NamedTuple):
+    ops_per_second: float
+    peak_bytes: int
+    retained_bytes: int
+
+
+def synthetic_products(count: int = PRODUCTS) -> List[Dict]:
+    rng = random.Random(0)
+    published = datetime.datetime(2024, 1, 1)
+    products = []
+    for index in range(count):
+        publication_date = published + datetime.timedelta(seconds=index)
+        products.append(
+            {
+                "Id": f"{rng.getrandbits(128):032x}",
+                "Name": f"S1A_BENCH_{index:08d}.SAFE.zip",
+                "ContentLength": rng.randint(1, 1 << 30),
+                "PublicationDate": f"{publication_date.isoformat(timespec='milliseconds')}Z",
+                "EvictionDate": f"{(publication_date + datetime.timedelta(days=30)).isoformat(timespec='milliseconds')}Z",
+            }
+        )
+    return products
+
+
+class SyntheticAdapter(requests.adapters.BaseAdapter):
+    """Answers every request with the same list of products, without any network."""
+
+    def __init__(self, products: List[Dict]):
+        super().__init__()
+        self.content = json.dumps({"value": products}).encode()
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        response = requests.Response()
+        response.status_code = 200
+        response.headers["Content-Type"] = "application/json"
+        response._content = self.content
+        response.url = request.url
+        response.request = request
+        response.elapsed = datetime.timedelta(milliseconds=1)
+        return response
+
+    def close(self) -> None:
+        pass
+
+
+def synthetic_platform() -> Platform:
+    platform_ = Platform(
+        key="BENCH",
+        label="Synthetic platform",
+        root_uri=ROOT_URI,
+        auth={"type": "basic", "credentials": {"username": "user", "password": "password"}},
+    )
+    platform_.session.mount(ROOT_URI, SyntheticAdapter(synthetic_products()))
+    return platform_
+
+
+class BenchListTestCase(BaseListTestCase):
+    class Meta:
+        key = "BenchListTestCase"
+        name = "GET Synthetic Products List"
+        resource_path = "Products"
+
+
+def synthetic_metrics(count: int = REQUESTS) -> List[Union[Metric, Sample]]:
+    """Returns the metrics of `count` requests, with every raw metric the reducers read."""
+    rng = random.Random(0)
+    started = datetime.datetime(2024, 1, 1)
+    response_times = Histogram()
+    in_flight = InFlight()
+    metrics: List[Union[Metric, Sample]] = []
+    for index in range(count):
+        sample = Sample()
+        sample.start_time = started + datetime.timedelta(milliseconds=10 * index)
+        sample.scheduled_start_time = sample.start_time
+        sample.queue_time = rng.uniform(0, 5)
+        sample.status_code = 200
+        sample.response_time = rng.lognormvariate(4, 0.5)
+        sample.corrected_response_time = sample.queue_time + sample.response_time
+        sample.exception = rng.random() < 0.01
+        sample.end_time = sample.start_time + datetime.timedelta(milliseconds=sample.response_time)
+        sample.size = rng.randint(1_000, 1_000_000)
+        sample.dns_time = rng.uniform(0, 2)
+        sample.connect_time = rng.uniform(0, 5)
+        sample.tls_time = rng.uniform(0, 10)
+        sample.time_to_first_byte = sample.response_time * 0.8
+        sample.transfer_time = sample.response_time * 0.2
+        sample.new_connection = index % 50 == 0
+        response_times.record(sample.response_time)
+        in_flight.start()
+        in_flight.end()
+        metrics.append(sample)
+        metrics.append(Metric(MetricName.TOTAL_READ_RESULTS, MetricUom.COUNT, PRODUCTS))
+        metrics.append(Metric(MetricName.PRODUCT_RETENTION, MetricUom.DAYS, 30))
+        metrics.append(Metric(MetricName.DATA_AVAILABILITY_LATENCY, MetricUom.SECONDS, rng.uniform(60, 3600)))
+        metrics.append(Metric(MetricName.DATA_OPERATIONAL_LATENCY, MetricUom.SECONDS, rng.uniform(60, 600)))
+        metrics.append(Metric(MetricName.STREAM_THROUGHPUT, MetricUom.BYTES_SEC, rng.uniform(1e6, 1e8)))
+        metrics.append(Metric(MetricName.REASSEMBLY_TIME, MetricUom.MS, rng.uniform(1, 50)))
+    metrics.append(Metric(MetricName.TOTAL_RESULTS, MetricUom.COUNT, count * PRODUCTS))
+    metrics.append(Metric(MetricName.RESPONSE_TIME_HISTOGRAM, MetricUom.MS, response_times))
+    metrics.append(Metric(MetricName.IN_FLIGHT, MetricUom.COUNT, in_flight))
+    return metrics
+
+
+def reducers() -> Dict[str, Callable[[MetricColumns], Metric]]:
+    return {name: getattr(MetricReducer, name) for name in sorted(vars(MetricReducer)) if name.startswith("reduce_")}
+
+
+def setup_url_helper_build() -> Tuple[Operation, int, str]:
+    return lambda: UrlHelper.build(ROOT_URI, "Products", QUERY), 1, "urls"
+
+
+def setup_template_replace() -> Tuple[Operation, int, str]:
+    value = "PublicationDate ge {{NOW-7D}} and PublicationDate lt {{ NOW }} and ContentDate/End gt {{NOW-1M}}"
+    return lambda: Template.replace(value), 1, "queries"
+
+
+def setup_pick_random_pks() -> Tuple[Operation, int, str]:
+    response = synthetic_platform().session.get(UrlHelper.build(ROOT_URI, "Products"))
+    return lambda: pick_random_pks.run(response, 10), 1, "calls"
+
+
+def setup_split_test_results() -> Tuple[Operation, int, str]:
+    response = requests.Response()
+    data = [([Sample()], response) for _ in range(MAPPED_RUNS)]
+    return lambda: split_test_results.run(data, mapped_=True), MAPPED_RUNS, "results"
+
+
+def setup_metric_columns() -> Tuple[Operation, int, str]:
+    metrics = synthetic_metrics()
+    return lambda: MetricColumns(metrics), REQUESTS, "requests"
+
+
+def setup_reducer(reducer: Callable[[MetricColumns], Metric]) -> Setup:
+    def setup() -> Tuple[Operation, int, str]:
+        columns = MetricColumns(synthetic_metrics())
+        return lambda: reducer(columns), 1, "calls"
+
+    return setup
+
+
+def setup_write_metrics() -> Tuple[Operation, int, str]:
+    columns = MetricColumns(synthetic_metrics())
+    metrics = [reducer(columns) for reducer in reducers().values()]
+    started = datetime.datetime.utcnow()
+    return lambda: JSONSerializer().serialize(build_test_results("Bench", started, metrics)), 1, "files"
+
+
+def setup_list_test_case_run() -> Tuple[Operation, int, str]:
+    test_case = BenchListTestCase({"query": QUERY}, synthetic_platform())
+    return lambda: test_case.run(), 1, "runs"
+
+
+def setup_list_test_case_prefect_map() -> Tuple[Operation, int, str]:
+    test_case = BenchListTestCase({"query": QUERY}, synthetic_platform())
+    with Flow("Bench") as flow:
+        test_case.map(range(1, MAPPED_RUNS + 1), unmapped(MAPPED_RUNS))
+    return lambda: flow.run(), MAPPED_RUNS, "tasks"
+
+
+def benchmarks() -> Dict[str, Setup]:
+    setups: Dict[str, Setup] = {
+        "url_helper.build": setup_url_helper_build,
+        "template.replace": setup_template_replace,
+        "pick_random_pks": setup_pick_random_pks,
+        "split_test_results": setup_split_test_results,
+        "metric_columns": setup_metric_columns,
+    }
+    for name, reducer in reducers().items():
+        setups[f"reducers.{name}"] = setup_reducer(reducer)
+    setups["write_metrics.serialize"] = setup_write_metrics
+    setups["list_test_case.run"] = setup_list_test_case_run
+    setups["list_test_case.prefect_map"] = setup_list_test_case_prefect_map
+    return setups
+
+
+def measure(operation: Operation, units: int, rounds: int) -> Result:
+    # The first call warms up the caches, as a long run would
+    operation()
+    timer = timeit.Timer(operation)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=rounds, number=number)) / number
+
+    # Allocations are traced apart, as tracing slows down the timed rounds
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        result = operation()
+        current, peak = tracemalloc.get_traced_memory()
+        del result
+    finally:
+        tracemalloc.stop()
+    return Result(units / best, peak - before, max(0, current - before))
+
+
+def regressions(name: str, result: Result, baseline: Dict, tolerance: float) -> List[str]:
+    reference = baseline.get(name)
+    if reference is None:
+        return []
+    found = []
+    if result.ops_per_second < reference["ops_per_second"] * (1 - tolerance):
+        found.append(f"{name}: {result.ops_per_second:,.0f} ops/s, baseline {reference['ops_per_second']:,.0f} ops/s")
+    # Allocations of a few KiB vary with the interpreter state
+    if result.peak_bytes > max(reference["peak_bytes"], 4096) * (1 + tolerance):
+        found.append(f"{name}: peak of {result.peak_bytes:,} bytes, baseline {reference['peak_bytes']:,} bytes")
+    return found
+
+
+def main(
+    rounds: int = typer.Option(5, help="Timed rounds per benchmark, the best one is kept."),
+    only: Optional[str] = typer.Option(None, help="Only run the benchmarks matching this pattern, e.g. 'reducers.*'."),
+    save: Optional[str] = typer.Option(None, help="Path of the file to save the results to, as a baseline."),
+    baseline: Optional[str] = typer.Option(None, help="Path of a baseline to compare the results to."),
+    tolerance: float = typer.Option(0.2, help="Relative slowdown, or allocation increase, tolerated."),
+) -> None:
+    """Times the hot paths of yasube and compares them to a baseline."""
+    # Prefect logs every task run of the mapped benchmark
+    logging.getLogger("prefect").setLevel(logging.ERROR)
+    reference = {}
+    if baseline is not None:
+        with open(baseline) as f:
+            reference = json.load(f)["results"]
+
+    results: Dict[str, Result] = {}
+    found: List[str] = []
+    for name, setup in benchmarks().items():
+        if only is not None and not fnmatch.fnmatch(name, only):
+            continue
+        operation, units, unit = setup()
+        result = results[name] = measure(operation, units, rounds)
+        line = (
+            f"{name:<50} {result.ops_per_second:>14,.0f} {unit + '/s':<10}"
+            f" {result.peak_bytes / 1024:>10,.1f} KiB peak {result.retained_bytes / 1024:>8,.1f} KiB retained"
+        )
+        if name in reference:
+            line += f" {result.ops_per_second / reference[name]['ops_per_second'] - 1:>+8.1%}"
+        typer.echo(line)
+        found += regressions(name, result, reference, tolerance)
+
+    if save is not None:
+        with open(save, "w") as f:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "results": {name: result._asdict() for name, result in results.items()},
+                },
+                f,
+                indent=2,
+            )
+        typer.echo(f"Baseline saved to {save}")
+
+    if found:
+        typer.secho("\n".join(["Regressions over the baseline:"] + found), fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+
+if __name__ == "__main__":
+    typer.run(main)
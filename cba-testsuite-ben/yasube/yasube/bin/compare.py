@@ -0,0 +1,207 @@
+import errno
+import json
+import logging
+import math
+from typing import List, Optional
+
+import typer
+
+from yasube.shared.comparison import STATISTICS, Comparison, compare_results, load_results, parse_thresholds
+
+app = typer.Typer(add_completion=False)
+
+
+def format_value(value: float) -> str:
+    return f"{value:.6g}" if math.isfinite(value) else str(value)
+
+
+def format_delta(comparison: Comparison, value: Optional[float]) -> str:
+    if value is None or math.isnan(value):
+        return "-"
+    return f"{value:+.1f}%" if comparison.relative else f"{value:+.2f}pt"
+
+
+def echo_comparisons(baseline: str, candidate: str, comparisons: List[Comparison]) -> None:
+    typer.echo(f"\n{baseline} -> {candidate}")
+    headers = ("test", "metric", "baseline", "candidate", "delta", "interval", "p-value", "n", "")
+    rows = []
+    for comparison in comparisons:
+        interval = "-"
+        if comparison.low is not None:
+            interval = f"[{format_delta(comparison, comparison.low)}, {format_delta(comparison, comparison.high)}]"
+        verdict = "REGRESSION" if comparison.regression else "improved" if comparison.improvement else ""
+        rows.append(
+            (
+                "/".join(comparison.key),
+                comparison.metric,
+                format_value(comparison.baseline),
+                format_value(comparison.candidate),
+                format_delta(comparison, comparison.delta),
+                interval,
+                "-" if comparison.p_value is None else f"{comparison.p_value:.3g}",
+                f"{comparison.baseline_count}/{comparison.candidate_count}",
+                verdict,
+            )
+        )
+    widths = [max(len(row[i]) for row in [headers, *rows]) for i in range(len(headers))]
+    for row in [headers, *rows]:
+        typer.echo("  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip())
+
+
+@app.command()
+def compare(
+    baseline: str = typer.Argument(..., help="The results file or sample log of the baseline run."),
+    candidates: List[str] = typer.Argument(
+        ..., help="The results files or sample logs of the runs compared to the baseline."
+    ),
+    scenarios: Optional[List[str]] = typer.Option(
+        None,
+        "--scenario",
+        "-s",
+        help="""
+            The keys of the scenarios to compare, e.g. TS01, all of them by default.
+        """,
+    ),
+    metrics: Optional[List[str]] = typer.Option(
+        None,
+        "--metric",
+        "-m",
+        help="""
+            The metrics to compare, all of them for results files, and
+            responseTime, timeToFirstByte, transferTime and errorRate for sample logs.
+        """,
+    ),
+    statistic: str = typer.Option(
+        "median",
+        "--statistic",
+        help=f"""
+            The statistic of the samples compared, one of {', '.join(STATISTICS)}.
+            The error rate is always compared as a mean.
+        """,
+    ),
+    thresholds: Optional[List[str]] = typer.Option(
+        None,
+        "--threshold",
+        "-t",
+        help="""
+            The change of a metric deemed a regression, in % of the baseline
+            or in points for percentages, as <value> for every metric or as
+            <metric>=<value>. Defaults to 10.
+        """,
+    ),
+    alpha: float = typer.Option(
+        0.05,
+        "--alpha",
+        min=0,
+        max=1,
+        help="""
+            The significance level of the changes between sample logs.
+        """,
+    ),
+    confidence: float = typer.Option(
+        0.95,
+        "--confidence",
+        min=0,
+        max=1,
+        help="""
+            The level of the bootstrapped confidence intervals.
+        """,
+    ),
+    resamples: int = typer.Option(
+        1000,
+        "--resamples",
+        min=1,
+        help="""
+            The number of bootstrap resamples.
+        """,
+    ),
+    seed: Optional[int] = typer.Option(
+        None,
+        "--seed",
+        help="""
+            The seed of the bootstrap, for reproducible intervals.
+        """,
+    ),
+    output: Optional[str] = typer.Option(
+        None,
+        "--output",
+        "-o",
+        help="""
+            The path of a JSON file the comparisons are written to.
+        """,
+    ),
+) -> None:
+    """
+    Compare the results of candidate runs with those of a baseline run,
+    per scenario and metric, and exit with status 1 if any regressed, or with
+    an error if a candidate has no test case in common with the baseline.
+
+    Results files only tell the delta of the reduced metrics.
+    Sample logs (.ndjson, .jsonl or .parquet) are compared per scenario,
+    platform and test case, with the bootstrapped confidence interval of the
+    delta and the p-value of a Mann-Whitney U test: a change is only a
+    regression if it is significant.
+    """
+    if statistic not in STATISTICS:
+        raise typer.BadParameter(f"statistic must be one of {', '.join(STATISTICS)}", param_hint="--statistic")
+    try:
+        default_threshold, metric_thresholds = parse_thresholds(thresholds or [], 10.0)
+    except ValueError:
+        raise typer.BadParameter("thresholds must be <value> or <metric>=<value>", param_hint="--threshold")
+
+    try:
+        baseline_results = load_results(baseline, scenarios)
+        report = []
+        regressions = 0
+        # Candidates sharing no test case with the baseline, e.g. with a mistyped --scenario
+        unmatched = 0
+        for candidate in candidates:
+            candidate_results = load_results(candidate, scenarios)
+            if candidate_results.raw != baseline_results.raw:
+                logging.error(f"Cannot compare the results file with the sample log of {baseline} and {candidate}")
+                raise typer.Exit(errno.EINVAL)
+            comparisons = compare_results(
+                baseline_results,
+                candidate_results,
+                metrics=metrics or None,
+                statistic=statistic,
+                thresholds=metric_thresholds,
+                default_threshold=default_threshold,
+                alpha=alpha,
+                confidence=confidence,
+                resamples=resamples,
+                seed=seed,
+            )
+            if not comparisons:
+                logging.error(f"No test case in common between {baseline} and {candidate}")
+                unmatched += 1
+            else:
+                echo_comparisons(baseline, candidate, comparisons)
+            regressions += sum(comparison.regression for comparison in comparisons)
+            report.append(
+                {
+                    "baseline": baseline,
+                    "candidate": candidate,
+                    "comparisons": [comparison.to_json() for comparison in comparisons],
+                }
+            )
+    except FileNotFoundError as e:
+        logging.error(e)
+        raise typer.Exit(errno.ENOENT)
+    except (ImportError, ValueError, KeyError) as e:
+        logging.error(repr(e))
+        raise typer.Exit(errno.EINVAL)
+
+    if output is not None:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if regressions:
+        typer.echo(f"\n{regressions} regression(s)")
+        raise typer.Exit(1)
+    if unmatched:
+        raise typer.Exit(errno.EINVAL)
+
+
+if __name__ == "__main__":
+    app()
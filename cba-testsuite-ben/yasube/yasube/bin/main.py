@@ -7,16 +7,19 @@ from pickle import EMPTY_DICT
 from typing import Dict, List, Optional
 
 import typer
-import urllib3
 import yaml
 from cerberus import Validator, schema_registry
-from prefect.utilities.logging import get_logger
 
-from yasube.shared.planner import Execution, ExecutionPlan, Planner
-from yasube.shared.typed_dicts import GlobalConfig, ScenarioConfig
+from yasube.engines.base import EngineType
+from yasube.shared.arrivals import ArrivalProcess
+from yasube.shared.config import RESOLVED_KEY, ConfigCache, default_cache_dir, resolve_scenarios
+from yasube.shared.metrics import MetricName
+from yasube.shared.pagination import Pagination
+from yasube.shared.sinks import SinkType
+from yasube.shared.typed_dicts import Execution, ExecutionPlan, GlobalConfig, ScenarioConfig
 
-# Silence ssl warnings
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+# Prefect, the HTTP stack and the scenarios are only imported to run the
+# scenarios, so that --echo and --dryrun start quickly
 
 # Without this var, Prefect won't write LocalResults
 os.environ["PREFECT__FLOWS__CHECKPOINTING"] = "true"
@@ -157,6 +160,25 @@ schema_registry.add(
         "requests_timeout": {"type": "float"},
         "max_retries": {"type": "integer"},
         "retry_delay": {"type": "integer"},
+        "arrival_rate": {"type": "float", "min": 0, "forbidden": [0]},
+        "arrival_process": {"type": "string", "allowed": [p.value for p in ArrivalProcess]},
+        "metrics": {
+            "type": "list",
+            "schema": {"type": "string", "allowed": [m.value for m in MetricName]},
+        },
+        "download_sink": {"type": "string", "allowed": [s.value for s in SinkType]},
+        "download_chunk_size": {"type": "integer", "min": 1},
+        "download_streams": {"type": "integer", "min": 1},
+        "download_dir": {"type": "string"},
+        "keep_downloads": {"type": "boolean"},
+        "pagination": {"type": "string", "allowed": [p.value for p in Pagination]},
+        "page_size": {"type": "integer", "min": 1},
+        "pages_in_flight": {"type": "integer", "min": 1},
+        "max_pages": {"type": "integer", "min": 1},
+        "filter": {"type": "string"},
+        "polling_duration": {"type": "float", "min": 0},
+        "polling_interval": {"type": "float", "min": 0},
+        "polling_lookback": {"type": "float", "min": 0},
     },
 )
 
@@ -164,6 +186,7 @@ schema_registry.add(
     SCHEMA_CASES,
     {
         "num_workers": {"type": "integer"},
+        "engine": {"type": "string", "allowed": [e.value for e in EngineType]},
         "cases": {
             "type": "dict",
             "keysrules": {"type": "string"},
@@ -180,6 +203,8 @@ schema_registry.add(
     {
         "result_basepath": {"type": "string"},
         "result_filename": {"type": "string"},
+        "token_cache": {"type": "string"},
+        "sample_log": {"type": "string"},
     },
 )
 
@@ -190,8 +215,12 @@ schema_registry.add(
         "label": {"type": "string", "required": True},
         "root_uri": {"type": "string", "required": True},
         "num_workers": {"type": "integer"},
+        "engine": {"type": "string", "allowed": [e.value for e in EngineType]},
         "verify_ssl": {"type": "boolean"},
         "location_trusted": {"type": "boolean"},
+        "pool_maxsize": {"type": "integer", "min": 1},
+        "pool_block": {"type": "boolean"},
+        "keep_alive": {"type": "boolean"},
         "auth": {
             "oneof": [
                 {"schema": SCHEMA_AUTH_BASIC},
@@ -216,6 +245,7 @@ schema_registry.add(
         "path": {"type": "string", "required": True},
         "default_platform": {"schema": SCHEMA_PLATFORM, "required": True},
         "num_workers": {"type": "integer"},
+        "engine": {"type": "string", "allowed": [e.value for e in EngineType]},
         "compatible_platforms": {
             "type": "list",
             "schema": {"type": "string"},
@@ -304,6 +334,8 @@ def setup_logging(config: Dict) -> None:
     Adds configured handlers to the root Prefect logger.
     To change logging level, please refer to the config/config.toml file.
     """
+    from prefect.utilities.logging import get_logger
+
     try:
         # This is the Prefect root logger
         logger = get_logger()
@@ -327,7 +359,7 @@ def setup_logging(config: Dict) -> None:
         raise LoggingConfigurationError(err)
 
 
-def read_yaml(file_path):
+def read_file(file_path) -> bytes:
     if not os.path.isfile(file_path):
         err = f"Configuration file not found: {file_path}"
         raise ConfigurationFileNotFound(err)
@@ -336,12 +368,24 @@ def read_yaml(file_path):
         err = f"Configuration file not readable: {file_path}"
         raise ConfigurationNotReadable(err)
 
-    with open(file_path, "r") as f:
-        return yaml.safe_load(f)
+    with open(file_path, "rb") as f:
+        return f.read()
 
 
-def load_config(file_path: str) -> Dict:
-    config: Dict = read_yaml(file_path)
+def load_config(file_path: str, cache: Optional[ConfigCache] = None) -> Dict:
+    """
+    Reads and validates the configuration, resolving the scenarios on their
+    platforms. The result is cached, if a cache is given, and reused as long as
+    neither the configuration file nor the schema change.
+    """
+    content = read_file(file_path)
+    if cache is not None:
+        key = cache.key(content, {"schema": schema, "registry": schema_registry.all()})
+        config = cache.get(file_path, key)
+        if config is not None:
+            return config
+
+    config: Dict = yaml.safe_load(content)
     validator = ExtendedValidator(schema)
 
     is_valid = validator.validate(config)
@@ -349,6 +393,10 @@ def load_config(file_path: str) -> Dict:
         err = f"Invalid configuration file: {validator.errors}"
         raise ConfigurationValidationError(err)
 
+    config[RESOLVED_KEY] = resolve_scenarios(config)
+    if cache is not None:
+        cache.put(file_path, key, config)
+
     return config
 
 
@@ -401,6 +449,14 @@ def main(
             Override the value of the configuration file.
         """,
     ),
+    sample_log: str = typer.Option(
+        None,
+        "--sample-log",
+        help="""
+            The path of the file the sample of every request is streamed to, as JSON lines.
+            Override the value of the configuration file.
+        """,
+    ),
     echo: bool = typer.Option(
         False,
         "--echo",
@@ -417,6 +473,21 @@ def main(
             Do not perform any scenario, only print out the execution plan.
         """,
     ),
+    engine: Optional[EngineType] = typer.Option(
+        None,
+        "--engine",
+        help="""
+            The engine running every scenario, overriding the configured ones.
+        """,
+    ),
+    no_cache: bool = typer.Option(
+        False,
+        "--no-cache",
+        help="""
+            Validate the configuration again, instead of reusing the validated
+            configuration cached by a previous run.
+        """,
+    ),
 ) -> None:
     """
     Launch the benchmark suite using the provided configuration.
@@ -439,6 +510,8 @@ def main(
 
     A --dryrun option is available that only prints out the execution plan
     and can be used to test a given options configuration.
+
+    Run `yasube compare --help` to compare the results of runs.
     """
 
     def validate_services(configuration: Dict, services: List[str]) -> None:
@@ -486,7 +559,8 @@ def main(
         ]
 
     try:
-        configuration = load_config(conf)
+        cache = None if no_cache else ConfigCache(default_cache_dir())
+        configuration = load_config(conf, cache)
         validate_services(configuration, services)
         validate_platform(configuration, platform)
 
@@ -505,12 +579,20 @@ def main(
         if platform:
             scenarios: List[ScenarioConfig] = compatible_scenarios(scenarios, platform)
             execution_plan = [
-                Execution(scenario, configuration["platforms"][platform])
+                Execution(
+                    scenario,
+                    configuration["platforms"][platform],
+                    configuration[RESOLVED_KEY][scenario["key"]]["platforms"][platform],
+                )
                 for scenario in scenarios
             ]
         else:
             execution_plan = [
-                Execution(scenario, scenario["default_platform"])
+                Execution(
+                    scenario,
+                    scenario["default_platform"],
+                    configuration[RESOLVED_KEY][scenario["key"]]["default_platform"],
+                )
                 for scenario in scenarios
             ]
 
@@ -518,6 +600,13 @@ def main(
             echo_execution_plan(execution_plan)
             sys.exit()
 
+        import urllib3
+
+        from yasube.shared.planner import Planner
+
+        # Silence ssl warnings
+        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
         custom_logging = configuration.get("logging")
         if custom_logging is not None:
             setup_logging(custom_logging)
@@ -527,8 +616,10 @@ def main(
             global_config["result_basepath"] = result_basepath
         if result_filename is not None:
             global_config["result_filename"] = result_filename
+        if sample_log is not None:
+            global_config["sample_log"] = sample_log
 
-        planner = Planner(execution_plan, global_config)
+        planner = Planner(execution_plan, global_config, engine.value if engine else None)
         planner.execute()
 
     except ConfigurationFileNotFound as e:
@@ -542,5 +633,18 @@ def main(
         raise typer.Exit(1)
 
 
+def cli() -> None:
+    """
+    Entry point of the yasube command: `yasube compare` compares the results
+    of runs, anything else runs the benchmark suite.
+    """
+    if sys.argv[1:2] == ["compare"]:
+        from yasube.bin import compare
+
+        compare.app(args=sys.argv[2:], prog_name="yasube compare")
+    else:
+        app()
+
+
 if __name__ == "__main__":
-    app()
+    cli()
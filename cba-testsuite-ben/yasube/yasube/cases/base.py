@@ -1,74 +1,449 @@
+import asyncio
 import datetime
 import time
-from shutil import copyfileobj
-from tempfile import NamedTemporaryFile
-from typing import List, Tuple, Union
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from timeit import default_timer as timer
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
 
-import prefect
 import requests
 from prefect.engine import signals
 
-from yasube.shared.metrics import Metric, MetricName, MetricUom
+from yasube.shared.latency import Watermark, product_latencies
+from yasube.shared.metrics import Metric, MetricName, MetricUom, Sample
+from yasube.shared.pagination import DEFAULT_PAGE_SIZE, Page, Traversal
+from yasube.shared.samples import sample_log
+from yasube.shared.sinks import DownloadSink, FileSink, Part, close_parts
 from yasube.shared.test_case import MaxRetryExceeded, TestCase
-from yasube.shared.url_helper import UrlHelper
+from yasube.shared.transport import RequestTimings
+from yasube.shared.url_helper import Template, UrlHelper
+from yasube.utils.json import response_json
+from yasube.utils.ranges import content_range_size, range_header, split_range
 from yasube.utils.urls import urlfilename
 
+if TYPE_CHECKING:
+    from yasube.engines.aio import AsyncResponse, AsyncTransport
+
+# Defaults of the polling of the latency test cases, in seconds
+DEFAULT_POLLING_DURATION = 600
+DEFAULT_POLLING_INTERVAL = 10
+
 
 # ------------------------------------------------------------------
 # Mixins
 # ------------------------------------------------------------------
 class GetMixin:
+    @property
+    def url_template(self) -> str:
+        """
+        Url of the requests of the test case, relative to the platform root uri
+        and before its templates and keys are replaced, which tells apart the
+        samples of the test cases requesting the same resource.
+        """
+        return self._meta.resource_path
+
     def get(
-        self, url: str, timeout: Union[float, None] = None, delay: Union[float, None] = None, stream: bool = False
-    ) -> Tuple[List[Metric], requests.Response]:
+        self,
+        url: str,
+        timeout: Union[float, None] = None,
+        delay: Union[float, None] = None,
+        stream: bool = False,
+        sink: Optional[DownloadSink] = None,
+        report: bool = True,
+    ) -> Tuple[List[Union[Metric, Sample]], requests.Response]:
+        """
+        Requests `url`, returning the metrics of the request and its response.
+        The sample of the request is reported right away, unless `report` is
+        False: callers that may still retry the request report it themselves,
+        see `_report_sample`.
+        """
+        response = None
+        sample = Sample()
+        slot = self._next_arrival_slot()
+        if slot is not None:
+            time.sleep(self.arrival_schedule.delay(slot))
+        try:
+            self.logger.info(f"Requesting url {url} with a timeout of {timeout} seconds")
+            with self._requesting(sample, slot):
+                response: requests.Response = self.platform.session.get(
+                    url=url, timeout=timeout, stream=stream, verify=self.platform.verify_ssl
+                )
+                self._check_response(response, sample, stream)
+                if stream:
+                    self._set_download_metrics(response, (sink or FileSink()).consume(response), sample)
+                else:
+                    self._set_payload_metrics(response, sample)
+        finally:
+            if stream and response is not None:
+                response.close()
+            if delay is not None:
+                time.sleep(delay)
+
+        if report:
+            self._report_sample(sample)
+        return [sample], response
+
+    async def aget(
+        self,
+        transport: "AsyncTransport",
+        url: str,
+        timeout: Union[float, None] = None,
+        delay: Union[float, None] = None,
+        stream: bool = False,
+        sink: Optional[DownloadSink] = None,
+        report: bool = True,
+    ) -> Tuple[List[Union[Metric, Sample]], "AsyncResponse"]:
+        """Same as `get`, but the request is issued on the event loop of the async engine."""
         response = None
-        metrics: List[Metric] = []
+        sample = Sample()
+        slot = self._next_arrival_slot()
+        if slot is not None:
+            await asyncio.sleep(self.arrival_schedule.delay(slot))
         try:
             self.logger.info(f"Requesting url {url} with a timeout of {timeout} seconds")
-            metrics.append(Metric(MetricName.START_TIME, MetricUom.DATETIME, datetime.datetime.utcnow()))
+            with self._requesting(sample, slot):
+                response = await transport.get(url, timeout=timeout, stream=stream)
+                self._check_response(response, sample, stream)
+                if stream:
+                    self._set_download_metrics(response, await (sink or FileSink()).aconsume(response), sample)
+                else:
+                    self._set_payload_metrics(response, sample)
+        finally:
+            if stream and response is not None:
+                response.close()
+            if delay is not None:
+                await asyncio.sleep(delay)
+
+        if report:
+            self._report_sample(sample)
+        return [sample], response
+
+    def get_payload(self, url: str, timeout: Union[float, None] = None) -> Tuple[Sample, Optional[Dict]]:
+        """
+        Requests the JSON payload at `url`, e.g. a page of results, returning the
+        sample of the request and the payload, None if the request failed.
+        Unlike `get`, the request is neither scheduled nor retried, so that it can
+        be issued many times within a single run of the test case.
+        """
+        sample = Sample()
+        payload = None
+        self.logger.debug(f"Requesting url {url}")
+        with self._requesting(sample, retried=False):
             response: requests.Response = self.platform.session.get(
-                url=url, timeout=timeout, stream=stream, verify=self.platform.verify_ssl
+                url=url, timeout=timeout, verify=self.platform.verify_ssl
             )
-            metrics.append(Metric(MetricName.HTTP_STATUS_CODE, MetricUom.CODE, response.status_code))
-            response.raise_for_status()
-            if stream:
-                filename = urlfilename(response)
-                self.logger.info(f"Start downloading {filename}")
-        except requests.exceptions.RequestException as exc:
-            try:
-                self.logger.error(f"Request failed, retrying: {exc}")
-                self.reraise_until_exhausted(exc)
-            except MaxRetryExceeded as exc:
-                # TODO We should add a metric with a shortened description of the occured error
-                # or find a way to let the error bubble up so that we can write it down into
-                # the results file.
-                self.logger.error(f"Request failed: {exc.original}")
-                metrics.append(Metric(MetricName.RESPONSE_TIME, MetricUom.MS, -1))
-                metrics.append(Metric(MetricName.SIZE, MetricUom.BYTES, -1))
-                metrics.append(Metric(MetricName.EXCEPTION, MetricUom.BOOLEAN, True))
-        else:
-            response_time = response.elapsed.total_seconds() * 1000
-            self.logger.debug(f"Response time: {response_time} ms")
-            metrics.append(Metric(MetricName.RESPONSE_TIME, MetricUom.MS, response_time))
-            metrics.append(Metric(MetricName.EXCEPTION, MetricUom.BOOLEAN, False))
-            if stream:
-                with NamedTemporaryFile() as fp:
-                    copyfileobj(response.raw, fp, length=1000)
-                    metrics.append(Metric(MetricName.END_TIME, MetricUom.DATETIME, datetime.datetime.utcnow()))
-                    filename = urlfilename(response)
-                    size = fp.tell()
-                    self.logger.info(f"Finished downloading {filename} of {size} bytes")
-                    metrics.append(Metric(MetricName.SIZE, MetricUom.BYTES, size))
-            else:
-                metrics.append(Metric(MetricName.END_TIME, MetricUom.DATETIME, datetime.datetime.utcnow()))
-                metrics.append(Metric(MetricName.SIZE, MetricUom.BYTES, len(response.content)))
+            payload = self._read_payload(response, sample)
+
+        self._report_sample(sample)
+        return sample, payload
 
+    async def aget_payload(
+        self, transport: "AsyncTransport", url: str, timeout: Union[float, None] = None
+    ) -> Tuple[Sample, Optional[Dict]]:
+        """Same as `get_payload`, but the request is issued on the event loop of the async engine."""
+        sample = Sample()
+        payload = None
+        self.logger.debug(f"Requesting url {url}")
+        with self._requesting(sample, retried=False):
+            response = await transport.get(url, timeout=timeout)
+            payload = self._read_payload(response, sample)
+
+        self._report_sample(sample)
+        return sample, payload
+
+    def get_ranged(
+        self,
+        url: str,
+        streams: int,
+        timeout: Union[float, None] = None,
+        sink: Optional[DownloadSink] = None,
+    ) -> Tuple[List[Union[Metric, Sample]], requests.Response]:
+        """
+        Downloads the resource at `url` in `streams` concurrent ranged requests,
+        then has the sink reassemble it.
+        A first request for a single byte tells the size of the resource: a server
+        not serving ranges answers it in full, which is downloaded in a single stream.
+        Along with the metrics of `get`, it reports the throughput of each stream
+        and the reassembly time.
+        """
+        sink = sink or FileSink()
+        response = None
+        parts: List[Part] = []
+        sample = Sample()
+        metrics: List[Union[Metric, Sample]] = [sample]
+        slot = self._next_arrival_slot()
+        if slot is not None:
+            time.sleep(self.arrival_schedule.delay(slot))
+        try:
+            self.logger.info(f"Requesting url {url} in {streams} streams with a timeout of {timeout} seconds")
+            with self._requesting(sample, slot):
+                response: requests.Response = self.platform.session.get(
+                    url=url, timeout=timeout, stream=True, verify=self.platform.verify_ssl, headers=range_header(0, 0)
+                )
+                size = self._check_range_response(response, sample)
+                if size is None:
+                    self._set_download_metrics(response, sink.consume(response), sample)
+                else:
+                    response.close()
+                    with ThreadPoolExecutor(max_workers=streams) as executor:
+                        futures = [
+                            executor.submit(self._get_range, url, byte_range, timeout, sink)
+                            for byte_range in split_range(size, streams)
+                        ]
+                    results = [future.exception() or future.result() for future in futures]
+                    self._assemble_ranges(response, results, parts, sink, sample, metrics)
         finally:
-            if delay is not None:
-                time.sleep(delay)
+            close_parts(parts)
+            if response is not None:
+                response.close()
 
+        self._report_sample(sample)
         return metrics, response
 
+    async def aget_ranged(
+        self,
+        transport: "AsyncTransport",
+        url: str,
+        streams: int,
+        timeout: Union[float, None] = None,
+        sink: Optional[DownloadSink] = None,
+    ) -> Tuple[List[Union[Metric, Sample]], "AsyncResponse"]:
+        """Same as `get_ranged`, but the requests are issued on the event loop of the async engine."""
+        sink = sink or FileSink()
+        response = None
+        parts: List[Part] = []
+        sample = Sample()
+        metrics: List[Union[Metric, Sample]] = [sample]
+        slot = self._next_arrival_slot()
+        if slot is not None:
+            await asyncio.sleep(self.arrival_schedule.delay(slot))
+        try:
+            self.logger.info(f"Requesting url {url} in {streams} streams with a timeout of {timeout} seconds")
+            with self._requesting(sample, slot):
+                response = await transport.get(url, timeout=timeout, stream=True, headers=range_header(0, 0))
+                size = self._check_range_response(response, sample)
+                if size is None:
+                    self._set_download_metrics(response, await sink.aconsume(response), sample)
+                else:
+                    response.close()
+                    ranges = [
+                        self._aget_range(transport, url, byte_range, timeout, sink)
+                        for byte_range in split_range(size, streams)
+                    ]
+                    results = await asyncio.gather(*ranges, return_exceptions=True)
+                    self._assemble_ranges(response, results, parts, sink, sample, metrics)
+        finally:
+            close_parts(parts)
+            if response is not None:
+                response.close()
+
+        self._report_sample(sample)
+        return metrics, response
+
+    def _get_range(
+        self, url: str, byte_range: Tuple[int, int], timeout: Union[float, None], sink: DownloadSink
+    ) -> Tuple[int, Part, float]:
+        """Downloads a range of the resource, returning its size, its part and its throughput in bytes/s."""
+        start = timer()
+        response = self.platform.session.get(
+            url=url, timeout=timeout, stream=True, verify=self.platform.verify_ssl, headers=range_header(*byte_range)
+        )
+        try:
+            self._raise_for_range(response, byte_range)
+            size, part = sink.consume_part(response)
+        finally:
+            response.close()
+        return size, part, size / ((timer() - start) or 1)
+
+    async def _aget_range(
+        self,
+        transport: "AsyncTransport",
+        url: str,
+        byte_range: Tuple[int, int],
+        timeout: Union[float, None],
+        sink: DownloadSink,
+    ) -> Tuple[int, Part, float]:
+        start = timer()
+        response = await transport.get(url, timeout=timeout, stream=True, headers=range_header(*byte_range))
+        try:
+            self._raise_for_range(response, byte_range)
+            size, part = await sink.aconsume_part(response)
+        finally:
+            response.close()
+        return size, part, size / ((timer() - start) or 1)
+
+    @staticmethod
+    def _raise_for_range(response: requests.Response, byte_range: Tuple[int, int]):
+        response.raise_for_status()
+        if response.status_code != 206:
+            raise requests.exceptions.RequestException(
+                f"Range {byte_range[0]}-{byte_range[1]} not served, got status {response.status_code}"
+            )
+
+    def _next_arrival_slot(self) -> Optional[float]:
+        """Returns the slot of the request in the arrival schedule, if any.
+        Retries are not scheduled, they are run as soon as possible."""
+        if self.arrival_schedule is None or (self.run_count or 1) > 1:
+            return None
+        return self.arrival_schedule.next_slot()
+
+    def _set_arrival_metrics(self, slot: Optional[float], sample: Sample):
+        """Sets the scheduled start time of the request and its queue time in ms.
+        Requests not scheduled are meant to start right away, so they never queue."""
+        if slot is None:
+            return
+        sample.scheduled_start_time = self.arrival_schedule.to_datetime(slot)
+        sample.queue_time = max(0.0, (time.monotonic() - slot) * 1000)
+
+    @contextmanager
+    def _requesting(self, sample: Sample, slot: Optional[float] = None, retried: bool = True) -> Iterator[None]:
+        """
+        Bookkeeping of the request whose I/O runs within the block, shared by the
+        sync and async requests: it is counted in flight, timed from its start,
+        and its failure recorded in the sample, raised again to retry the request
+        unless `retried` is False. Invalid JSON payloads fail requests that are
+        not retried.
+        """
+        errors = requests.exceptions.RequestException if retried else (requests.exceptions.RequestException, ValueError)
+        self.in_flight.start()
+        try:
+            sample.start_time = datetime.datetime.utcnow()
+            self._set_arrival_metrics(slot, sample)
+            yield
+        except errors as exc:
+            if retried:
+                self._set_failure_metrics(exc, sample)
+            else:
+                self._set_error_metrics(exc, sample)
+        finally:
+            self.in_flight.end()
+
+    def _check_response(self, response: requests.Response, sample: Sample, stream: bool = False):
+        sample.status_code = response.status_code
+        response.raise_for_status()
+        if stream:
+            self.logger.info(f"Start downloading {urlfilename(response)}")
+            self._set_success_metrics(response, sample)
+
+    def _read_payload(self, response: requests.Response, sample: Sample) -> Dict:
+        self._check_response(response, sample)
+        payload = response_json(response)
+        self._set_payload_metrics(response, sample)
+        return payload
+
+    def _check_range_response(self, response: requests.Response, sample: Sample) -> Optional[int]:
+        """Returns the size of the resource told by the first request of a ranged download,
+        None if the server does not serve ranges."""
+        self._check_response(response, sample, stream=True)
+        size = content_range_size(response)
+        if size is None and response.status_code == 206:
+            filename = urlfilename(response)
+            raise requests.exceptions.RequestException(f"Size of {filename} unknown, cannot split it in ranges")
+        if size is None:
+            self.logger.warning(f"Ranges not served for {urlfilename(response)}, downloading in a single stream")
+        return size
+
+    def _assemble_ranges(
+        self,
+        response: requests.Response,
+        results: List[Union[Tuple[int, Part, float], BaseException]],
+        parts: List[Part],
+        sink: DownloadSink,
+        sample: Sample,
+        metrics: List[Union[Metric, Sample]],
+    ):
+        """
+        Has the sink reassemble the ranges downloaded, or raises the error of
+        the first range that failed. The parts are gathered in `parts` until
+        reassembled, so that the caller closes them on failure.
+        """
+        ranges = [result for result in results if not isinstance(result, BaseException)]
+        parts.extend(part for _, part, _ in ranges)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        start = timer()
+        sink.assemble(response, list(parts))
+        parts.clear()
+        self._set_ranged_download_metrics(response, ranges, timer() - start, sample, metrics)
+
+    def _report_sample(self, sample: Sample):
+        """
+        Records the sample of a request that is not retried, along with the
+        other samples of the test case: its response time feeds the histogram
+        of the percentiles, which then describes the same requests as the
+        average and peak response times, and it is written to the sample log.
+        """
+        if sample.exception is False:
+            self.response_times.record(sample.response_time)
+        sample_log.put(self, sample)
+
+    def _set_failure_metrics(self, exc: requests.exceptions.RequestException, sample: Sample):
+        try:
+            self.logger.error(f"Request failed, retrying: {exc}")
+            self.reraise_until_exhausted(exc)
+        except MaxRetryExceeded as exc:
+            # TODO We should add a metric with a shortened description of the occured error
+            # or find a way to let the error bubble up so that we can write it down into
+            # the results file.
+            self._set_error_metrics(exc.original, sample)
+
+    def _set_error_metrics(self, exc: Exception, sample: Sample):
+        """Records the failure of a request that will not be retried."""
+        self.logger.error(f"Request failed: {exc}")
+        sample.response_time = -1
+        sample.corrected_response_time = -1
+        sample.size = -1
+        sample.exception = True
+        sample.error = type(exc).__name__
+
+    def _set_success_metrics(self, response: requests.Response, sample: Sample):
+        response_time = response.elapsed.total_seconds() * 1000
+        self.logger.debug(f"Response time: {response_time} ms")
+        sample.response_time = response_time
+        # The response time as seen by a client that meant to start the request on schedule,
+        # which does not hide the coordinated omission of the requests delayed by busy workers.
+        sample.corrected_response_time = (sample.queue_time or 0.0) + response_time
+        sample.exception = False
+
+    def _set_payload_metrics(self, response: requests.Response, sample: Sample):
+        self._set_success_metrics(response, sample)
+        sample.end_time = datetime.datetime.utcnow()
+        sample.size = len(response.content)
+        self._set_timing_metrics(response, sample)
+
+    def _set_download_metrics(self, response: requests.Response, size: int, sample: Sample):
+        sample.end_time = datetime.datetime.utcnow()
+        filename = urlfilename(response)
+        self.logger.info(f"Finished downloading {filename} of {size} bytes")
+        sample.size = size
+        self._set_timing_metrics(response, sample)
+
+    def _set_timing_metrics(self, response: requests.Response, sample: Sample):
+        """Sets the duration of the phases of the request, once its body has been read."""
+        timings: Optional[RequestTimings] = getattr(response, "timings", None)
+        if timings is None or timings.headers_received is None:
+            return
+        sample.dns_time = timings.dns * 1000
+        sample.connect_time = timings.connect * 1000
+        sample.tls_time = timings.tls * 1000
+        sample.time_to_first_byte = timings.ttfb * 1000
+        sample.transfer_time = (timer() - timings.headers_received) * 1000
+        sample.new_connection = timings.new_connection
+
+    def _set_ranged_download_metrics(
+        self,
+        response: requests.Response,
+        ranges: List[Tuple[int, Part, float]],
+        reassembly_time: float,
+        sample: Sample,
+        metrics: List[Union[Metric, Sample]],
+    ):
+        self._set_download_metrics(response, sum(size for size, _, _ in ranges), sample)
+        for _, _, throughput in ranges:
+            metrics.append(Metric(MetricName.STREAM_THROUGHPUT, MetricUom.BYTES_SEC, throughput))
+        metrics.append(Metric(MetricName.REASSEMBLY_TIME, MetricUom.MS, reassembly_time * 1000))
+
 
 # ------------------------------------------------------------------
 # Base classes
@@ -85,7 +460,8 @@ class BaseListTestCase(TestCase, GetMixin):
 
     The query (if any) is specified in the configuration file and can use a number of
     templates that will be replaced at runtime to allow for custom date range, random
-    product types or geographic information.
+    product types or geographic information. The templates are compiled as the test
+    case is set up, so that the first request does not load e.g. the country polygons.
     """
 
     class Meta:
@@ -93,18 +469,49 @@ class BaseListTestCase(TestCase, GetMixin):
         name = "Base test case for a list GET request"
         resource_path = None
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for template in (self.config.get("query"), self.config.get("filter")):
+            if template:
+                Template.compile(template)
+
     def build_url(self) -> str:
         return UrlHelper.build(self.platform.root_uri, self._meta.resource_path, self.config.get("query"))
 
+    @property
+    def url_template(self) -> str:
+        query = self.config.get("query")
+        return self._meta.resource_path if query is None else f"{self._meta.resource_path}?{query}"
+
     def run(self, index: int = 1, total: int = 1) -> Tuple[List[Metric], requests.Response]:
         self.logger.info(f"Request {index} out of {total}")
         metrics, response = self.get(
             self.build_url(),
             self.config.get("requests_timeout"),
             self.config.get("requests_delay"),
+            report=False,
         )
-        self._append_response_metrics(response, metrics)
+        return self._complete_run(metrics, response)
+
+    async def arun(
+        self, transport: "AsyncTransport", index: int = 1, total: int = 1
+    ) -> Tuple[List[Metric], "AsyncResponse"]:
+        self.logger.info(f"Request {index} out of {total}")
+        metrics, response = await self.aget(
+            transport,
+            self.build_url(),
+            self.config.get("requests_timeout"),
+            self.config.get("requests_delay"),
+            report=False,
+        )
+        return self._complete_run(metrics, response)
 
+    def _complete_run(
+        self, metrics: List[Metric], response: requests.Response
+    ) -> Tuple[List[Metric], requests.Response]:
+        # Requests returning no results may still be retried, and are only reported once kept
+        self._append_response_metrics(response, metrics)
+        self._report_sample(metrics[0])
         return metrics, response
 
     def append_extra_response_metrics(self, response: requests.Response, metrics: List[Metric]):
@@ -118,10 +525,10 @@ class BaseListTestCase(TestCase, GetMixin):
     def _append_total_read_results(self, response: requests.Response, metrics: List[Metric]):
         total_results = 0
         if response is not None and response.status_code == 200:
-            total_results = len(response.json()["value"])
+            total_results = len(response_json(response)["value"])
 
             if self.config.get("ensure_results"):
-                task_run_count = prefect.context.get("task_run_count")
+                task_run_count = self.run_count
                 if total_results == 0 and task_run_count <= self.max_retries:
                     self.logger.info(f"Found {total_results} items, retrying ({task_run_count}/{self.max_retries})...")
                     raise signals.RETRY
@@ -131,6 +538,191 @@ class BaseListTestCase(TestCase, GetMixin):
         metrics.append(Metric(MetricName.TOTAL_READ_RESULTS, MetricUom.COUNT, total_results))
 
 
+class BaseCatalogueTestCase(BaseListTestCase):
+    """
+    Base class for a catalogue test case.
+    Each run walks the whole catalogue matching the query, page by page, to
+    tell how fast it can be enumerated, see Traversal. When paging by offset,
+    up to `pages_in_flight` pages are requested at the same time once the
+    first one has told the total number of results.
+
+    The query is not expected to set $top and $skip, and should sort the
+    results so that pages do not overlap.
+    Pages are counted and dropped as they are received. Failed pages are not
+    retried: they count as errors and lower the coverage of the catalogue.
+    """
+
+    class Meta:
+        key = "Base Catalogue Test Case"
+        name = "Base test case for a paginated list of GET requests"
+        resource_path = None
+
+    def run(self, index: int = 1, total: int = 1) -> Tuple[List[Union[Metric, Sample]], None]:
+        self.logger.info(f"Traversal {index} out of {total}")
+        traversal = Traversal(self.build_url(), self.config)
+        timeout = self.config.get("requests_timeout")
+        traversal.add(*self._get_page(traversal.next_url(), timeout))
+        with ThreadPoolExecutor(max_workers=traversal.concurrency) as executor:
+            pending = set()
+            while True:
+                self._request_pages(traversal, pending, lambda url: executor.submit(self._get_page, url, timeout))
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    traversal.add(*future.result())
+
+        self._log_traversal(traversal)
+        return traversal.metrics, None
+
+    async def arun(
+        self, transport: "AsyncTransport", index: int = 1, total: int = 1
+    ) -> Tuple[List[Union[Metric, Sample]], None]:
+        self.logger.info(f"Traversal {index} out of {total}")
+        traversal = Traversal(self.build_url(), self.config)
+        timeout = self.config.get("requests_timeout")
+        traversal.add(*await self._aget_page(transport, traversal.next_url(), timeout))
+        pending = set()
+        while True:
+            self._request_pages(
+                traversal, pending, lambda url: asyncio.ensure_future(self._aget_page(transport, url, timeout))
+            )
+            if not pending:
+                break
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                traversal.add(*task.result())
+
+        self._log_traversal(traversal)
+        return traversal.metrics, None
+
+    @staticmethod
+    def _request_pages(traversal: Traversal, pending: Set, request: Callable[[str], Any]):
+        """Requests the next pages of the traversal, as long as fewer than its concurrency are pending."""
+        while len(pending) < traversal.concurrency and (url := traversal.next_url()) is not None:
+            pending.add(request(url))
+
+    def _get_page(self, url: str, timeout: Union[float, None]) -> Tuple[Sample, Optional[Page]]:
+        sample, payload = self.get_payload(url, timeout)
+        return sample, None if payload is None else Page.from_payload(payload)
+
+    async def _aget_page(
+        self, transport: "AsyncTransport", url: str, timeout: Union[float, None]
+    ) -> Tuple[Sample, Optional[Page]]:
+        sample, payload = await self.aget_payload(transport, url, timeout)
+        return sample, None if payload is None else Page.from_payload(payload)
+
+    def _log_traversal(self, traversal: Traversal):
+        self.logger.info(f"Read {traversal.read} items out of {traversal.total} in {traversal.requested} pages")
+
+
+class BaseLatencyTestCase(BaseListTestCase):
+    """
+    Base class for a data availability latency test case.
+    Each run polls the list endpoint for `polling_duration` seconds, every
+    `polling_interval` seconds, only asking for the products published since the
+    latest one seen, see Watermark: polling a busy endpoint stays cheap for both
+    sides. A full page is followed right away by the next poll.
+
+    The latencies of each product are computed as soon as it is seen, see
+    `product_latencies`. The first poll asks for the products published in the
+    last `polling_lookback` seconds, none by default, and the `filter` option
+    restricts the products polled, e.g. startswith(Name,'S1').
+    Failed polls are not retried: they count as errors and the next poll catches up.
+    """
+
+    class Meta:
+        key = "Base Latency Test Case"
+        name = "Base test case for polling the new products"
+        resource_path = None
+
+    def build_url(self, watermark: Watermark) -> str:
+        filters = [watermark.filter()]
+        if self.config.get("filter"):
+            filters.append(f"({Template.replace(self.config['filter'])})")
+        page_size = self.config.get("page_size", DEFAULT_PAGE_SIZE)
+        query = f"$filter={' and '.join(filters)}&$orderby=PublicationDate asc,Id asc&$top={page_size}"
+        return f"{UrlHelper.build(self.platform.root_uri, self._meta.resource_path)}?{query}"
+
+    @property
+    def url_template(self) -> str:
+        filter_ = self.config.get("filter")
+        return self._meta.resource_path if not filter_ else f"{self._meta.resource_path}?$filter={filter_}"
+
+    def get_watermark(self) -> Watermark:
+        lookback = datetime.timedelta(seconds=self.config.get("polling_lookback", 0))
+        return Watermark(datetime.datetime.now(datetime.timezone.utc) - lookback)
+
+    def run(self, index: int = 1, total: int = 1) -> Tuple[List[Union[Metric, Sample]], None]:
+        self.logger.info(f"Polling {index} out of {total}")
+        watermark = self.get_watermark()
+        timeout = self.config.get("requests_timeout")
+        metrics: List[Union[Metric, Sample]] = []
+        deadline = time.monotonic() + self.config.get("polling_duration", DEFAULT_POLLING_DURATION)
+        while True:
+            sample, payload = self.get_payload(self.build_url(watermark), timeout)
+            wait_time = self._next_poll(self._append_poll_metrics(watermark, sample, payload, metrics), deadline)
+            if wait_time is None:
+                break
+            time.sleep(wait_time)
+
+        return metrics, None
+
+    async def arun(
+        self, transport: "AsyncTransport", index: int = 1, total: int = 1
+    ) -> Tuple[List[Union[Metric, Sample]], None]:
+        self.logger.info(f"Polling {index} out of {total}")
+        watermark = self.get_watermark()
+        timeout = self.config.get("requests_timeout")
+        metrics: List[Union[Metric, Sample]] = []
+        deadline = time.monotonic() + self.config.get("polling_duration", DEFAULT_POLLING_DURATION)
+        while True:
+            sample, payload = await self.aget_payload(transport, self.build_url(watermark), timeout)
+            wait_time = self._next_poll(self._append_poll_metrics(watermark, sample, payload, metrics), deadline)
+            if wait_time is None:
+                break
+            await asyncio.sleep(wait_time)
+
+        return metrics, None
+
+    def _next_poll(self, full_page: bool, deadline: float) -> Optional[float]:
+        """Returns the seconds to wait for the next poll, None once the polling is over."""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        if full_page:
+            return 0.0
+        return min(self.config.get("polling_interval", DEFAULT_POLLING_INTERVAL), remaining)
+
+    def _append_poll_metrics(
+        self,
+        watermark: Watermark,
+        sample: Sample,
+        payload: Optional[Dict],
+        metrics: List[Union[Metric, Sample]],
+    ) -> bool:
+        """Appends the metrics of a poll, returning whether it got a full page."""
+        metrics.append(sample)
+        if payload is None:
+            return False
+
+        products = payload.get("value") or []
+        full_page = len(products) >= self.config.get("page_size", DEFAULT_PAGE_SIZE)
+        new_products = watermark.advance(products, full_page)
+        metrics.append(Metric(MetricName.TOTAL_READ_RESULTS, MetricUom.COUNT, len(new_products)))
+        for product in new_products:
+            availability, operational = product_latencies(product)
+            if availability is not None:
+                metrics.append(Metric(MetricName.DATA_AVAILABILITY_LATENCY, MetricUom.SECONDS, availability))
+            if operational is not None:
+                metrics.append(Metric(MetricName.DATA_OPERATIONAL_LATENCY, MetricUom.SECONDS, operational))
+        if new_products:
+            self.logger.info(f"Found {len(new_products)} new products, published up to {watermark.value.isoformat()}")
+
+        # The next page goes on from the last product of this one, see Watermark
+        return full_page
+
+
 class BaseDetailTestCase(TestCase, GetMixin):
     """
     Base class for detail test case.
@@ -148,16 +740,42 @@ class BaseDetailTestCase(TestCase, GetMixin):
     def build_url(self, pk: str) -> str:
         return UrlHelper.build(self.platform.root_uri, f"{self._meta.resource_path}({pk})")
 
+    @property
+    def url_template(self) -> str:
+        # Subclasses may add to the url, e.g. /$value
+        url = self.build_url("{pk}")
+        return url[len(self.platform.root_uri) :] if url.startswith(self.platform.root_uri) else url
+
     def run(self, pk: Union[str, int]) -> Tuple[List[Metric], requests.Response]:
         return self.get(self.build_url(pk))
 
+    async def arun(self, transport: "AsyncTransport", pk: Union[str, int]) -> Tuple[List[Metric], "AsyncResponse"]:
+        return await self.aget(transport, self.build_url(pk))
+
 
 class BaseDownloadTestCase(BaseDetailTestCase):
     """
     Base class for a download test case.
     It is similar to the parent class, but the response is streamed
-    to a temporary file and not read in memory.
+    to the download sink of the test case and not read in memory:
+    a temporary file by default, or nowhere with the discard sink.
+    With `download_streams` set, each product is downloaded in as many
+    concurrent ranged requests.
     """
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.download_sink = DownloadSink.from_config(self.config)
+
     def run(self, pk: Union[str, int]) -> Tuple[List[Metric], requests.Response]:
-        return self.get(self.build_url(pk), stream=True)
+        streams = self.config.get("download_streams", 1)
+        if streams > 1:
+            return self.get_ranged(self.build_url(pk), streams, sink=self.download_sink)
+        return self.get(self.build_url(pk), stream=True, sink=self.download_sink)
+
+    async def arun(self, transport: "AsyncTransport", pk: Union[str, int]) -> Tuple[List[Metric], "AsyncResponse"]:
+        streams = self.config.get("download_streams", 1)
+        if streams > 1:
+            return await self.aget_ranged(transport, self.build_url(pk), streams, sink=self.download_sink)
+        return await self.aget(transport, self.build_url(pk), stream=True, sink=self.download_sink)
+
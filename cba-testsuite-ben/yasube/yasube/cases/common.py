@@ -1,7 +1,8 @@
 import os
 from datetime import datetime
+from itertools import chain
 from random import choices, sample
-from typing import Callable, Dict, List, Tuple, Union
+from typing import Callable, Dict, List, Optional, Tuple, Union
 
 import prefect
 from prefect import task
@@ -9,9 +10,11 @@ from prefect.engine.results import LocalResult
 from prefect.engine.serializers import JSONSerializer
 from requests import Response
 
-from yasube.shared.metrics import Metric, MetricName
-from yasube.shared.reducers import MetricReducer
-from yasube.utils.strings import camel_to_snake
+from yasube.shared.concurrency import InFlight
+from yasube.shared.histograms import Histogram
+from yasube.shared.metrics import Metric, MetricName, MetricUom
+from yasube.shared.reducers import MetricColumns, get_reducer
+from yasube.utils.json import response_json
 
 FilterFunc = Callable[[Dict], bool]
 
@@ -22,9 +25,41 @@ def format_location(date, result_basepath, result_filename, task_name, **kwargs)
     # server that the flow runs on
     # TODO We might support templating from the YAML file to inject running time
     # variables into the final path
+    return result_location(result_basepath, result_filename)
+
+
+def result_location(result_basepath: str, result_filename: str) -> str:
     return f"{os.path.join(os.path.expanduser(result_basepath), result_filename)}"
 
 
+def build_test_results(
+    test_name: str, start_date: datetime, metrics: List[Metric], scenario: Optional[str] = None
+) -> Dict:
+    """Returns the content of the results file for the given reduced metrics, of the scenario with the given key."""
+    end_date = datetime.utcnow().replace(tzinfo=start_date.tzinfo)
+    duration = round((end_date - start_date).total_seconds(), 2)
+    return {
+        "testResults": [
+            {
+                "testName": test_name,
+                "scenario": scenario,
+                "startDate": start_date.isoformat(),
+                "endDate": end_date.isoformat(),
+                "duration": duration,
+                "metrics": [m.to_json() for m in metrics],
+            }
+        ],
+    }
+
+
+def save_results(location: str, results: Dict) -> None:
+    """Writes the results file the same way `write_metrics` does through its LocalResult.
+    Used by the engines running scenarios outside of a Prefect flow."""
+    os.makedirs(os.path.dirname(location), exist_ok=True)
+    with open(location, "wb") as f:
+        f.write(JSONSerializer().serialize(results))
+
+
 @task
 def check_response_status(response: Response, status_code: int = 200) -> bool:
     """Returns True or False whether the response status code matches the argument."""
@@ -34,7 +69,7 @@ def check_response_status(response: Response, status_code: int = 200) -> bool:
 @task
 def check_empty_response(response: Response, items_key: str = "value") -> bool:
     """Returns True or False whether the response bears no results."""
-    return response is not None and not bool(response.json().get(items_key))
+    return response is not None and not bool(response_json(response).get(items_key))
 
 
 @task
@@ -58,7 +93,7 @@ def pick_random_pks(
     will be repetions, otherwise the primary keys will be unique.
     """
     # We can assume response status code is 200
-    items = response.json()[items_key]
+    items = response_json(response)[items_key]
     if filter_by is None:
         filter_by = lambda x: True
     pks = [i[pk_key] for i in items if filter_by(i)]
@@ -87,40 +122,43 @@ def split_test_results(
 )
 def write_metrics(metrics: List[Metric]):
     """Writes the output."""
-    start_date = prefect.context.date
-    end_date = datetime.utcnow().replace(tzinfo=start_date.tzinfo)
-    duration = round((end_date - start_date).total_seconds(), 2)
-    return {
-        "testResults": [
-            {
-                "testName": prefect.context.flow_name,
-                "startDate": start_date.isoformat(),
-                "endDate": end_date.isoformat(),
-                "duration": duration,
-                "metrics": [m.to_json() for m in metrics],
-            }
-        ],
-    }
+    return build_test_results(prefect.context.flow_name, prefect.context.date, metrics, prefect.context.get("scenario"))
 
 
 @task
 def reduce_metrics(
-    expected_metrics: List[MetricName], test_metrics: List[Metric]
+    expected_metrics: List[MetricName],
+    test_metrics: List[Metric],
+    response_times: Histogram = None,
+    in_flight: InFlight = None,
 ) -> List[Metric]:
     """Returns a list of Metric objects by reducing the given `test_metrics`,
     following the `expected_metrics`.
     Typically those will involve average, peak or total values.
     Each expected metric is expected to have a correspondant implementation
     method in the MetricReducer class.
+    Metrics are grouped by name once, so that each reducer only goes through
+    the values it needs.
+    The histogram of `response_times` fed by the test case, if any, is made
+    available to reducers as a RESPONSE_TIME_HISTOGRAM metric, and so are the
+    requests `in_flight` as an IN_FLIGHT metric.
     """
+    if response_times is not None:
+        test_metrics = chain(
+            test_metrics,
+            [Metric(MetricName.RESPONSE_TIME_HISTOGRAM, MetricUom.MS, response_times)],
+        )
+    if in_flight is not None:
+        test_metrics = chain(test_metrics, [Metric(MetricName.IN_FLIGHT, MetricUom.COUNT, in_flight)])
+    columns = MetricColumns(test_metrics)
+
     results = []
     for metric in expected_metrics:
-        metric_name = camel_to_snake(metric.value)
-        try:
-            method = getattr(MetricReducer, f"reduce_{metric_name}")
-            results.append(method(test_metrics))
-        except AttributeError:
+        reducer = get_reducer(metric)
+        if reducer is None:
             logger = prefect.context.get("logger")
             logger.warning(f"No reducer implemented for metric {metric.name}")
+        else:
+            results.append(reducer(columns))
 
     return results
@@ -0,0 +1,232 @@
+import asyncio
+from datetime import timedelta
+from timeit import default_timer as timer
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+import requests
+from prefect.engine import signals
+
+from yasube.engines.base import Engine
+from yasube.shared.metrics import Metric
+from yasube.shared.platforms import AuthType, Platform
+from yasube.shared.test_case import TestCase, task_run_count
+from yasube.shared.transport import RequestTimings
+from yasube.utils.json import response_json
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class AsyncResponse:
+    """
+    Wraps an aiohttp response to look like a `requests.Response`, so that test
+    cases can gather their metrics regardless of the engine.
+    The body is read eagerly unless the request is streamed.
+    """
+
+    def __init__(
+        self,
+        raw: "aiohttp.ClientResponse",
+        elapsed: float,
+        content: Optional[bytes] = None,
+        timings: Optional[RequestTimings] = None,
+    ):
+        self.raw = raw
+        self.status_code = raw.status
+        self.reason = raw.reason
+        self.headers = raw.headers
+        self.url = str(raw.url)
+        self.elapsed = timedelta(seconds=elapsed)
+        self.content = content
+        self.timings = timings
+
+    def json(self):
+        return response_json(self)
+
+    def raise_for_status(self) -> None:
+        if 400 <= self.status_code < 600:
+            err = f"{self.status_code} Error: {self.reason} for url: {self.url}"
+            raise requests.exceptions.HTTPError(err, response=self)
+
+    async def iter_content(self, chunk_size: int) -> AsyncIterator[bytes]:
+        async for chunk in self.raw.content.iter_chunked(chunk_size):
+            yield chunk
+
+    def close(self) -> None:
+        self.raw.release()
+
+
+async def _on_dns_resolvehost_start(session, context, params):
+    context.dns_start = timer()
+
+
+async def _on_dns_resolvehost_end(session, context, params):
+    context.trace_request_ctx.dns = timer() - context.dns_start
+
+
+async def _on_connection_create_start(session, context, params):
+    context.connect_start = timer()
+
+
+async def _on_connection_create_end(session, context, params):
+    # The host is resolved while connecting, and aiohttp does not tell
+    # the TLS handshake apart: it is included in the connect time
+    timings = context.trace_request_ctx
+    timings.new_connection = True
+    timings.connect = max(0.0, timer() - context.connect_start - timings.dns)
+
+
+async def _on_connection_reuseconn(session, context, params):
+    context.trace_request_ctx.new_connection = False
+
+
+async def _on_request_headers_sent(session, context, params):
+    context.sent = timer()
+
+
+async def _on_request_end(session, context, params):
+    context.trace_request_ctx.received(context.sent)
+
+
+def timings_trace_config() -> "aiohttp.TraceConfig":
+    """Times the phases of each request into its trace request context, a RequestTimings."""
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_dns_resolvehost_start.append(_on_dns_resolvehost_start)
+    trace_config.on_dns_resolvehost_end.append(_on_dns_resolvehost_end)
+    trace_config.on_connection_create_start.append(_on_connection_create_start)
+    trace_config.on_connection_create_end.append(_on_connection_create_end)
+    trace_config.on_connection_reuseconn.append(_on_connection_reuseconn)
+    trace_config.on_request_headers_sent.append(_on_request_headers_sent)
+    trace_config.on_request_end.append(_on_request_end)
+    return trace_config
+
+
+class AsyncTransport:
+    """
+    Issues the requests of the test cases on an aiohttp session.
+    aiohttp errors are translated into their `requests` counterparts, so
+    that failures and retries are handled as in the Prefect engine.
+    """
+
+    def __init__(self, platform: Platform, limit: int):
+        self.platform = platform
+        self.limit = limit
+        self._session = None
+
+    @property
+    def session(self) -> "aiohttp.ClientSession":
+        # The session must be created from within the running event loop
+        if self._session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.platform.pool_maxsize or 0,
+                force_close=not self.platform.keep_alive,
+                ssl=None if self.platform.verify_ssl else False,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector, trace_configs=[timings_trace_config()], **self._get_auth_kwargs()
+            )
+        return self._session
+
+    def _get_auth_kwargs(self) -> Dict:
+        credentials = self.platform.auth["credentials"]
+        if self.platform.auth["type"] == AuthType.BASIC.value:
+            return {"auth": aiohttp.BasicAuth(credentials["username"], credentials["password"])}
+
+        # The token is set on each request, see `_get_auth_headers`
+        return {}
+
+    def _get_auth_headers(self) -> Dict:
+        if self.platform.auth["type"] == AuthType.BASIC.value:
+            return {}
+
+        # The token is fetched, and refreshed in the background, through the platform OAuth session
+        token = self.platform.session.token
+        return {"Authorization": f"Bearer {token['access_token']}"}
+
+    async def get(
+        self, url: str, timeout: Optional[float] = None, stream: bool = False, headers: Optional[Dict] = None
+    ) -> AsyncResponse:
+        client_timeout = aiohttp.ClientTimeout(total=None, sock_connect=timeout, sock_read=timeout)
+        timings = RequestTimings()
+        headers = {**self._get_auth_headers(), **(headers or {})}
+        try:
+            start = timer()
+            raw = await self.session.get(url, timeout=client_timeout, headers=headers, trace_request_ctx=timings)
+            elapsed = timer() - start
+            content = None if stream else await raw.read()
+        except asyncio.TimeoutError as exc:
+            raise requests.exceptions.Timeout(repr(exc))
+        except aiohttp.ClientConnectionError as exc:
+            raise requests.exceptions.ConnectionError(repr(exc))
+        except aiohttp.ClientError as exc:
+            raise requests.exceptions.RequestException(repr(exc))
+
+        return AsyncResponse(raw, elapsed, content, timings)
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+
+class AsyncEngine(Engine):
+    """
+    Runs test cases as coroutines on a single event loop.
+    Up to `num_workers` requests are kept in flight at the same time, without
+    paying for a thread or a Prefect task run per request. Test cases with an
+    arrival rate are not bounded, so that requests always start on schedule.
+    """
+
+    def __init__(self, platform: Platform, num_workers: int = 1):
+        if aiohttp is None:
+            raise ImportError("The async engine requires aiohttp: pip install yasube[async]")
+
+        super().__init__(platform, num_workers)
+        self.loop = asyncio.new_event_loop()
+        # Connections are not limited by the transport, as the number of requests
+        # in flight is already bounded by the engine, unless the platform sets
+        # a pool size per host
+        self.transport = AsyncTransport(platform, limit=0)
+
+    def call(self, test_case: TestCase, *args) -> Tuple[List[Metric], AsyncResponse]:
+        return self.loop.run_until_complete(self._call(test_case, *args))
+
+    def map(self, test_case: TestCase, *iterables: Iterable) -> List[Tuple[List[Metric], AsyncResponse]]:
+        return self.loop.run_until_complete(self._map(test_case, *iterables))
+
+    def close(self) -> None:
+        self.loop.run_until_complete(self.transport.close())
+        self.loop.close()
+
+    async def _map(self, test_case: TestCase, *iterables: Iterable) -> List[Tuple[List[Metric], AsyncResponse]]:
+        arguments = list(zip(*iterables))
+        # In open-loop mode requests are only paced by the arrival schedule
+        if test_case.arrival_schedule is not None:
+            semaphore = asyncio.Semaphore(len(arguments) or 1)
+        else:
+            semaphore = asyncio.Semaphore(self.num_workers)
+
+        async def bounded_call(*args):
+            async with semaphore:
+                return await self._call(test_case, *args)
+
+        return await asyncio.gather(*[bounded_call(*args) for args in arguments])
+
+    async def _call(self, test_case: TestCase, *args) -> Tuple[List[Metric], AsyncResponse]:
+        run_count = 1
+        while True:
+            # Every coroutine runs in its own context, so the run count is not shared
+            token = task_run_count.set(run_count)
+            try:
+                return await test_case.arun(self.transport, *args)
+            except (requests.exceptions.RequestException, signals.RETRY):
+                if not self.should_retry(test_case, run_count):
+                    raise
+            finally:
+                task_run_count.reset(token)
+
+            run_count += 1
+            if test_case.retry_delay is not None:
+                await asyncio.sleep(test_case.retry_delay.total_seconds())
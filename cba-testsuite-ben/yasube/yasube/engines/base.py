@@ -0,0 +1,66 @@
+from enum import Enum
+from typing import TYPE_CHECKING, Iterable, List, Tuple, Type
+
+from yasube.utils.module_loading import import_string
+
+if TYPE_CHECKING:
+    from requests import Response
+
+    from yasube.shared.metrics import Metric
+    from yasube.shared.platforms import Platform
+    from yasube.shared.test_case import TestCase
+
+
+class EngineType(Enum):
+    PREFECT = "prefect"
+    ASYNC = "async"
+    THREADS = "threads"
+
+
+# Engines are imported lazily, as they may rely on optional dependencies
+ENGINES = {
+    EngineType.ASYNC.value: "yasube.engines.aio.AsyncEngine",
+    EngineType.THREADS.value: "yasube.engines.threads.ThreadEngine",
+}
+
+
+class Engine:
+    """
+    Base class for the engines running scenarios without a Prefect flow.
+
+    An engine only knows how to run a test case, either once or mapped over
+    a list of arguments. The order in which test cases are run is up to the
+    scenario, see `TestScenario.get_metrics`.
+    """
+
+    def __init__(self, platform: "Platform", num_workers: int = 1):
+        self.platform = platform
+        self.num_workers = num_workers
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def call(self, test_case: "TestCase", *args) -> Tuple[List["Metric"], "Response"]:
+        """Runs the test case once, retrying it as configured."""
+        raise NotImplementedError
+
+    def map(self, test_case: "TestCase", *iterables: Iterable) -> List[Tuple[List["Metric"], "Response"]]:
+        """Runs the test case concurrently for each set of arguments taken from
+        the iterables, as the builtin `map` would do.
+        Results are returned in the order of the arguments."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    @staticmethod
+    def should_retry(test_case: "TestCase", run_count: int) -> bool:
+        """Mimics the retry policy of the Prefect task runner."""
+        return test_case.max_retries is not None and run_count <= test_case.max_retries
+
+
+def get_engine_class(engine: str) -> Type[Engine]:
+    return import_string(ENGINES[engine])
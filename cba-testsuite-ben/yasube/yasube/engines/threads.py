@@ -0,0 +1,53 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Tuple
+
+import requests
+from prefect.engine import signals
+
+from yasube.engines.base import Engine
+from yasube.shared.metrics import Metric
+from yasube.shared.platforms import Platform
+from yasube.shared.test_case import TestCase, task_run_count
+
+
+class ThreadEngine(Engine):
+    """
+    Runs test cases on a pool of `num_workers` threads, as the Prefect engine
+    does, but without a flow: a request costs a future instead of the task
+    run, states and context of a mapped Prefect task, which adds up at high
+    `requests_count`.
+    Test cases are retried with the same policy, and the scenarios write the
+    same results file.
+    """
+
+    def __init__(self, platform: Platform, num_workers: int = 1):
+        super().__init__(platform, num_workers)
+        self.executor = ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix="yasube")
+
+    def call(self, test_case: TestCase, *args) -> Tuple[List[Metric], requests.Response]:
+        return self._call(test_case, *args)
+
+    def map(self, test_case: TestCase, *iterables: Iterable) -> List[Tuple[List[Metric], requests.Response]]:
+        futures = [self.executor.submit(self._call, test_case, *args) for args in zip(*iterables)]
+        return [future.result() for future in futures]
+
+    def close(self) -> None:
+        self.executor.shutdown(cancel_futures=True)
+
+    def _call(self, test_case: TestCase, *args) -> Tuple[List[Metric], requests.Response]:
+        run_count = 1
+        while True:
+            # Worker threads do not share their context, so the run count is not shared
+            token = task_run_count.set(run_count)
+            try:
+                return test_case.run(*args)
+            except (requests.exceptions.RequestException, signals.RETRY):
+                if not self.should_retry(test_case, run_count):
+                    raise
+            finally:
+                task_run_count.reset(token)
+
+            run_count += 1
+            if test_case.retry_delay is not None:
+                time.sleep(test_case.retry_delay.total_seconds())
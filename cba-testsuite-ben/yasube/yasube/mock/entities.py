@@ -0,0 +1,186 @@
+import math
+import random
+import re
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from yasube.utils.dates import format_datetime, parse_datetime
+
+# Ids are UUIDs whose lowest bits hold the index of the entity, and the next ones its entity set
+INDEX_BITS = 64
+
+# Clauses of a $filter on the date of the entities, other clauses are ignored
+DATE_CLAUSE = re.compile(r"\b(?P<field>\w+) (?P<op>ge|gt|le|lt) (?P<value>\d{4}-\d\d-\d\dT[\d:.]+Z?)")
+
+
+def _epoch_ms(value: datetime) -> int:
+    return int(value.timestamp() * 1000)
+
+
+def _date(epoch_ms: int) -> str:
+    return format_datetime(datetime.fromtimestamp(epoch_ms / 1000, timezone.utc))
+
+
+class EntitySet:
+    """
+    Entities of an OData entity set, generated on demand from their index.
+
+    Entities are published one every `interval` milliseconds: `count` of them
+    were published when the server started, and more keep being published as it
+    runs, so that a catalogue can be of any size without holding it in memory,
+    and so that new products show up while polling.
+    Entities are sorted by publication date, which makes their index the position
+    of an entity in any list, whatever its $orderby.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        number: int,
+        build: Callable[[int, int, random.Random], Dict],
+        date_field: str,
+        count: int,
+        interval: int,
+        started: Optional[int] = None,
+    ):
+        self.name = name
+        self.number = number
+        self.build = build
+        self.date_field = date_field
+        self.interval = max(1, interval)
+        started = _epoch_ms(datetime.now(timezone.utc)) if started is None else started
+        # Publication date of the first entity, so that `count` of them are published at start
+        self.origin = started - (count - 1) * self.interval
+
+    def id(self, index: int) -> str:
+        return str(uuid.UUID(int=(self.number << INDEX_BITS) | index))
+
+    def index(self, key: str) -> Optional[int]:
+        """Returns the index of the entity with the given id, if it is one of this set."""
+        try:
+            value = uuid.UUID(key.strip("'")).int
+        except ValueError:
+            return None
+        if value >> INDEX_BITS != self.number:
+            return None
+        return value & ((1 << INDEX_BITS) - 1)
+
+    def published(self, now: Optional[float] = None) -> int:
+        """Number of entities published so far."""
+        now_ms = int((time.time() if now is None else now) * 1000)
+        return max(0, (now_ms - self.origin) // self.interval + 1)
+
+    def get(self, index: int) -> Dict:
+        published_ms = self.origin + index * self.interval
+        return self.build(index, published_ms, random.Random(index))
+
+    def find(self, key: str) -> Optional[Dict]:
+        index = self.index(key)
+        if index is None or index >= self.published():
+            return None
+        entity = self.get(index)
+        entity["Id"] = self.id(index)
+        return entity
+
+    def bounds(self, filter_: Optional[str]) -> Tuple[int, int]:
+        """Returns the range of indexes of the published entities matching the date clauses of the filter."""
+        lower, upper = 0, self.published()
+        for match in DATE_CLAUSE.finditer(filter_ or ""):
+            if match["field"] != self.date_field:
+                continue
+            value = parse_datetime(match["value"])
+            if value is None:
+                continue
+            # Position of the date between two publications
+            position = (_epoch_ms(value) - self.origin) / self.interval
+            if match["op"] == "ge":
+                lower = max(lower, math.ceil(position))
+            elif match["op"] == "gt":
+                lower = max(lower, math.floor(position) + 1)
+            elif match["op"] == "le":
+                upper = min(upper, math.floor(position) + 1)
+            else:
+                upper = min(upper, math.ceil(position))
+        return max(0, lower), max(0, upper)
+
+    def page(self, lower: int, upper: int) -> Iterator[Dict]:
+        for index in range(lower, upper):
+            entity = self.get(index)
+            entity["Id"] = self.id(index)
+            yield entity
+
+
+def product(index: int, published_ms: int, rng: random.Random, content_length: int) -> Dict:
+    # Products are sensed up to an hour before their publication, and processed a few minutes later
+    sensing_end = published_ms - rng.randint(10, 3600) * 1000
+    return {
+        "@odata.mediaContentType": "application/octet-stream",
+        "Name": f"S{rng.randint(1, 3)}A_MOCK_{index:012d}.SAFE.zip",
+        "ContentType": "application/octet-stream",
+        "ContentLength": content_length,
+        "OriginDate": _date(sensing_end + rng.randint(60, 600) * 1000),
+        "PublicationDate": _date(published_ms),
+        "EvictionDate": _date(published_ms + int(timedelta(days=30).total_seconds() * 1000)),
+        "Online": True,
+        "ContentDate": {"Start": _date(sensing_end - 25_000), "End": _date(sensing_end)},
+        "Checksum": [{"Algorithm": "MD5", "Value": f"{rng.getrandbits(128):032x}", "ChecksumDate": _date(published_ms)}],
+    }
+
+
+def session(index: int, published_ms: int, rng: random.Random) -> Dict:
+    return {
+        "SessionId": f"S1A_20_{index:010d}",
+        "NumChannels": 2,
+        "PublicationDate": _date(published_ms),
+        "Satellite": "S1A",
+        "StationUnitId": "00",
+        "DownlinkOrbit": 10_000 + index,
+        "AcquisitionId": f"{index:05d}_1",
+        "AntennaId": "MSP21",
+        "FrontEndId": "01",
+        "Retransfer": False,
+        "AntennaStatusOK": True,
+        "FrontEndStatusOK": True,
+        "DeliveryPushOK": True,
+    }
+
+
+def file(index: int, published_ms: int, rng: random.Random, content_length: int) -> Dict:
+    return {
+        "Name": f"DCS_20_S1A_{index:010d}_ch{index % 2 + 1}_DSDB_{index:05d}.raw",
+        "ContentLength": content_length,
+        "ChannelId": index % 2 + 1,
+        "BlockNumber": index // 2 + 1,
+        "FinalBlock": False,
+        "PublicationDate": _date(published_ms),
+        "EvictionDate": _date(published_ms + int(timedelta(days=7).total_seconds() * 1000)),
+        "Retransfer": False,
+    }
+
+
+def subscription(index: int, published_ms: int, rng: random.Random) -> Dict:
+    return {
+        "Status": rng.choice(["running", "paused"]),
+        "FilterParam": "startswith(Name,'S1')",
+        "SubmissionDate": _date(published_ms),
+        "LastNotificationDate": _date(published_ms + rng.randint(0, 3600) * 1000),
+        "NotificationEndpoint": "https://example.com/notifications",
+    }
+
+
+def entity_sets(count: int, interval: float, content_length: int) -> Dict[str, EntitySet]:
+    """Returns the entity sets served by the mock, by name."""
+    interval_ms = int(interval * 1000)
+    started = _epoch_ms(datetime.now(timezone.utc))
+    builders = [
+        ("Products", lambda i, p, r: product(i, p, r, content_length), "PublicationDate"),
+        ("Sessions", session, "PublicationDate"),
+        ("Files", lambda i, p, r: file(i, p, r, content_length), "PublicationDate"),
+        ("Subscriptions", subscription, "SubmissionDate"),
+    ]
+    return {
+        name: EntitySet(name, number, build, date_field, count, interval_ms, started)
+        for number, (name, build, date_field) in enumerate(builders, start=1)
+    }
@@ -0,0 +1,264 @@
+"""
+Local OData server standing in for a delivery point.
+
+It serves the list, detail and /$value endpoints of the Products, Sessions,
+Files and Subscriptions entity sets, with the latency, payload size and error
+rate given, behind basic or OAuth authentication. As it does next to no work
+per request, scenarios run against it measure the overhead of yasube itself,
+e.g. the highest rate of requests a single yasube process can sustain.
+
+    python -m yasube.mock.server --port 8080 --latency 0.05 --error-rate 0.01
+
+Its root uri is then http://127.0.0.1:8080/odata/v1/, and its token url
+http://127.0.0.1:8080/token.
+"""
+import base64
+import json
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from enum import Enum
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit
+
+import typer
+
+from yasube.mock.entities import EntitySet, entity_sets
+
+# Path of the requests to an entity set, e.g. /odata/v1/Products('<id>')/$value
+ENTITY_PATH = re.compile(r"/(?P<name>\w+)(?:\((?P<key>[^)]*)\))?(?P<value>/\$value)?/?$")
+
+# Bytes repeated to stream the content of the entities
+BLOCK_SIZE = 64 * 1024
+
+
+class MockAuth(Enum):
+    NONE = "none"
+    BASIC = "basic"
+    OAUTH = "oauth"
+
+
+@dataclass
+class MockOptions:
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    payload_size: int = 1024 * 1024
+    count: int = 1000
+    interval: float = 60.0
+    page_size: int = 100
+    max_page_size: int = 1000
+    auth: MockAuth = MockAuth.BASIC
+    username: str = "user"
+    password: str = "password"
+    token_lifetime: int = 3600
+    verbose: bool = False
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Connections waiting to be accepted, so that a burst of clients is not refused
+    request_queue_size = 1024
+
+    def __init__(self, address: Tuple[str, int], options: MockOptions):
+        super().__init__(address, MockRequestHandler)
+        self.options = options
+        self.entity_sets: Dict[str, EntitySet] = entity_sets(options.count, options.interval, options.payload_size)
+        self.block = bytes(range(256)) * (BLOCK_SIZE // 256)
+        # Tokens handed out, with the time they expire
+        self.tokens: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def issue_token(self) -> Dict:
+        token = secrets.token_urlsafe(24)
+        with self._lock:
+            now = time.time()
+            self.tokens = {t: expires for t, expires in self.tokens.items() if expires > now}
+            self.tokens[token] = now + self.options.token_lifetime
+        return {"access_token": token, "token_type": "Bearer", "expires_in": self.options.token_lifetime}
+
+    def is_valid_token(self, token: str) -> bool:
+        return self.tokens.get(token, 0) > time.time()
+
+    def handle_error(self, request, client_address) -> None:
+        # Clients may close a download before reading it to the end
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: MockServer
+
+    def log_message(self, format: str, *args) -> None:
+        if self.server.options.verbose:
+            super().log_message(format, *args)
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        form = dict(parse_qsl(self.rfile.read(length).decode()))
+        if not urlsplit(self.path).path.endswith("/token"):
+            return self.send_json(404, {"error": "not_found"})
+        if self.server.options.auth != MockAuth.OAUTH:
+            return self.send_json(400, {"error": "unsupported_grant_type"})
+        if form.get("grant_type") == "password":
+            # The password grant is checked against the configured user, clients are not
+            if (form.get("username"), form.get("password")) != (self.server.options.username, self.server.options.password):
+                return self.send_json(401, {"error": "invalid_grant"})
+        elif form.get("grant_type") != "client_credentials":
+            return self.send_json(400, {"error": "unsupported_grant_type"})
+        self.send_json(200, self.server.issue_token())
+
+    def do_GET(self) -> None:
+        if not self.is_authorized():
+            return self.send_json(401, {"error": "unauthorized"}, {"WWW-Authenticate": 'Basic realm="mock"'})
+
+        options = self.server.options
+        delay = options.latency + random.uniform(0, options.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        if options.error_rate and random.random() < options.error_rate:
+            return self.send_json(503, {"error": {"code": "503", "message": "Injected error"}})
+
+        url = urlsplit(self.path)
+        match = ENTITY_PATH.search(unquote(url.path))
+        entity_set = self.server.entity_sets.get(match["name"]) if match else None
+        if entity_set is None:
+            return self.send_json(404, {"error": {"code": "404", "message": f"No resource at {url.path}"}})
+        if match["key"] is None:
+            return self.send_list(entity_set, dict(parse_qsl(url.query)))
+
+        entity = entity_set.find(match["key"])
+        if entity is None:
+            return self.send_json(404, {"error": {"code": "404", "message": f"No entity {match['key']}"}})
+        if match["value"]:
+            return self.send_content(entity)
+        self.send_json(200, entity)
+
+    def is_authorized(self) -> bool:
+        options = self.server.options
+        authorization = self.headers.get("Authorization") or ""
+        scheme, _, credentials = authorization.partition(" ")
+        if options.auth == MockAuth.BASIC:
+            expected = base64.b64encode(f"{options.username}:{options.password}".encode()).decode()
+            return scheme == "Basic" and credentials == expected
+        if options.auth == MockAuth.OAUTH:
+            return scheme == "Bearer" and self.server.is_valid_token(credentials)
+        return True
+
+    def send_list(self, entity_set: EntitySet, query: Dict[str, str]) -> None:
+        options = self.server.options
+        top = min(int(query.get("$top", options.page_size)), options.max_page_size)
+        skip = int(query.get("$skip", 0))
+        lower, upper = entity_set.bounds(query.get("$filter"))
+        start = min(lower + skip, upper)
+        end = min(start + top, upper)
+        payload = {"value": list(entity_set.page(start, end))}
+        if query.get("$count") == "true":
+            payload["@odata.count"] = upper - lower
+        if end < upper:
+            link = urlencode({**query, "$skip": end - lower, "$count": "false"})
+            payload["@odata.nextLink"] = f"http://{self.headers.get('Host')}{urlsplit(self.path).path}?{link}"
+        self.send_json(200, payload)
+
+    def send_content(self, entity: Dict) -> None:
+        size = entity.get("ContentLength", self.server.options.payload_size)
+        start, end = 0, size - 1
+        byte_range = self.parse_range(size)
+        if byte_range is None:
+            self.send_response(200)
+        else:
+            start, end = byte_range
+            if start >= size or start > end:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Disposition", f'attachment; filename="{entity["Name"]}"')
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+
+        block = memoryview(self.server.block)
+        remaining = end - start + 1
+        offset = start % len(block)
+        while remaining > 0:
+            chunk = block[offset : offset + remaining]
+            self.wfile.write(chunk)
+            remaining -= len(chunk)
+            offset = 0
+
+    def parse_range(self, size: int) -> Optional[Tuple[int, int]]:
+        match = re.fullmatch(r"bytes=(\d*)-(\d*)", self.headers.get("Range") or "")
+        if match is None or not (match[1] or match[2]):
+            return None
+        if not match[1]:
+            # Suffix range: the last bytes of the content
+            return max(0, size - int(match[2])), size - 1
+        return int(match[1]), min(int(match[2] or size - 1), size - 1)
+
+    def send_json(self, status: int, payload: Dict, headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main(
+    host: str = typer.Option("127.0.0.1", help="Address to listen on."),
+    port: int = typer.Option(8080, help="Port to listen on."),
+    latency: float = typer.Option(0.0, help="Delay before answering each request, in seconds."),
+    jitter: float = typer.Option(0.0, help="Random delay added to the latency, up to this many seconds."),
+    error_rate: float = typer.Option(0.0, min=0, max=1, help="Fraction of the requests answered with a 503 error."),
+    payload_size: int = typer.Option(1024 * 1024, min=1, help="Size of the content of products and files, in bytes."),
+    count: int = typer.Option(1000, min=1, help="Number of entities of each set published at start."),
+    interval: float = typer.Option(60.0, help="Seconds between the publication of two entities of a set."),
+    page_size: int = typer.Option(100, min=1, help="Entities per page when $top is not given."),
+    max_page_size: int = typer.Option(1000, min=1, help="Entities per page at most, whatever the $top."),
+    auth: MockAuth = typer.Option(MockAuth.BASIC.value, help="Authentication required by the server."),
+    username: str = typer.Option("user", help="User of the basic authentication and of the password grant."),
+    password: str = typer.Option("password", help="Password of the basic authentication and of the password grant."),
+    token_lifetime: int = typer.Option(3600, help="Lifetime of the OAuth tokens, in seconds."),
+    verbose: bool = typer.Option(False, help="Log every request."),
+) -> None:
+    """Runs a local OData server standing in for a delivery point."""
+    options = MockOptions(
+        latency=latency,
+        jitter=jitter,
+        error_rate=error_rate,
+        payload_size=payload_size,
+        count=count,
+        interval=interval,
+        page_size=page_size,
+        max_page_size=max_page_size,
+        auth=auth,
+        username=username,
+        password=password,
+        token_lifetime=token_lifetime,
+        verbose=verbose,
+    )
+    server = MockServer((host, port), options)
+    typer.echo(f"Serving {', '.join(server.entity_sets)} on http://{host}:{port}/odata/v1/ with {auth.value} authentication")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -1,14 +1,24 @@
-from typing import Callable, Dict, List
+from itertools import repeat
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
 
 from prefect import Flow, case, flatten, unmapped
 
-from yasube.cases.base import BaseDetailTestCase, BaseListTestCase
+from yasube.cases.base import BaseCatalogueTestCase, BaseDetailTestCase, BaseLatencyTestCase, BaseListTestCase
 from yasube.cases.common import (check_empty_response, check_length,
                                  check_response_status, pick_random_pks,
                                  reduce_metrics, split_test_results,
                                  write_metrics)
-from yasube.shared.metrics import MetricName
+from yasube.shared.metrics import Metric, MetricName
 from yasube.shared.test_scenario import TestScenario
+from yasube.shared.typed_dicts import CaseConfig
+
+if TYPE_CHECKING:
+    from yasube.engines.base import Engine
+
+
+def flatten_metrics(metrics: List[List[Metric]]) -> List[Metric]:
+    """Same as Prefect `flatten`, for scenarios not running in a flow."""
+    return [metric for batch in metrics for metric in batch]
 
 
 class BaseTestListScenario(TestScenario):
@@ -23,6 +33,34 @@ class BaseTestListScenario(TestScenario):
             MetricName.TOTAL_READ_RESULTS,
         ]
 
+    def get_expected_metrics(self, config: CaseConfig) -> List[MetricName]:
+        """
+        Return the `expected_metrics` along with the ones enabled by the
+        configuration of the measured test case: those related to its
+        arrival rate or download streams, if any, and those listed in its
+        `metrics` option.
+        """
+        expected_metrics = list(self.expected_metrics)
+        extra_metrics = [MetricName(name) for name in config.get("metrics", [])]
+        if config.get("arrival_rate") is not None:
+            extra_metrics = [
+                MetricName.AVG_QUEUE_TIME,
+                MetricName.PEAK_QUEUE_TIME,
+                MetricName.AVG_CORRECTED_RESPONSE_TIME,
+                MetricName.PEAK_CORRECTED_RESPONSE_TIME,
+            ] + extra_metrics
+        if config.get("download_streams", 1) > 1:
+            extra_metrics = [
+                MetricName.AVG_STREAM_THROUGHPUT,
+                MetricName.MIN_STREAM_THROUGHPUT,
+                MetricName.AVG_REASSEMBLY_TIME,
+                MetricName.PEAK_REASSEMBLY_TIME,
+            ] + extra_metrics
+        for metric in extra_metrics:
+            if metric not in expected_metrics:
+                expected_metrics.append(metric)
+        return expected_metrics
+
     def get_list_test_case(self) -> BaseListTestCase:
         """
         Return the list test case instance, the primary task of the flow.
@@ -56,9 +94,70 @@ class BaseTestListScenario(TestScenario):
                 range(1, requests_count + 1), unmapped(requests_count)
             )
             metrics, _ = split_test_results(list_data, mapped_=True)
-            write_metrics(reduce_metrics(self.expected_metrics, flatten(metrics)))
+            expected_metrics = self.get_expected_metrics(list_test_case.config)
+            write_metrics(
+                reduce_metrics(
+                    expected_metrics,
+                    flatten(metrics),
+                    list_test_case.response_times,
+                    list_test_case.in_flight,
+                )
+            )
             return flow
 
+    def get_metrics(self, engine: "Engine") -> Optional[List[Metric]]:
+        list_test_case = self.get_list_test_case()
+        requests_count = list_test_case.config.get("requests_count", 1)
+        list_data = engine.map(
+            list_test_case, range(1, requests_count + 1), repeat(requests_count)
+        )
+        metrics, _ = split_test_results.run(list_data, mapped_=True)
+        expected_metrics = self.get_expected_metrics(list_test_case.config)
+        return reduce_metrics.run(
+            expected_metrics,
+            flatten_metrics(metrics),
+            list_test_case.response_times,
+            list_test_case.in_flight,
+        )
+
+
+class BaseTestCatalogueScenario(BaseTestListScenario):
+    """Walks the whole catalogue matching the query, as many times as requested."""
+
+    list_test_case_class: BaseCatalogueTestCase
+
+    @property
+    def expected_metrics(self) -> List[MetricName]:
+        return [
+            MetricName.AVG_RESPONSE_TIME,
+            MetricName.PEAK_RESPONSE_TIME,
+            MetricName.ERROR_RATE,
+            MetricName.TOTAL_RESULTS,
+            MetricName.TOTAL_READ_RESULTS,
+            MetricName.CATALOGUE_COVERAGE,
+            MetricName.PAGES_PER_SECOND,
+            MetricName.ITEMS_PER_SECOND,
+        ]
+
+
+class BaseTestLatencyScenario(BaseTestListScenario):
+    """Polls the new products for a while, measuring their latencies."""
+
+    list_test_case_class: BaseLatencyTestCase
+
+    @property
+    def expected_metrics(self) -> List[MetricName]:
+        return [
+            MetricName.AVG_RESPONSE_TIME,
+            MetricName.PEAK_RESPONSE_TIME,
+            MetricName.ERROR_RATE,
+            MetricName.TOTAL_READ_RESULTS,
+            MetricName.AVG_DATA_AVAILABILITY_LATENCY,
+            MetricName.MAX_DATA_AVAILABILITY_LATENCY,
+            MetricName.AVG_DATA_OPERATIONAL_LATENCY,
+            MetricName.MAX_DATA_OPERATIONAL_LATENCY,
+        ]
+
 
 class BaseTestDetailScenario(BaseTestListScenario):
     detail_test_case_class: BaseDetailTestCase
@@ -99,6 +198,14 @@ class BaseTestDetailScenario(BaseTestListScenario):
     def get_picking_filter(self, config: Dict) -> Callable[[Dict], bool]:
         return lambda x: True
 
+    def get_unpicked_metrics(self) -> List[Metric]:
+        """
+        Return the metrics written when the list request failed or found
+        nothing to pick, so that no detail request was issued.
+        """
+        # TODO Write errors instead
+        return []
+
     def get_flow(self) -> Flow:
         list_test_case = self.get_list_test_case()
         detail_test_case = self.get_detail_test_case()
@@ -118,14 +225,45 @@ class BaseTestDetailScenario(BaseTestListScenario):
                 with case(pks_count, True):
                     detail_data = detail_test_case.map(pks)
                     metrics, _ = split_test_results(detail_data, mapped_=True)
+                    expected_metrics = self.get_expected_metrics(detail_test_case.config)
                     write_metrics(
-                        reduce_metrics(self.expected_metrics, flatten(metrics))
+                        reduce_metrics(
+                            expected_metrics,
+                            flatten(metrics),
+                            detail_test_case.response_times,
+                            detail_test_case.in_flight,
+                        )
                     )
 
             with case(is_valid_response, True) and case(is_empty_response, True):
-                write_metrics([])  # TODO Write errors instead
+                write_metrics(self.get_unpicked_metrics())
 
             with case(is_valid_response, False):
-                write_metrics([])  # TODO Write errors instead
+                write_metrics(self.get_unpicked_metrics())
 
             return flow
+
+    def get_metrics(self, engine: "Engine") -> Optional[List[Metric]]:
+        list_test_case = self.get_list_test_case()
+        detail_test_case = self.get_detail_test_case()
+
+        list_data = engine.call(list_test_case)
+        _, response = split_test_results.run(list_data, mapped_=False)
+        if not check_response_status.run(response) or check_empty_response.run(response):
+            return self.get_unpicked_metrics()
+
+        requests_count = detail_test_case.config.get("requests_count", 1)
+        filter_by_callback = self.get_picking_filter(detail_test_case.config)
+        pks = pick_random_pks.run(response, requests_count, filter_by=filter_by_callback)
+        if not check_length.run(pks):
+            return None
+
+        detail_data = engine.map(detail_test_case, pks)
+        metrics, _ = split_test_results.run(detail_data, mapped_=True)
+        expected_metrics = self.get_expected_metrics(detail_test_case.config)
+        return reduce_metrics.run(
+            expected_metrics,
+            flatten_metrics(metrics),
+            detail_test_case.response_times,
+            detail_test_case.in_flight,
+        )
@@ -0,0 +1,67 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from enum import Enum
+from random import expovariate
+from typing import Optional
+
+from yasube.shared.typed_dicts import CaseConfig
+
+
+class ArrivalProcess(Enum):
+    CONSTANT = "constant"
+    POISSON = "poisson"
+
+
+class ArrivalSchedule:
+    """
+    Open-loop schedule of the requests of a test case.
+
+    Requests are started at the configured rate whether or not the previous
+    ones have completed: each request takes the next slot of the schedule and
+    waits for it if early. A request that is late, e.g. because all the workers
+    are busy, is started right away and its delay is recorded as queue time.
+
+    Slots are evenly spaced by default, or follow a Poisson process, i.e.
+    exponentially distributed inter-arrival times.
+    """
+
+    def __init__(self, rate: float, process: str = ArrivalProcess.CONSTANT.value):
+        self.rate = rate
+        self.process = process
+        self._lock = threading.Lock()
+        self._start: Optional[float] = None
+        self._offset = 0.0
+
+    @classmethod
+    def from_config(cls, config: CaseConfig) -> Optional["ArrivalSchedule"]:
+        rate = config.get("arrival_rate")
+        if rate is None:
+            return None
+        return cls(rate, config.get("arrival_process", ArrivalProcess.CONSTANT.value))
+
+    def _interval(self) -> float:
+        if self.process == ArrivalProcess.POISSON.value:
+            return expovariate(self.rate)
+        return 1 / self.rate
+
+    def next_slot(self) -> float:
+        """Takes the next slot, returning its time on the monotonic clock.
+        The schedule starts with the first slot taken."""
+        with self._lock:
+            now = time.monotonic()
+            if self._start is None:
+                self._start = now
+            slot = self._start + self._offset
+            self._offset += self._interval()
+        return slot
+
+    @staticmethod
+    def delay(slot: float) -> float:
+        """Returns the seconds to wait for the slot, 0 if already passed."""
+        return max(0.0, slot - time.monotonic())
+
+    @staticmethod
+    def to_datetime(slot: float) -> datetime:
+        """Converts a slot to a UTC datetime, comparable with START_TIME metrics."""
+        return datetime.utcnow() - timedelta(seconds=time.monotonic() - slot)
@@ -0,0 +1,397 @@
+"""
+Comparison of the results of a baseline run with those of candidate runs,
+e.g. before and after the upgrade of a platform.
+
+Results files only hold a reduced value per metric, whose delta is all that
+can be told. Sample logs hold the measures of every request, whose
+distributions are compared: the confidence interval of the delta of a
+statistic is bootstrapped, and the Mann-Whitney U test tells whether the
+candidate is slower or faster than the baseline beyond chance.
+"""
+import math
+import os
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from yasube.shared.metrics import MetricName, MetricUom
+from yasube.utils.json import loads
+
+# Scenario and test case of the results files, scenario, platform and test case of the sample logs
+Key = Tuple[str, ...]
+
+# Metrics compared by default from the sample logs
+DEFAULT_SAMPLE_METRICS = (
+    MetricName.RESPONSE_TIME.value,
+    MetricName.TIME_TO_FIRST_BYTE.value,
+    MetricName.TRANSFER_TIME.value,
+    MetricName.ERROR_RATE.value,
+)
+# Timings of the samples that can be compared, the error rate being computed from their exception
+SAMPLE_TIMINGS = (
+    MetricName.RESPONSE_TIME.value,
+    MetricName.CORRECTED_RESPONSE_TIME.value,
+    MetricName.QUEUE_TIME.value,
+    MetricName.DNS_TIME.value,
+    MetricName.CONNECT_TIME.value,
+    MetricName.TLS_TIME.value,
+    MetricName.TIME_TO_FIRST_BYTE.value,
+    MetricName.TRANSFER_TIME.value,
+)
+SAMPLE_KEYS = ("scenario", "platform", "case")
+
+# Units of the metrics that are better when lower, or higher
+LOWER_IS_BETTER = {MetricUom.MS.value, MetricUom.SECONDS.value}
+HIGHER_IS_BETTER = {MetricUom.BYTES_SEC.value, MetricUom.ITEMS_SEC.value, MetricUom.PAGES_SEC.value}
+
+# Values of the results files standing for metrics that could not be measured
+MISSING = -1
+
+# Resampled values gathered at once while bootstrapping, bounding its memory
+BOOTSTRAP_CHUNK = 2_000_000
+
+STATISTICS: Dict[str, Callable[..., np.ndarray]] = {
+    "median": lambda values, axis=None: np.median(values, axis=axis),
+    "mean": lambda values, axis=None: np.mean(values, axis=axis),
+    "p90": lambda values, axis=None: np.percentile(values, 90, axis=axis),
+    "p95": lambda values, axis=None: np.percentile(values, 95, axis=axis),
+    "p99": lambda values, axis=None: np.percentile(values, 99, axis=axis),
+}
+
+
+@dataclass
+class RunResults:
+    """Values of each metric of a run, by scenario and test case, with their unit."""
+
+    path: str
+    raw: bool
+    values: Dict[Key, Dict[str, np.ndarray]]
+    uoms: Dict[str, str]
+
+
+@dataclass
+class Comparison:
+    key: Key
+    metric: str
+    uom: str
+    baseline: float
+    candidate: float
+    # Relative delta in %, or in points for percentages
+    delta: float
+    low: Optional[float] = None
+    high: Optional[float] = None
+    p_value: Optional[float] = None
+    baseline_count: int = 1
+    candidate_count: int = 1
+    # 1 when higher is better, -1 when lower is better, 0 when it tells nothing of the performance
+    direction: int = 0
+    regression: bool = False
+    improvement: bool = False
+
+    @property
+    def relative(self) -> bool:
+        return self.uom != MetricUom.PERCENTAGE.value
+
+    def to_json(self) -> Dict:
+        return {
+            "key": list(self.key),
+            "metric": self.metric,
+            "uom": self.uom,
+            "baseline": self.baseline,
+            "candidate": self.candidate,
+            "delta": _finite(self.delta),
+            "deltaUom": "%" if self.relative else "points",
+            "confidenceInterval": None if self.low is None else [_finite(self.low), _finite(self.high)],
+            "pValue": self.p_value,
+            "baselineCount": self.baseline_count,
+            "candidateCount": self.candidate_count,
+            "regression": self.regression,
+            "improvement": self.improvement,
+        }
+
+
+def _finite(value: float) -> Optional[float]:
+    # A relative delta from zero is infinite, and not valid JSON
+    return value if math.isfinite(value) else None
+
+
+def metric_direction(metric: str, uom: str) -> int:
+    """Returns whether the metric is better when higher (1) or lower (-1), or 0 if it does not matter."""
+    if uom in LOWER_IS_BETTER:
+        return -1
+    if uom in HIGHER_IS_BETTER:
+        return 1
+    if uom == MetricUom.PERCENTAGE.value:
+        return -1 if metric.lower().endswith("errorrate") else 1
+    return 0
+
+
+def load_results(path: str, scenarios: Optional[Sequence[str]] = None) -> RunResults:
+    """Loads a results file, or a sample log when its name ends with .ndjson, .jsonl or .parquet."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".json":
+        return _load_results_file(path, scenarios)
+    if extension == ".parquet":
+        return _load_parquet_samples(path, scenarios)
+    return _load_ndjson_samples(path, scenarios)
+
+
+def _metric_value(value: Any) -> Optional[float]:
+    """Returns the number of a metric of a results file, None if it is not numeric."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str):
+        # e.g. the throughput, written as a string
+        try:
+            value = float(value)
+        except ValueError:
+            return None
+    if not isinstance(value, (int, float)) or not math.isfinite(value):
+        return None
+    return value
+
+
+def _load_results_file(path: str, scenarios: Optional[Sequence[str]]) -> RunResults:
+    with open(path, "rb") as f:
+        content = loads(f.read())
+    values: Dict[Key, Dict[str, np.ndarray]] = {}
+    uoms: Dict[str, str] = {}
+    for result in content.get("testResults", []):
+        # Results files written before the key of the scenario are told by its name
+        scenario = result.get("scenario") or result["testName"]
+        if scenarios and scenario not in scenarios:
+            continue
+        metrics = values.setdefault((scenario,), {})
+        for metric in result.get("metrics", []):
+            value = _metric_value(metric.get("value"))
+            if value is None or value == MISSING:
+                continue
+            metrics[metric["name"]] = np.array([value], dtype=float)
+            uoms[metric["name"]] = metric.get("uom", "")
+    return RunResults(path, False, values, uoms)
+
+
+def _load_ndjson_samples(path: str, scenarios: Optional[Sequence[str]]) -> RunResults:
+    keys: List[Key] = []
+    columns: Dict[str, List[float]] = {name: [] for name in SAMPLE_TIMINGS + (MetricName.EXCEPTION.value,)}
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = loads(line)
+            if scenarios and record.get("scenario") not in scenarios:
+                continue
+            keys.append(tuple(str(record.get(key)) for key in SAMPLE_KEYS))
+            for name, column in columns.items():
+                value = record.get(name)
+                column.append(math.nan if value is None else float(value))
+    arrays = {name: np.array(column, dtype=float) for name, column in columns.items()}
+    return RunResults(path, True, _group_samples(keys, arrays), _sample_uoms())
+
+
+def _load_parquet_samples(path: str, scenarios: Optional[Sequence[str]]) -> RunResults:
+    try:
+        import pyarrow.compute
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Parquet sample logs require pyarrow: pip install yasube[parquet]") from None
+
+    table = pyarrow.parquet.read_table(path)
+    if scenarios:
+        table = table.filter(pyarrow.compute.is_in(table.column("scenario"), value_set=pyarrow.array(list(scenarios))))
+    keys = [tuple(map(str, key)) for key in zip(*(table.column(key).to_pylist() for key in SAMPLE_KEYS))]
+    arrays = {}
+    for name in SAMPLE_TIMINGS + (MetricName.EXCEPTION.value,):
+        if name in table.column_names:
+            column = table.column(name).cast(pyarrow.float64())
+            arrays[name] = column.to_numpy(zero_copy_only=False).astype(float)
+        else:
+            arrays[name] = np.full(len(keys), math.nan)
+    return RunResults(path, True, _group_samples(keys, arrays), _sample_uoms())
+
+
+def _sample_uoms() -> Dict[str, str]:
+    uoms = {name: MetricUom.MS.value for name in SAMPLE_TIMINGS}
+    uoms[MetricName.ERROR_RATE.value] = MetricUom.PERCENTAGE.value
+    return uoms
+
+
+def _group_samples(keys: List[Key], columns: Dict[str, np.ndarray]) -> Dict[Key, Dict[str, np.ndarray]]:
+    """Returns the values of the metrics of the samples of each test case.
+    Timings are only those of the successful requests, failed ones are counted in the error rate."""
+    rows: Dict[Key, List[int]] = defaultdict(list)
+    for index, key in enumerate(keys):
+        rows[key].append(index)
+
+    failed = np.nan_to_num(columns[MetricName.EXCEPTION.value]) > 0
+    values: Dict[Key, Dict[str, np.ndarray]] = {}
+    for key, indexes in rows.items():
+        indexes = np.array(indexes)
+        group_failed = failed[indexes]
+        metrics = {MetricName.ERROR_RATE.value: group_failed * 100.0}
+        for name in SAMPLE_TIMINGS:
+            column = columns[name][indexes][~group_failed]
+            column = column[~np.isnan(column) & (column >= 0)]
+            if len(column):
+                metrics[name] = column
+        values[key] = metrics
+    return values
+
+
+def relative_delta(baseline: np.ndarray, candidate: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (candidate / baseline - 1) * 100
+
+
+def absolute_delta(baseline: np.ndarray, candidate: np.ndarray) -> np.ndarray:
+    return candidate - baseline
+
+
+def bootstrap_interval(
+    baseline: np.ndarray,
+    candidate: np.ndarray,
+    statistic: Callable[..., np.ndarray],
+    delta: Callable[[np.ndarray, np.ndarray], np.ndarray],
+    resamples: int,
+    confidence: float,
+    rng: np.random.Generator,
+) -> Tuple[float, float]:
+    """Returns the percentile bootstrap confidence interval of the delta of the statistic of the samples."""
+    deltas = np.empty(resamples)
+    rows = max(1, BOOTSTRAP_CHUNK // max(len(baseline), len(candidate)))
+    for start in range(0, resamples, rows):
+        count = min(rows, resamples - start)
+        baseline_stats = statistic(baseline[rng.integers(0, len(baseline), (count, len(baseline)))], axis=1)
+        candidate_stats = statistic(candidate[rng.integers(0, len(candidate), (count, len(candidate)))], axis=1)
+        deltas[start : start + count] = delta(baseline_stats, candidate_stats)
+    deltas = deltas[~np.isnan(deltas)]
+    if not len(deltas):
+        return math.nan, math.nan
+    tail = (1 - confidence) / 2 * 100
+    low, high = np.percentile(deltas, [tail, 100 - tail])
+    return float(low), float(high)
+
+
+def mann_whitney(baseline: np.ndarray, candidate: np.ndarray) -> float:
+    """
+    Returns the two-sided p-value of the Mann-Whitney U test of the samples,
+    with the normal approximation corrected for ties and continuity, which
+    holds from about 20 values per sample.
+    """
+    n1, n2 = len(baseline), len(candidate)
+    values = np.concatenate([baseline, candidate])
+    _, inverse, counts = np.unique(values, return_inverse=True, return_counts=True)
+    # Tied values share the average of their ranks
+    ends = np.cumsum(counts)
+    ranks = ((ends - counts + 1 + ends) / 2)[inverse]
+    u = ranks[:n1].sum() - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    ties = float((counts.astype(float) ** 3 - counts).sum())
+    variance = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    mean = n1 * n2 / 2
+    z = (abs(u - mean) - 0.5) / math.sqrt(variance)
+    return min(1.0, math.erfc(max(z, 0.0) / math.sqrt(2)))
+
+
+def compare_results(
+    baseline: RunResults,
+    candidate: RunResults,
+    metrics: Optional[Sequence[str]] = None,
+    statistic: str = "median",
+    thresholds: Optional[Dict[str, float]] = None,
+    default_threshold: float = 10.0,
+    alpha: float = 0.05,
+    confidence: float = 0.95,
+    resamples: int = 1000,
+    seed: Optional[int] = None,
+) -> List[Comparison]:
+    """
+    Compares each metric of the test cases of both runs.
+    A change is a regression when it is worse than the threshold of its metric,
+    relative in % or in points for percentages, and, when comparing samples,
+    significant at the `alpha` level.
+    """
+    thresholds = thresholds or {}
+    rng = np.random.default_rng(seed)
+    if metrics is None and baseline.raw:
+        metrics = DEFAULT_SAMPLE_METRICS
+
+    comparisons = []
+    for key in sorted(set(baseline.values) & set(candidate.values)):
+        baseline_metrics, candidate_metrics = baseline.values[key], candidate.values[key]
+        names = [name for name in baseline_metrics if name in candidate_metrics]
+        if metrics is not None:
+            names = [name for name in metrics if name in baseline_metrics and name in candidate_metrics]
+        for name in names:
+            comparison = _compare_metric(
+                key,
+                name,
+                baseline.uoms.get(name, candidate.uoms.get(name, "")),
+                baseline_metrics[name],
+                candidate_metrics[name],
+                # The error rate is the mean of the failures
+                STATISTICS["mean" if name == MetricName.ERROR_RATE.value else statistic],
+                baseline.raw and candidate.raw,
+                confidence,
+                resamples,
+                rng,
+            )
+            threshold = thresholds.get(name, default_threshold)
+            worse = -comparison.direction * comparison.delta
+            significant = comparison.p_value is None or comparison.p_value < alpha
+            comparison.regression = significant and worse > threshold
+            comparison.improvement = significant and -worse > threshold
+            comparisons.append(comparison)
+    return comparisons
+
+
+def _compare_metric(
+    key: Key,
+    name: str,
+    uom: str,
+    baseline: np.ndarray,
+    candidate: np.ndarray,
+    statistic: Callable[..., np.ndarray],
+    raw: bool,
+    confidence: float,
+    resamples: int,
+    rng: np.random.Generator,
+) -> Comparison:
+    delta = absolute_delta if uom == MetricUom.PERCENTAGE.value else relative_delta
+    baseline_value, candidate_value = float(statistic(baseline)), float(statistic(candidate))
+    comparison = Comparison(
+        key=key,
+        metric=name,
+        uom=uom,
+        baseline=baseline_value,
+        candidate=candidate_value,
+        delta=float(delta(np.float64(baseline_value), np.float64(candidate_value))),
+        baseline_count=len(baseline),
+        candidate_count=len(candidate),
+        direction=metric_direction(name, uom),
+    )
+    if math.isnan(comparison.delta):
+        # Both values are zero
+        comparison.delta = 0.0
+    if raw:
+        comparison.low, comparison.high = bootstrap_interval(
+            baseline, candidate, statistic, delta, resamples, confidence, rng
+        )
+        comparison.p_value = mann_whitney(baseline, candidate)
+    return comparison
+
+
+def parse_thresholds(values: Iterable[str], default: float) -> Tuple[float, Dict[str, float]]:
+    """Parses thresholds given as `<value>` for every metric, or `<metric>=<value>`."""
+    thresholds = {}
+    for value in values:
+        name, _, threshold = value.rpartition("=")
+        if name:
+            thresholds[name] = float(threshold)
+        else:
+            default = float(threshold)
+    return default, thresholds
@@ -0,0 +1,62 @@
+import threading
+import time
+from typing import Optional
+
+
+class InFlight:
+    """
+    Requests in flight over time, shared by all the runs of a test case like its
+    histogram of response times.
+
+    Only the running number of requests in flight is kept, along with its peak and
+    its integral over time, so that the memory stays flat whatever the number of
+    requests. Requests are issued by threads as well as by coroutines, hence the
+    lock around each change. Retried attempts are counted as well, and the sleeps
+    in between are not.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._level = 0
+        self._peak = 0
+        self._ended = 0
+        # Sum of each level times how long it lasted, from the first start to the last change
+        self._busy = 0.0
+        self._first: Optional[float] = None
+        self._last: Optional[float] = None
+
+    def _change(self, change: int) -> None:
+        with self._lock:
+            # Read under the lock, so that the instants of the changes are in order
+            instant = time.perf_counter()
+            if self._first is None:
+                self._first = instant
+            else:
+                self._busy += self._level * (instant - self._last)
+            self._last = instant
+            self._level += change
+            if change > 0:
+                self._peak = max(self._peak, self._level)
+            else:
+                self._ended += 1
+
+    def start(self) -> None:
+        self._change(1)
+
+    def end(self) -> None:
+        self._change(-1)
+
+    def average(self) -> Optional[float]:
+        """
+        Time-weighted average number of requests in flight, from the start of the
+        first request to the end of the last one, None if no request ended.
+        """
+        with self._lock:
+            if not self._ended:
+                return None
+            span = self._last - self._first
+            return self._busy / span if span > 0 else None
+
+    def peak(self) -> int:
+        """Highest number of requests in flight at the same time."""
+        return self._peak
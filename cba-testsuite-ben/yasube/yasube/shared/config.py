@@ -0,0 +1,128 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from copy import deepcopy
+from typing import Dict, Optional
+
+from yasube.shared.typed_dicts import PlatformConfig, ResolvedScenario, ScenarioConfig
+from yasube.utils.dicts import merge_dicts
+
+logger = logging.getLogger(__name__)
+
+# Bumped whenever the cached configurations change shape, to invalidate them
+CACHE_VERSION = 1
+
+# Key of the configuration holding the scenarios resolved on their platforms,
+# by scenario key, see resolve_scenarios
+RESOLVED_KEY = "resolved"
+
+
+def default_cache_dir() -> str:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(cache_home, "yasube")
+
+
+def resolve_scenario(scenario: ScenarioConfig, platform: PlatformConfig) -> ResolvedScenario:
+    """
+    Applies the overrides of the scenario set by the platform, if any.
+    The settings of the test cases are merged into those of the scenario, while
+    the number of workers and the engine are taken from the overrides, then from
+    the scenario: when both are missing, the platform settings apply.
+    Neither configuration is modified.
+    """
+    override = (platform.get("scenarios") or {}).get(scenario["key"], {})
+    resolved: ResolvedScenario = {
+        "cases": merge_dicts(deepcopy(scenario["cases"]), deepcopy(override.get("cases", {})))
+    }
+    for key in ("num_workers", "engine"):
+        value = override.get(key, scenario.get(key))
+        if value is not None:
+            resolved[key] = value
+    return resolved
+
+
+def resolve_scenarios(configuration: Dict) -> Dict[str, Dict]:
+    """
+    Resolves every scenario on its default platform and on its compatible
+    platforms, the latter by name:
+    {"TS01": {"default_platform": {...}, "platforms": {"LTA_ACRI_BASIC": {...}}}}
+    """
+    return {
+        scenario["key"]: {
+            "default_platform": resolve_scenario(scenario, scenario["default_platform"]),
+            "platforms": {
+                name: resolve_scenario(scenario, configuration["platforms"][name])
+                for name in scenario.get("compatible_platforms", [])
+            },
+        }
+        for scenario in configuration["scenarios"].values()
+    }
+
+
+class ConfigCache:
+    """
+    Validated configurations stored on disk, so that an unchanged configuration
+    file is neither parsed nor validated again by the next runs.
+
+    There is an entry per configuration file, holding the hash of the content
+    it was built from: the entry is rebuilt as soon as the file or the schema
+    it is validated against changes.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+
+    @staticmethod
+    def key(content: bytes, schema: Dict) -> str:
+        digest = hashlib.sha256(content)
+        digest.update(repr((CACHE_VERSION, schema)).encode())
+        return digest.hexdigest()
+
+    def _path(self, file_path: str) -> str:
+        name = hashlib.sha256(os.path.abspath(file_path).encode()).hexdigest()
+        return os.path.join(self.directory, f"config-{name}.json")
+
+    def get(self, file_path: str, key: str) -> Optional[Dict]:
+        if self.directory is None:
+            return None
+        try:
+            with open(self._path(file_path)) as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as exc:
+            logger.warning(f"Cannot read the configuration cache: {repr(exc)}")
+            return None
+        if entry.get("key") != key:
+            return None
+        return entry["configuration"]
+
+    def put(self, file_path: str, key: str, configuration: Dict) -> None:
+        if self.directory is None:
+            return
+        # JSON does not round-trip every YAML value, e.g. dates or non-string
+        # keys: such configurations are parsed again by every run instead
+        try:
+            content = json.dumps({"key": key, "configuration": configuration})
+            cacheable = json.loads(content)["configuration"] == configuration
+        except (TypeError, ValueError):
+            cacheable = False
+        if not cacheable:
+            logger.info(f"The configuration of {file_path} cannot be cached as JSON")
+            return
+        tmp_path = None
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # The configuration holds credentials: the entry is only readable by
+            # its owner, and replaced at once so that concurrent runs never read
+            # it half written
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                f.write(content)
+            os.replace(tmp_path, self._path(file_path))
+        except OSError as exc:
+            logger.warning(f"Cannot write the configuration cache: {repr(exc)}")
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
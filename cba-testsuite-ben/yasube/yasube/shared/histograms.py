@@ -0,0 +1,95 @@
+import math
+import threading
+from array import array
+
+
+class Histogram:
+    """
+    Fixed-memory histogram of positive values, following the HdrHistogram layout.
+
+    Values are counted in buckets whose width grows with their magnitude, so
+    that any percentile is known within a relative error of
+    10^-significant_figures, regardless of the number of recorded values.
+    The mean and the standard deviation are computed exactly, as values
+    are recorded.
+
+    Values are recorded in units of `resolution` (e.g. a resolution of 0.001
+    records milliseconds to the microsecond), up to `highest` units.
+    """
+
+    def __init__(self, resolution: float = 0.001, highest: int = 3_600_000_000, significant_figures: int = 3):
+        self.resolution = resolution
+        self.highest = highest
+        self.significant_figures = significant_figures
+
+        largest_single_unit = 2 * 10**significant_figures
+        self._sub_bucket_count_magnitude = math.ceil(math.log2(largest_single_unit))
+        self._sub_bucket_half_count_magnitude = self._sub_bucket_count_magnitude - 1
+        self._sub_bucket_count = 1 << self._sub_bucket_count_magnitude
+        self._sub_bucket_half_count = self._sub_bucket_count // 2
+        self._sub_bucket_mask = self._sub_bucket_count - 1
+
+        bucket_count = 1
+        smallest_untrackable = self._sub_bucket_count
+        while smallest_untrackable <= highest:
+            smallest_untrackable <<= 1
+            bucket_count += 1
+        self._counts = array("q", [0]) * ((bucket_count + 1) * self._sub_bucket_half_count)
+
+        self._lock = threading.Lock()
+        self.count = 0
+        self.max = 0.0
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def _index(self, units: int) -> int:
+        bucket_index = (units | self._sub_bucket_mask).bit_length() - self._sub_bucket_count_magnitude
+        sub_bucket_index = units >> bucket_index
+        return ((bucket_index + 1) << self._sub_bucket_half_count_magnitude) + sub_bucket_index - self._sub_bucket_half_count
+
+    def _highest_equivalent_units(self, index: int) -> int:
+        bucket_index = (index >> self._sub_bucket_half_count_magnitude) - 1
+        sub_bucket_index = (index & (self._sub_bucket_half_count - 1)) + self._sub_bucket_half_count
+        if bucket_index < 0:
+            sub_bucket_index -= self._sub_bucket_half_count
+            bucket_index = 0
+        return ((sub_bucket_index + 1) << bucket_index) - 1
+
+    def record(self, value: float) -> None:
+        """Records a value. Negative values, i.e. errors, are ignored."""
+        if value < 0:
+            return
+        units = min(round(value / self.resolution), self.highest)
+        index = self._index(units)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.max = max(self.max, value)
+            # Welford's online algorithm
+            delta = value - self._mean
+            self._mean += delta / self.count
+            self._m2 += delta * (value - self._mean)
+
+    @property
+    def mean(self) -> float:
+        return self._mean
+
+    @property
+    def stddev(self) -> float:
+        if self.count < 2:
+            return 0.0
+        return math.sqrt(self._m2 / self.count)
+
+    def percentile(self, percentile: float) -> float:
+        """Returns the value below which the given percentage of values fall,
+        within the precision of the histogram."""
+        if self.count == 0:
+            return 0.0
+        target = max(1, math.ceil(percentile / 100 * self.count))
+        cumulative = 0
+        for index, count in enumerate(self._counts):
+            cumulative += count
+            if cumulative >= target:
+                value = self._highest_equivalent_units(index) * self.resolution
+                return min(value, self.max)
+        return self.max
@@ -0,0 +1,81 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from yasube.utils.dates import format_datetime, parse_datetime
+
+
+def truncate_to_millis(value: datetime) -> datetime:
+    return value.replace(microsecond=value.microsecond // 1000 * 1000)
+
+
+def product_latencies(product: Dict) -> Tuple[Optional[float], Optional[float]]:
+    """
+    Returns the latencies of the product in seconds, None if they cannot be told:
+    - the data availability latency, from the end of the sensing to the publication
+    - the data operational latency, from the origin date (e.g. the publication on the
+      production service, for products of the LTA) to the publication
+    """
+    published = parse_datetime(product.get("PublicationDate"))
+    if published is None:
+        return None, None
+    sensing_end = parse_datetime((product.get("ContentDate") or {}).get("End"))
+    origin = parse_datetime(product.get("OriginDate"))
+    availability = (published - sensing_end).total_seconds() if sensing_end is not None else None
+    operational = (published - origin).total_seconds() if origin is not None else None
+    return availability, operational
+
+
+class Watermark:
+    """
+    Publication date of the latest product seen, so that each poll only asks for
+    the products published since.
+
+    Products are asked from the watermark included, as more products may be
+    published within the same millisecond afterwards, in any order of their
+    ids: those already seen are told apart by their id.
+    When a full page ends at the watermark, the next page goes on from the id
+    of its last product, ordered by publication date and id, so that more than
+    a page of products published within the same millisecond cannot stall the
+    polling. The next polls ask from the watermark included again.
+    """
+
+    def __init__(self, value: datetime):
+        self.value = truncate_to_millis(value)
+        self._seen: Set[str] = set()
+        # Id of the last product of a full page ending at the watermark
+        self._after: Optional[str] = None
+
+    def filter(self) -> str:
+        value = format_datetime(self.value)
+        if self._after is None:
+            return f"PublicationDate ge {value}"
+        # Ids are Guids, written without quotes
+        return f"(PublicationDate gt {value} or (PublicationDate eq {value} and Id gt {self._after}))"
+
+    def advance(self, products: List[Dict], full_page: bool = False) -> List[Dict]:
+        """
+        Returns the products not seen yet, moving the watermark to the latest of them.
+        `full_page` tells whether the page asked for was full, i.e. whether
+        more products may follow the last one.
+        """
+        new_products = []
+        last_published = None
+        for product in products:
+            published = parse_datetime(product.get("PublicationDate"))
+            if published is None:
+                continue
+            # The filter has a precision of milliseconds
+            published = last_published = truncate_to_millis(published)
+            if published < self.value or product.get("Id") in self._seen:
+                continue
+            new_products.append(product)
+            if published > self.value:
+                self.value = published
+                self._seen = set()
+            self._seen.add(product.get("Id"))
+        last_id = products[-1].get("Id") if products else None
+        if full_page and last_published == self.value and last_id is not None:
+            self._after = last_id
+        else:
+            self._after = None
+        return new_products
@@ -1,45 +1,81 @@
 from enum import Enum
-from typing import Any, Iterable
-
-from yasube.utils.json import ExtendedJSONEncoder
+from typing import Any, Iterable, Iterator, Tuple
 
 
 class MetricName(Enum):
     ANALYSIS_TIME = "analysisTime"
     AVG_CONCURRENCY = "avgConcurrency"
+    AVG_CONNECT_TIME = "avgConnectTime"
+    AVG_CORRECTED_RESPONSE_TIME = "avgCorrectedResponseTime"
     AVG_DATA_AVAILABILITY_LATENCY = "avgDataAvailabilityLatency"
     AVG_DATA_OPERATIONAL_LATENCY = "avgDataOperationalLatency"
+    AVG_DNS_TIME = "avgDnsTime"
     AVG_PRODUCT_RETENTION = "avgProductRetention"
+    AVG_QUEUE_TIME = "avgQueueTime"
+    AVG_REASSEMBLY_TIME = "avgReassemblyTime"
     AVG_RESPONSE_TIME = "avgResponseTime"
     AVG_SIZE = "avgSize"
+    AVG_STREAM_THROUGHPUT = "avgStreamThroughput"
+    AVG_TIME_TO_FIRST_BYTE = "avgTimeToFirstByte"
+    AVG_TLS_TIME = "avgTlsTime"
+    AVG_TRANSFER_TIME = "avgTransferTime"
     BEGIN_GET_RESPONSE_TIME = "beginGetResponseTime"
     CATALOGUE_COVERAGE = "catalogueCoverage"
+    CONNECT_TIME = "connectTime"
+    CORRECTED_RESPONSE_TIME = "correctedResponseTime"
+    DATA_AVAILABILITY_LATENCY = "dataAvailabilityLatency"
     DATA_COLLECTION_DIVISION = "dataCollectionDivision"
     DATA_COVERAGE = "dataCoverage"
     DATA_OFFER_CONSISTENCY = "dataOfferConsistency"
+    DATA_OPERATIONAL_LATENCY = "dataOperationalLatency"
+    DNS_TIME = "dnsTime"
     DOWNLOAD_ELAPSED_TIME = "downloadElapsedTime"
     END_GET_RESPONSE_TIME = "endGetResponseTime"
     END_TIME = "endTime"
+    ERROR = "error"
     ERROR_RATE = "errorRate"
     EXCEPTION = "exception"
     HTTP_STATUS_CODE = "httpStatusCode"
+    IN_FLIGHT = "inFlight"
+    ITEMS_PER_SECOND = "itemsPerSecond"
     MAX_DATA_AVAILABILITY_LATENCY = "maxDataAvailabilityLatency"
     MAX_DATA_OPERATIONAL_LATENCY = "maxDataOperationalLatency"
     MAX_RETRY_NUMBER = "maxRetryNumber"
     MAX_SIZE = "maxSize"
     MAX_TOTAL_RESULTS = "maxTotalResults"
+    MIN_STREAM_THROUGHPUT = "minStreamThroughput"
+    NEW_CONNECTION = "newConnection"
+    NEW_CONNECTIONS = "newConnections"
     OFFLINE_DATA_AVAILABILITY_LATENCY = "offlineDataAvailabilityLatency"
+    P50_RESPONSE_TIME = "p50ResponseTime"
+    P90_RESPONSE_TIME = "p90ResponseTime"
+    P95_RESPONSE_TIME = "p95ResponseTime"
+    P99_RESPONSE_TIME = "p99ResponseTime"
+    P999_RESPONSE_TIME = "p999ResponseTime"
+    PAGES_PER_SECOND = "pagesPerSecond"
     PEAK_CONCURRENCY = "peakConcurrency"
+    PEAK_CORRECTED_RESPONSE_TIME = "peakCorrectedResponseTime"
+    PEAK_QUEUE_TIME = "peakQueueTime"
+    PEAK_REASSEMBLY_TIME = "peakReassemblyTime"
     PEAK_RESPONSE_TIME = "peakResponseTime"
     PRODUCT_RETENTION = "ProductRetention"
     QUERY_TIME = "queryTime"
+    QUEUE_TIME = "queueTime"
+    REASSEMBLY_TIME = "reassemblyTime"
     RESPONSE_RATE = "responseRate"
     RESPONSE_TIME = "responseTime"
+    RESPONSE_TIME_HISTOGRAM = "responseTimeHistogram"
     RESULTS_ERROR_RATE = "resultsErrorRate"
     RETRY_NUMBER = "retryNumber"
+    REUSED_CONNECTIONS = "reusedConnections"
+    SCHEDULED_START_TIME = "scheduledStartTime"
     SIZE = "size"
     START_TIME = "startTime"
+    STD_RESPONSE_TIME = "stdResponseTime"
+    STREAM_THROUGHPUT = "streamThroughput"
     THROUGHPUT = "throughput"
+    TIME_TO_FIRST_BYTE = "timeToFirstByte"
+    TLS_TIME = "tlsTime"
     TOTAL_ONLINE_RESULTS = "totalOnlineResults"
     TOTAL_READ_RESULTS = "totalReadResults"
     TOTAL_REFERENCE_RESULTS = "totalReferenceResults"
@@ -47,6 +83,7 @@ class MetricName(Enum):
     TOTAL_SIZE = "totalSize"
     TOTAL_VALIDATED_RESULTS = "totalValidatedResults"
     TOTAL_WRONG_RESULTS = "totalWrongResults"
+    TRANSFER_TIME = "transferTime"
     URL = "url"
     WRONG_RESULTS_COUNT = "wrongResultsCount"
 
@@ -59,11 +96,17 @@ class MetricUom(Enum):
     COUNT = "#"
     DATETIME = "dateTime"
     DAYS = "days"
+    ITEMS_SEC = "items/s"
     MS = "ms"
+    PAGES_SEC = "pages/s"
     PERCENTAGE = "%"
+    SECONDS = "s"
+    TEXT = "text"
+
 
+class Metric:
+    __slots__ = ("name", "uom", "value")
 
-class Metric(ExtendedJSONEncoder):
     def __init__(self, name: MetricName, uom: MetricUom, value: Any = None):
         self.name = name
         self.uom = uom
@@ -96,3 +139,46 @@ class Metric(ExtendedJSONEncoder):
             "uom": self.uom.value,
             "value": self.value,
         }
+
+
+class Sample:
+    """
+    Compact record of the metrics of a single request, filled in directly by
+    the test cases. Until reduction, it stands for the START_TIME,
+    RESPONSE_TIME, SIZE, etc. metrics of the request, at a fraction of the
+    memory of as many Metric objects.
+
+    Fields left to None have not been measured.
+    """
+
+    FIELDS = {
+        "start_time": (MetricName.START_TIME, MetricUom.DATETIME),
+        "scheduled_start_time": (MetricName.SCHEDULED_START_TIME, MetricUom.DATETIME),
+        "queue_time": (MetricName.QUEUE_TIME, MetricUom.MS),
+        "status_code": (MetricName.HTTP_STATUS_CODE, MetricUom.CODE),
+        "response_time": (MetricName.RESPONSE_TIME, MetricUom.MS),
+        "corrected_response_time": (MetricName.CORRECTED_RESPONSE_TIME, MetricUom.MS),
+        "exception": (MetricName.EXCEPTION, MetricUom.BOOLEAN),
+        "error": (MetricName.ERROR, MetricUom.TEXT),
+        "end_time": (MetricName.END_TIME, MetricUom.DATETIME),
+        "size": (MetricName.SIZE, MetricUom.BYTES),
+        "dns_time": (MetricName.DNS_TIME, MetricUom.MS),
+        "connect_time": (MetricName.CONNECT_TIME, MetricUom.MS),
+        "tls_time": (MetricName.TLS_TIME, MetricUom.MS),
+        "time_to_first_byte": (MetricName.TIME_TO_FIRST_BYTE, MetricUom.MS),
+        "transfer_time": (MetricName.TRANSFER_TIME, MetricUom.MS),
+        "new_connection": (MetricName.NEW_CONNECTION, MetricUom.BOOLEAN),
+    }
+
+    __slots__ = tuple(FIELDS)
+
+    def __init__(self):
+        for field in self.__slots__:
+            setattr(self, field, None)
+
+    def items(self) -> Iterator[Tuple[MetricName, Any]]:
+        """Yields the name and the value of the measured metrics."""
+        for field, (name, _) in self.FIELDS.items():
+            value = getattr(self, field)
+            if value is not None:
+                yield name, value
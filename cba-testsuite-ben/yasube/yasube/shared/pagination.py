@@ -0,0 +1,119 @@
+from enum import Enum
+from typing import Dict, List, NamedTuple, Optional, Union
+from urllib.parse import urljoin
+
+from yasube.shared.metrics import Metric, MetricName, MetricUom, Sample
+from yasube.shared.typed_dicts import CaseConfig
+
+# Number of items requested per page
+DEFAULT_PAGE_SIZE = 100
+
+
+class Pagination(Enum):
+    # Pages are requested by offset, several of them in flight at the same time
+    SKIP = "skip"
+    # Pages are requested one after the other, following the next link of each page
+    NEXT_LINK = "next_link"
+
+
+class Page(NamedTuple):
+    """What is kept of a page of results: its payload is dropped once counted."""
+
+    items: int
+    count: Optional[int]
+    next_link: Optional[str]
+
+    @classmethod
+    def from_payload(cls, payload: Dict, items_key: str = "value") -> "Page":
+        return cls(len(payload.get(items_key) or []), payload.get("@odata.count"), payload.get("@odata.nextLink"))
+
+
+class Traversal:
+    """
+    State of the traversal of a catalogue, page by page.
+
+    The first page is requested along with the total number of results. The
+    next ones are requested by offset or by following the next links, until
+    the catalogue is exhausted, i.e. a page has no next link, or is empty or
+    the total is reached when paging by offset, or `max_pages` have been
+    requested.
+    When paging by offset, the offset of the next pages is stepped by the
+    number of items of the first page, as servers may serve fewer items per
+    page than requested.
+    When the total is unknown and a page fails, the end of the catalogue cannot
+    be told: the traversal stops.
+
+    The metrics of each page are appended as soon as it is received: the
+    sample of the request, and the number of items read.
+    """
+
+    def __init__(self, url: str, config: CaseConfig):
+        self.url = url
+        self.page_size = config.get("page_size", DEFAULT_PAGE_SIZE)
+        self.pages_in_flight = config.get("pages_in_flight", 1)
+        self.max_pages = config.get("max_pages")
+        self.pagination = Pagination(config.get("pagination", Pagination.SKIP.value))
+        self.metrics: List[Union[Metric, Sample]] = []
+        self.total: Optional[int] = None
+        self.requested = 0
+        self.read = 0
+        self._skip = 0
+        # Items per page actually served, known from the first page
+        self._step: Optional[int] = None
+        self._next_link: Optional[str] = None
+        self._exhausted = False
+
+    @property
+    def concurrency(self) -> int:
+        """Number of pages in flight: next links can only be followed one at a time."""
+        if self.pagination == Pagination.NEXT_LINK:
+            return 1
+        return self.pages_in_flight
+
+    def first_url(self) -> str:
+        return self._page_url(0, count=True)
+
+    def next_url(self) -> Optional[str]:
+        """Returns the url of the next page to request, if any."""
+        if self._exhausted or (self.max_pages is not None and self.requested >= self.max_pages):
+            return None
+        if self.pagination == Pagination.NEXT_LINK:
+            if self.requested and self._next_link is None:
+                return None
+            url = urljoin(self.url, self._next_link) if self._next_link else self.first_url()
+            self._next_link = None
+        else:
+            if self.total is not None and self._skip >= self.total:
+                return None
+            url = self._page_url(self._skip, count=self._skip == 0)
+            self._skip += self._step or self.page_size
+        self.requested += 1
+        return url
+
+    def add(self, sample: Sample, page: Optional[Page]) -> None:
+        """Records a page, None if its request failed."""
+        self.metrics.append(sample)
+        if page is None:
+            self._exhausted = self._exhausted or self.total is None
+            return
+
+        self.read += page.items
+        self.metrics.append(Metric(MetricName.TOTAL_READ_RESULTS, MetricUom.COUNT, page.items))
+        if self.total is None and page.count is not None:
+            self.total = page.count
+            self.metrics.append(Metric(MetricName.TOTAL_RESULTS, MetricUom.COUNT, page.count))
+        if self.pagination == Pagination.NEXT_LINK:
+            self._next_link = page.next_link
+        elif page.items == 0:
+            self._exhausted = True
+        elif self._step is None:
+            # Only the first page has been requested so far
+            self._step = min(page.items, self.page_size)
+            self._skip = self._step
+
+    def _page_url(self, skip: int, count: bool = False) -> str:
+        separator = "&" if "?" in self.url else "?"
+        url = f"{self.url}{separator}$top={self.page_size}&$skip={skip}"
+        if count:
+            url = f"{url}&$count=true"
+        return url
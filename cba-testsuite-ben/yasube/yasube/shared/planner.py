@@ -1,29 +1,20 @@
 import logging
-from typing import List, NamedTuple, Type
+import os
+from typing import Optional, Type
 
 import prefect
 from prefect.executors import LocalDaskExecutor
 
+from yasube.engines.base import EngineType, get_engine_class
+from yasube.shared.config import resolve_scenario
 from yasube.shared.platforms import Platform
+from yasube.shared.samples import sample_log
 from yasube.shared.test_scenario import TestScenario
-from yasube.shared.typed_dicts import (
-    CaseConfig,
-    GlobalConfig,
-    PlatformConfig,
-    ScenarioConfig,
-)
-from yasube.utils.dicts import merge_dicts
+from yasube.shared.tokens import token_cache
+from yasube.shared.typed_dicts import ExecutionPlan, GlobalConfig
 from yasube.utils.module_loading import import_string
 
 
-class Execution(NamedTuple):
-    scenario: ScenarioConfig
-    platform: PlatformConfig
-
-
-ExecutionPlan = List[Execution]
-
-
 logger = logging.getLogger()
 
 
@@ -32,9 +23,11 @@ class Planner:
     Class responsible for scenarios execution.
     """
 
-    def __init__(self, execution_plan: ExecutionPlan, config: GlobalConfig):
+    def __init__(self, execution_plan: ExecutionPlan, config: GlobalConfig, engine: Optional[str] = None):
         self.execution_plan = execution_plan
         self.config = config
+        # Engine of every scenario of the run, overriding the configured ones
+        self.engine = engine
 
     def _load_scenario(self, path: str) -> Type[TestScenario]:
         try:
@@ -43,27 +36,40 @@ class Planner:
             logger.error(repr(exc))
 
     def execute(self):
-        for scenario_config, platform_config in self.execution_plan:
+        token_cache_path = self.config.get("token_cache")
+        if token_cache_path is not None:
+            token_cache.path = os.path.expanduser(token_cache_path)
+
+        sample_log_path = self.config.get("sample_log")
+        if sample_log_path is not None:
+            sample_log.open(os.path.expanduser(sample_log_path))
+        try:
+            self._execute_plan()
+        finally:
+            # Samples still queued are written even if a scenario crashed the run
+            sample_log.close()
+
+    def _execute_plan(self):
+        for scenario_config, platform_config, resolved in self.execution_plan:
             scenario_class = self._load_scenario(scenario_config["path"])
             if scenario_class is None:
                 msg = f"Scenario '{scenario_config['path']}' not found, skipping"
                 logger.warn(msg)
                 continue
 
-            # This will prioritize possible platform specific configuration
-            custom_scenario_override: ScenarioConfig = platform_config.pop(
-                "scenarios", {}
-            ).get(scenario_config["key"], {})
-            custom_cases_config: CaseConfig = custom_scenario_override.get("cases", {})
-            scenario_config["cases"] = merge_dicts(
-                scenario_config["cases"], custom_cases_config
-            )
+            # This will prioritize possible platform specific configuration,
+            # usually resolved once along with the validation of the configuration
+            if resolved is None:
+                resolved = resolve_scenario(scenario_config, platform_config)
 
-            platform = Platform(**platform_config)
+            sample_log.scenario = scenario_config["key"]
+            platform = Platform(
+                **{k: v for k, v in platform_config.items() if k != "scenarios"}
+            )
             scenario = scenario_class(
                 scenario_config["key"],
                 scenario_config["name"],
-                scenario_config["cases"],
+                resolved["cases"],
                 platform,
                 self.config,
             )
@@ -72,12 +78,37 @@ class Planner:
             # - Get it from the custom scenario configuration inside the platform configuration
             # - If not present, get it from the general scenario configuration
             # - If not present, defaults to the platform setting
-            workers = custom_scenario_override.get(
-                "num_workers", scenario_config.get("num_workers", platform.num_workers)
+            workers = resolved.get("num_workers", platform.num_workers)
+            # The engine follows the same rules of the number of workers,
+            # unless it is given for the whole run
+            engine = self.engine or resolved.get("engine", platform.engine)
+            # Connections are pooled for the effective number of workers,
+            # each of them holding as many as its test cases request at the same time
+            platform.workers = workers
+            platform.connections_per_worker = max(
+                [1]
+                + [case.get("download_streams", 1) for case in resolved["cases"].values()]
+                + [case.get("pages_in_flight", 1) for case in resolved["cases"].values()]
             )
             logger = prefect.context.get("logger")
             logger.info(
-                f"Running {scenario.name} on {platform.label} with {workers} worker(s)"
+                f"Running {scenario.name} on {platform.label} with {workers} worker(s) "
+                f"using the {engine} engine"
             )
-            executor = LocalDaskExecutor(scheduler="threads", num_workers=workers)
-            scenario.run(executor=executor)
+            # The session, and so the OAuth token, is set up before any request is timed
+            try:
+                platform.session
+            except Exception as exc:
+                logger.error(f"Cannot open a session on {platform.label}, skipping {scenario.name}: {repr(exc)}")
+                continue
+
+            if engine == EngineType.PREFECT.value:
+                executor = LocalDaskExecutor(scheduler="threads", num_workers=workers)
+                scenario.run(executor=executor)
+            else:
+                # Failures must not stop the remaining executions, as happens with flows
+                try:
+                    with get_engine_class(engine)(platform, workers) as runner:
+                        scenario.execute(runner)
+                except Exception as exc:
+                    logger.error(f"Scenario {scenario.name} failed: {repr(exc)}")
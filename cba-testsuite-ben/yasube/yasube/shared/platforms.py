@@ -4,10 +4,14 @@ from typing import TypedDict, Union
 import prefect
 import requests
 from oauthlib.oauth2 import BackendApplicationClient, LegacyApplicationClient
+from requests.adapters import DEFAULT_POOLSIZE
 from requests.auth import HTTPBasicAuth
 from requests_oauthlib import OAuth2Session
 from typing_extensions import NotRequired
 
+from yasube.shared.tokens import token_cache
+from yasube.shared.transport import mount_timed_adapters
+
 
 class AuthType(Enum):
     BASIC = "basic"
@@ -69,6 +73,10 @@ class Platform:
         num_workers=1,
         verify_ssl=True,
         location_trusted=False,
+        engine="prefect",
+        pool_maxsize=None,
+        pool_block=False,
+        keep_alive=True,
     ):
         self.key = key
         self.label = label
@@ -77,8 +85,24 @@ class Platform:
         self.num_workers = num_workers
         self.verify_ssl = verify_ssl
         self.location_trusted = location_trusted
+        self.engine = engine
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        # Effective number of workers, set by the planner when a scenario overrides it
+        self.workers = num_workers
+        # Connections a worker may hold at the same time, e.g. the ranges of a download,
+        # set by the planner from the test cases of the scenario
+        self.connections_per_worker = 1
         self._session = None
 
+    @property
+    def pool_size(self) -> int:
+        """Connections kept open per host: the configured size, if any, or at least those of every worker."""
+        if self.pool_maxsize is not None:
+            return self.pool_maxsize
+        return max(self.workers * self.connections_per_worker, DEFAULT_POOLSIZE)
+
     @property
     def session(self) -> requests.Session:
         if self._session is None:
@@ -86,11 +110,16 @@ class Platform:
                 self._session = self._get_basic_auth_session()
             elif self.auth["type"] == AuthType.OAUTH.value:
                 self._session = self._get_oauth_session()
+            # Responses are given the timings of the phases of their request
+            mount_timed_adapters(self._session, self.pool_size, self.pool_block)
+            if not self.keep_alive:
+                self._session.headers["Connection"] = "close"
 
         return self._session
 
     def _token_saver(self, token):
         self._token = token
+        token_cache.put(self.auth["credentials"], token)
 
     def _get_basic_auth_session(self) -> requests.Session:
         if self.location_trusted:
@@ -111,6 +140,19 @@ class Platform:
         else:
             session_class = OAuth2Session
 
+        credentials = self.auth["credentials"]
+        # Platforms sharing the credentials share the token, fetched once
+        token = token_cache.get(credentials, lambda: self._fetch_token(session_class))
+        session = session_class(
+            client_id=credentials["client_id"],
+            token=token,
+            auto_refresh_url=credentials["token_url"],
+            token_updater=self._token_saver,
+        )
+        token_cache.subscribe(credentials, session)
+        return session
+
+    def _fetch_token(self, session_class) -> dict:
         credentials = self.auth["credentials"]
         if credentials["grant_type"] == OAuthGrantType.PASSWORD.value:
             oauth = session_class(
@@ -139,9 +181,4 @@ class Platform:
                 client_id=credentials["client_id"],
                 client_secret=credentials["client_secret"],
             )
-        return session_class(
-            client_id=credentials["client_id"],
-            token=token,
-            auto_refresh_url=credentials["token_url"],
-            token_updater=self._token_saver,
-        )
+        return token
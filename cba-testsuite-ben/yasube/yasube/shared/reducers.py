@@ -1,18 +1,23 @@
 import datetime
-from typing import Any, List, Union
+from array import array
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Union
 
 import prefect
 
-from yasube.shared.metrics import Metric, MetricName, MetricUom
+from yasube.shared.histograms import Histogram
+from yasube.shared.metrics import Metric, MetricName, MetricUom, Sample
+from yasube.utils.strings import camel_to_snake
 
 
-def rate(results: List[Union[int, float]], value=-1):
+def rate(results: Sequence[Union[int, float]], value=-1):
     estimated = len([r for r in results if r == value])
     actual = len(results) or 1
     return 100 - abs(estimated - actual) / actual * 100
 
 
-def average(results: List[Union[int, float]], default: int = -1) -> int:
+def average(results: Sequence[Union[int, float]], default: int = -1) -> int:
     if all([r < 0 for r in results]):
         # Special case: all results are negative. We return the default in this case.
         return default
@@ -22,77 +27,250 @@ def average(results: List[Union[int, float]], default: int = -1) -> int:
         return round(sum(results) / (len(results) or 1))
 
 
+def peak(results: Sequence[Union[int, float]], default: int = 0) -> int:
+    try:
+        return round(max(results))
+    except ValueError:
+        return default
+
+
+def to_column(values: List[Any]) -> Sequence[Any]:
+    """Packs numeric values into a typed array, keeping integers as such.
+    Any other value (e.g. datetimes) is kept in a list."""
+    if all(isinstance(v, int) for v in values):
+        try:
+            return array("q", values)
+        except OverflowError:
+            return values
+    if all(isinstance(v, (int, float)) for v in values):
+        return array("d", values)
+    return values
+
+
+class MetricColumns:
+    """
+    Metric values grouped by name in a single pass over the metrics of a test.
+    Each reducer then only goes through the columns it needs, instead of
+    scanning every metric of the test.
+    Samples are expanded into the metrics they stand for.
+    """
+
+    def __init__(self, metrics: Iterable[Union[Metric, Sample]]):
+        values: Dict[MetricName, List[Any]] = defaultdict(list)
+        for metric in metrics:
+            if isinstance(metric, Sample):
+                for name, value in metric.items():
+                    values[name].append(value)
+            else:
+                values[metric.name].append(metric.value)
+        self._columns = {name: to_column(column) for name, column in values.items()}
+
+    def __getitem__(self, name: MetricName) -> Sequence[Any]:
+        return self._columns.get(name, ())
+
+    def __contains__(self, name: MetricName) -> bool:
+        return name in self._columns
+
+
+def response_time_histogram(columns: MetricColumns) -> Histogram:
+    """Returns the histogram of response times fed by the test case, if given.
+    Otherwise, it is built from the response times."""
+    for histogram in columns[MetricName.RESPONSE_TIME_HISTOGRAM]:
+        return histogram
+
+    histogram = Histogram()
+    for value in columns[MetricName.RESPONSE_TIME]:
+        histogram.record(value)
+    return histogram
+
+
+def percentile(columns: MetricColumns, value: float, default: int = -1) -> int:
+    histogram = response_time_histogram(columns)
+    if not histogram.count:
+        return default
+    return round(histogram.percentile(value))
+
+
+def elapsed_seconds(columns: MetricColumns) -> Optional[float]:
+    """Returns the seconds elapsed from the first request to the last response, if any."""
+    start_times = columns[MetricName.START_TIME]
+    end_times = columns[MetricName.END_TIME]
+    if not start_times or not end_times:
+        return None
+    return (max(end_times) - min(start_times)).total_seconds() or None
+
+
 class MetricReducer:
     @staticmethod
-    def reduce_avg_response_time(results: List[Metric]) -> Metric:
-        response_times = [
-            r.value for r in results if r.name == MetricName.RESPONSE_TIME
-        ]
-        avg_response_time = average(response_times)
+    def reduce_avg_concurrency(columns: MetricColumns) -> Metric:
+        avg_concurrency = -1
+        for in_flight in columns[MetricName.IN_FLIGHT]:
+            value = in_flight.average()
+            avg_concurrency = -1 if value is None else round(value, 2)
+        return Metric(MetricName.AVG_CONCURRENCY, MetricUom.COUNT, avg_concurrency)
+
+    @staticmethod
+    def reduce_peak_concurrency(columns: MetricColumns) -> Metric:
+        peak_concurrency = -1
+        for in_flight in columns[MetricName.IN_FLIGHT]:
+            peak_concurrency = in_flight.peak()
+        return Metric(MetricName.PEAK_CONCURRENCY, MetricUom.COUNT, peak_concurrency)
+
+    @staticmethod
+    def reduce_avg_response_time(columns: MetricColumns) -> Metric:
+        avg_response_time = average(columns[MetricName.RESPONSE_TIME])
         return Metric(MetricName.AVG_RESPONSE_TIME, MetricUom.MS, avg_response_time)
 
     @staticmethod
-    def reduce_avg_product_retention(results: List[Metric]) -> Metric:
-        product_retentions = [
-            r.value for r in results if r.name == MetricName.PRODUCT_RETENTION
-        ]
-        avg_product_retention = average(product_retentions)
+    def reduce_avg_corrected_response_time(columns: MetricColumns) -> Metric:
+        avg_response_time = average(columns[MetricName.CORRECTED_RESPONSE_TIME])
+        return Metric(
+            MetricName.AVG_CORRECTED_RESPONSE_TIME, MetricUom.MS, avg_response_time
+        )
+
+    @staticmethod
+    def reduce_avg_product_retention(columns: MetricColumns) -> Metric:
+        avg_product_retention = average(columns[MetricName.PRODUCT_RETENTION])
         return Metric(
             MetricName.AVG_PRODUCT_RETENTION, MetricUom.DAYS, avg_product_retention
         )
 
     @staticmethod
-    def reduce_peak_response_time(results: List[Metric]) -> Metric:
-        response_times = [
-            r.value for r in results if r.name == MetricName.RESPONSE_TIME
-        ]
-        try:
-            peak = round(max(response_times))
-        except ValueError:
-            peak = 0
+    def reduce_peak_response_time(columns: MetricColumns) -> Metric:
+        return Metric(
+            MetricName.PEAK_RESPONSE_TIME,
+            MetricUom.MS,
+            peak(columns[MetricName.RESPONSE_TIME]),
+        )
+
+    @staticmethod
+    def reduce_peak_corrected_response_time(columns: MetricColumns) -> Metric:
+        return Metric(
+            MetricName.PEAK_CORRECTED_RESPONSE_TIME,
+            MetricUom.MS,
+            peak(columns[MetricName.CORRECTED_RESPONSE_TIME]),
+        )
 
-        return Metric(MetricName.PEAK_RESPONSE_TIME, MetricUom.MS, peak)
+    @staticmethod
+    def reduce_avg_queue_time(columns: MetricColumns) -> Metric:
+        # Requests on schedule have no queue time, so zeros must be kept
+        queue_times = columns[MetricName.QUEUE_TIME]
+        avg_queue_time = round(sum(queue_times) / (len(queue_times) or 1))
+        return Metric(MetricName.AVG_QUEUE_TIME, MetricUom.MS, avg_queue_time)
 
     @staticmethod
-    def reduce_error_rate(results: List[Metric]) -> Metric:
-        exceptions = [r.value for r in results if r.name == MetricName.EXCEPTION]
+    def reduce_peak_queue_time(columns: MetricColumns) -> Metric:
         return Metric(
-            MetricName.ERROR_RATE, MetricUom.PERCENTAGE, rate(exceptions, True)
+            MetricName.PEAK_QUEUE_TIME, MetricUom.MS, peak(columns[MetricName.QUEUE_TIME])
         )
 
     @staticmethod
-    def reduce_avg_size(results: List[Metric]) -> Metric:
-        sizes = [r.value for r in results if r.name == MetricName.SIZE]
-        avg_size = average(sizes)
-        return Metric(MetricName.AVG_SIZE, MetricUom.BYTES, avg_size)
+    def reduce_avg_reassembly_time(columns: MetricColumns) -> Metric:
+        avg_reassembly_time = average(columns[MetricName.REASSEMBLY_TIME])
+        return Metric(MetricName.AVG_REASSEMBLY_TIME, MetricUom.MS, avg_reassembly_time)
 
     @staticmethod
-    def reduce_max_size(results: List[Metric]) -> Metric:
-        sizes = [r.value for r in results if r.name == MetricName.SIZE]
-        try:
-            max_size = round(max(sizes))
-        except ValueError:
-            max_size = 0
+    def reduce_peak_reassembly_time(columns: MetricColumns) -> Metric:
+        return Metric(
+            MetricName.PEAK_REASSEMBLY_TIME, MetricUom.MS, peak(columns[MetricName.REASSEMBLY_TIME])
+        )
+
+    @staticmethod
+    def reduce_avg_stream_throughput(columns: MetricColumns) -> Metric:
+        throughputs = columns[MetricName.STREAM_THROUGHPUT]
+        avg_throughput = round(sum(throughputs) / len(throughputs), 2) if throughputs else -1
+        return Metric(MetricName.AVG_STREAM_THROUGHPUT, MetricUom.BYTES_SEC, avg_throughput)
 
-        return Metric(MetricName.MAX_SIZE, MetricUom.BYTES, max_size)
+    @staticmethod
+    def reduce_min_stream_throughput(columns: MetricColumns) -> Metric:
+        throughputs = columns[MetricName.STREAM_THROUGHPUT]
+        min_throughput = round(min(throughputs), 2) if throughputs else -1
+        return Metric(MetricName.MIN_STREAM_THROUGHPUT, MetricUom.BYTES_SEC, min_throughput)
+
+    # Connection phases are only timed when a new connection is opened:
+    # requests reusing a connection do not count in their averages.
+    @staticmethod
+    def reduce_avg_dns_time(columns: MetricColumns) -> Metric:
+        return Metric(MetricName.AVG_DNS_TIME, MetricUom.MS, average(columns[MetricName.DNS_TIME]))
+
+    @staticmethod
+    def reduce_avg_connect_time(columns: MetricColumns) -> Metric:
+        return Metric(MetricName.AVG_CONNECT_TIME, MetricUom.MS, average(columns[MetricName.CONNECT_TIME]))
+
+    @staticmethod
+    def reduce_avg_tls_time(columns: MetricColumns) -> Metric:
+        return Metric(MetricName.AVG_TLS_TIME, MetricUom.MS, average(columns[MetricName.TLS_TIME]))
+
+    @staticmethod
+    def reduce_avg_time_to_first_byte(columns: MetricColumns) -> Metric:
+        return Metric(
+            MetricName.AVG_TIME_TO_FIRST_BYTE, MetricUom.MS, average(columns[MetricName.TIME_TO_FIRST_BYTE])
+        )
+
+    @staticmethod
+    def reduce_avg_transfer_time(columns: MetricColumns) -> Metric:
+        return Metric(MetricName.AVG_TRANSFER_TIME, MetricUom.MS, average(columns[MetricName.TRANSFER_TIME]))
 
     @staticmethod
-    def reduce_throughput(results: List[Metric]) -> Metric:
+    def reduce_new_connections(columns: MetricColumns) -> Metric:
+        new_connections = sum(1 for new in columns[MetricName.NEW_CONNECTION] if new)
+        return Metric(MetricName.NEW_CONNECTIONS, MetricUom.COUNT, new_connections)
+
+    @staticmethod
+    def reduce_reused_connections(columns: MetricColumns) -> Metric:
+        reused_connections = sum(1 for new in columns[MetricName.NEW_CONNECTION] if not new)
+        return Metric(MetricName.REUSED_CONNECTIONS, MetricUom.COUNT, reused_connections)
+
+    @staticmethod
+    def reduce_p50_response_time(columns: MetricColumns) -> Metric:
+        return Metric(MetricName.P50_RESPONSE_TIME, MetricUom.MS, percentile(columns, 50))
+
+    @staticmethod
+    def reduce_p90_response_time(columns: MetricColumns) -> Metric:
+        return Metric(MetricName.P90_RESPONSE_TIME, MetricUom.MS, percentile(columns, 90))
+
+    @staticmethod
+    def reduce_p95_response_time(columns: MetricColumns) -> Metric:
+        return Metric(MetricName.P95_RESPONSE_TIME, MetricUom.MS, percentile(columns, 95))
+
+    @staticmethod
+    def reduce_p99_response_time(columns: MetricColumns) -> Metric:
+        return Metric(MetricName.P99_RESPONSE_TIME, MetricUom.MS, percentile(columns, 99))
+
+    @staticmethod
+    def reduce_p999_response_time(columns: MetricColumns) -> Metric:
+        return Metric(MetricName.P999_RESPONSE_TIME, MetricUom.MS, percentile(columns, 99.9))
+
+    @staticmethod
+    def reduce_std_response_time(columns: MetricColumns) -> Metric:
+        histogram = response_time_histogram(columns)
+        std = round(histogram.stddev, 2) if histogram.count else -1
+        return Metric(MetricName.STD_RESPONSE_TIME, MetricUom.MS, std)
+
+    @staticmethod
+    def reduce_error_rate(columns: MetricColumns) -> Metric:
+        return Metric(
+            MetricName.ERROR_RATE,
+            MetricUom.PERCENTAGE,
+            rate(columns[MetricName.EXCEPTION], True),
+        )
+
+    @staticmethod
+    def reduce_avg_size(columns: MetricColumns) -> Metric:
+        avg_size = average(columns[MetricName.SIZE])
+        return Metric(MetricName.AVG_SIZE, MetricUom.BYTES, avg_size)
+
+    @staticmethod
+    def reduce_max_size(columns: MetricColumns) -> Metric:
+        return Metric(MetricName.MAX_SIZE, MetricUom.BYTES, peak(columns[MetricName.SIZE]))
+
+    @staticmethod
+    def reduce_throughput(columns: MetricColumns) -> Metric:
         logger = prefect.context.get("logger")
-        start_times = []
-        end_times = []
-        response_times = []
-        sizes = []
-
-        for metric in results:
-            if metric.name == MetricName.START_TIME:
-                start_times.append(metric.value)
-            elif metric.name == MetricName.END_TIME:
-                end_times.append(metric.value)
-            elif metric.name == MetricName.RESPONSE_TIME:
-                response_times.append(metric.value)
-            elif metric.name == MetricName.SIZE:
-                sizes.append(metric.value)
+        start_times = columns[MetricName.START_TIME]
+        end_times = columns[MetricName.END_TIME]
+        response_times = columns[MetricName.RESPONSE_TIME]
+        sizes = columns[MetricName.SIZE]
 
         adjusted_start_times = []
         for i, start_time in enumerate(start_times):
@@ -114,9 +292,78 @@ class MetricReducer:
         return Metric(MetricName.THROUGHPUT, MetricUom.BYTES_SEC, f"{throughput}")
 
     @staticmethod
-    def reduce_total_read_results(results: List[Metric]) -> Metric:
+    def reduce_total_results(columns: MetricColumns) -> Metric:
+        return Metric(
+            MetricName.TOTAL_RESULTS, MetricUom.COUNT, peak(columns[MetricName.TOTAL_RESULTS], -1)
+        )
+
+    @staticmethod
+    def reduce_catalogue_coverage(columns: MetricColumns) -> Metric:
+        # Above 100% the catalogue grew while being walked
+        total_results = sum(columns[MetricName.TOTAL_RESULTS])
+        read_results = sum(columns[MetricName.TOTAL_READ_RESULTS])
+        coverage = -1
+        if MetricName.TOTAL_RESULTS in columns:
+            coverage = round(read_results / total_results * 100, 2) if total_results else 100.0
+        return Metric(MetricName.CATALOGUE_COVERAGE, MetricUom.PERCENTAGE, coverage)
+
+    @staticmethod
+    def reduce_pages_per_second(columns: MetricColumns) -> Metric:
+        # Pages received, failed ones excluded
+        elapsed = elapsed_seconds(columns)
+        pages = len(columns[MetricName.END_TIME])
+        pages_per_second = round(pages / elapsed, 2) if elapsed else -1
+        return Metric(MetricName.PAGES_PER_SECOND, MetricUom.PAGES_SEC, pages_per_second)
+
+    @staticmethod
+    def reduce_items_per_second(columns: MetricColumns) -> Metric:
+        elapsed = elapsed_seconds(columns)
+        items = sum(columns[MetricName.TOTAL_READ_RESULTS])
+        items_per_second = round(items / elapsed, 2) if elapsed else -1
+        return Metric(MetricName.ITEMS_PER_SECOND, MetricUom.ITEMS_SEC, items_per_second)
+
+    @staticmethod
+    def reduce_avg_data_availability_latency(columns: MetricColumns) -> Metric:
+        return Metric(
+            MetricName.AVG_DATA_AVAILABILITY_LATENCY,
+            MetricUom.SECONDS,
+            average(columns[MetricName.DATA_AVAILABILITY_LATENCY]),
+        )
+
+    @staticmethod
+    def reduce_max_data_availability_latency(columns: MetricColumns) -> Metric:
+        return Metric(
+            MetricName.MAX_DATA_AVAILABILITY_LATENCY,
+            MetricUom.SECONDS,
+            peak(columns[MetricName.DATA_AVAILABILITY_LATENCY], -1),
+        )
+
+    @staticmethod
+    def reduce_avg_data_operational_latency(columns: MetricColumns) -> Metric:
+        return Metric(
+            MetricName.AVG_DATA_OPERATIONAL_LATENCY,
+            MetricUom.SECONDS,
+            average(columns[MetricName.DATA_OPERATIONAL_LATENCY]),
+        )
+
+    @staticmethod
+    def reduce_max_data_operational_latency(columns: MetricColumns) -> Metric:
+        return Metric(
+            MetricName.MAX_DATA_OPERATIONAL_LATENCY,
+            MetricUom.SECONDS,
+            peak(columns[MetricName.DATA_OPERATIONAL_LATENCY], -1),
+        )
+
+    @staticmethod
+    def reduce_total_read_results(columns: MetricColumns) -> Metric:
         return Metric(
             MetricName.TOTAL_READ_RESULTS,
             MetricUom.COUNT,
-            sum([r.value for r in results if r.name == MetricName.TOTAL_READ_RESULTS]),
+            sum(columns[MetricName.TOTAL_READ_RESULTS]),
         )
+
+
+@lru_cache(maxsize=None)
+def get_reducer(metric: MetricName) -> Optional[Callable[[MetricColumns], Metric]]:
+    """Returns the MetricReducer method for the given metric, if implemented."""
+    return getattr(MetricReducer, f"reduce_{camel_to_snake(metric.value)}", None)
@@ -0,0 +1,214 @@
+import datetime
+import logging
+import os
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING, Any, BinaryIO, Dict, List, Optional, Type, Union
+
+from yasube.shared.metrics import MetricUom, Sample
+from yasube.utils.json import dumps
+
+if TYPE_CHECKING:
+    from yasube.shared.test_case import TestCase
+
+logger = logging.getLogger(__name__)
+
+# Samples waiting to be written: past it, new samples are dropped rather than
+# making the requests wait, and memory stays flat however long the run
+QUEUE_SIZE = 65536
+# Seconds between two flushes of the file, i.e. samples lost at most on a crash
+FLUSH_INTERVAL = 1.0
+BUFFER_SIZE = 64 * 1024
+# Samples per row group of the Parquet files
+ROW_GROUP_SIZE = 100_000
+
+# Tells the writer to stop
+_CLOSE = object()
+
+
+def sample_record(scenario: Optional[str], test_case: "TestCase", sample: Sample) -> Dict[str, Any]:
+    """Returns the line of a sample: its measured metrics, named as in the results file."""
+    record: Dict[str, Any] = {
+        "scenario": scenario,
+        "platform": test_case.platform.key,
+        "case": test_case._meta.key,
+        "url": test_case.url_template,
+    }
+    for name, value in sample.items():
+        if isinstance(value, datetime.datetime):
+            # Samples are timed in naive UTC
+            value = f"{value.isoformat()}Z" if value.tzinfo is None else value.isoformat()
+        record[name.value] = value
+    return record
+
+
+class NdjsonWriter:
+    """Writes samples as JSON lines, appended to the file."""
+
+    def __init__(self, path: str):
+        self.file: BinaryIO = open(path, "ab", buffering=BUFFER_SIZE)
+
+    def write(self, scenario: Optional[str], test_case: "TestCase", sample: Sample) -> None:
+        self.file.write(dumps(sample_record(scenario, test_case, sample)) + b"\n")
+
+    def flush(self) -> None:
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class ParquetWriter:
+    """
+    Writes samples as the row groups of a Parquet file, replaced if it exists,
+    with one column per metric and a schema that does not depend on the metrics
+    measured, so that the files of many runs can be read as a single dataset.
+    Samples are gathered in columns until a row group is full: a crashed run
+    leaves an unreadable file.
+    """
+
+    def __init__(self, path: str, row_group_size: int = ROW_GROUP_SIZE):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Parquet sample logs require pyarrow: pip install yasube[parquet]") from None
+
+        self.pyarrow = pyarrow
+        self.row_group_size = row_group_size
+        types = {
+            MetricUom.BOOLEAN: pyarrow.bool_(),
+            MetricUom.BYTES: pyarrow.int64(),
+            MetricUom.CODE: pyarrow.int32(),
+            MetricUom.DATETIME: pyarrow.timestamp("us", tz="UTC"),
+            MetricUom.MS: pyarrow.float64(),
+            MetricUom.TEXT: pyarrow.string(),
+        }
+        self.schema = pyarrow.schema(
+            [(key, pyarrow.string()) for key in ("scenario", "platform", "case", "url")]
+            + [(name.value, types[uom]) for name, uom in Sample.FIELDS.values()]
+        )
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema, compression="zstd")
+        self.columns: List[List[Any]] = [[] for _ in self.schema]
+
+    def write(self, scenario: Optional[str], test_case: "TestCase", sample: Sample) -> None:
+        values = (scenario, test_case.platform.key, test_case._meta.key, test_case.url_template)
+        values += tuple(getattr(sample, field) for field in Sample.FIELDS)
+        for column, value in zip(self.columns, values):
+            column.append(value)
+        if len(self.columns[0]) >= self.row_group_size:
+            self._write_row_group()
+
+    def flush(self) -> None:
+        # Row groups are only written once full
+        pass
+
+    def close(self) -> None:
+        try:
+            if self.columns[0]:
+                self._write_row_group()
+        finally:
+            self.writer.close()
+
+    def _write_row_group(self) -> None:
+        # Naive datetimes are taken as UTC
+        table = self.pyarrow.Table.from_arrays(
+            [self.pyarrow.array(column, type=field.type) for column, field in zip(self.columns, self.schema)],
+            schema=self.schema,
+        )
+        self.columns = [[] for _ in self.schema]
+        self.writer.write_table(table)
+
+
+SampleWriter = Union[NdjsonWriter, ParquetWriter]
+
+# Writers of the sample log by file extension, JSON lines otherwise
+WRITERS: Dict[str, Type[SampleWriter]] = {".parquet": ParquetWriter}
+
+
+class SampleLog:
+    """
+    Stream of the samples of every request, written while the scenarios run
+    so that raw samples can be analysed afterwards: as one JSON line per
+    request (NDJSON), which survives a crashed run, or in the row groups of a
+    Parquet file when its name ends with .parquet.
+
+    Test cases only queue their samples, without waiting: a background thread
+    serializes them and writes them to the file, flushed every second.
+    The queue is bounded, so that a writer falling behind drops samples, which
+    are counted, instead of slowing down the requests or growing in memory.
+    """
+
+    def __init__(self, maxsize: int = QUEUE_SIZE):
+        self.maxsize = maxsize
+        self.path: Optional[str] = None
+        # Key of the running scenario, added to its samples
+        self.scenario: Optional[str] = None
+        self._queue: Optional[queue.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        # Number of samples dropped so far, only locked when the queue is full
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def open(self, path: str) -> None:
+        """Starts streaming the samples to the given file."""
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        writer_class = WRITERS.get(os.path.splitext(path)[1].lower(), NdjsonWriter)
+        writer = writer_class(path)
+        self._queue = queue.Queue(self.maxsize)
+        self._thread = threading.Thread(target=self._write, args=(writer, self._queue), name="yasube-samples", daemon=True)
+        self._thread.start()
+
+    def put(self, test_case: "TestCase", sample: Sample) -> None:
+        """Queues the sample of a request of the test case, if the log is open."""
+        if self._queue is None:
+            return
+        try:
+            self._queue.put_nowait((self.scenario, test_case, sample))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def close(self) -> None:
+        """Writes the samples still queued, then closes the file."""
+        if self._queue is None:
+            return
+        self._queue.put(_CLOSE)
+        self._thread.join()
+        self._queue = None
+        self._thread = None
+        if self.dropped:
+            logger.warning(f"{self.dropped} samples dropped from {self.path}, written slower than requested")
+
+    @staticmethod
+    def _write(writer: SampleWriter, entries: queue.Queue) -> None:
+        flushed = time.monotonic()
+        try:
+            while True:
+                try:
+                    entry = entries.get(timeout=FLUSH_INTERVAL)
+                except queue.Empty:
+                    entry = None
+                if entry is _CLOSE:
+                    break
+                if entry is not None:
+                    writer.write(*entry)
+                if entry is None or time.monotonic() - flushed >= FLUSH_INTERVAL:
+                    writer.flush()
+                    flushed = time.monotonic()
+        except (OSError, TypeError, ValueError) as exc:
+            logger.error(f"Cannot write the samples: {repr(exc)}")
+            # The requests must not wait on a writer that stopped
+            while entries.get() is not _CLOSE:
+                pass
+        finally:
+            try:
+                writer.close()
+            except (OSError, TypeError, ValueError) as exc:
+                logger.error(f"Cannot close the samples: {repr(exc)}")
+
+
+# Shared by all the scenarios of the execution plan
+sample_log = SampleLog()
@@ -0,0 +1,189 @@
+import socket
+import threading
+from enum import Enum
+from http.client import HTTPException
+from shutil import copyfileobj
+from tempfile import NamedTemporaryFile
+from typing import IO, TYPE_CHECKING, List, Optional, Tuple
+
+from yasube.shared.typed_dicts import CaseConfig
+from yasube.utils.urls import urlfilename
+
+if TYPE_CHECKING:
+    import requests
+
+    from yasube.engines.aio import AsyncResponse
+
+# Size of the chunks read from the response body when downloading a product
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+class SinkType(Enum):
+    DISCARD = "discard"
+    FILE = "file"
+
+
+# Part of a download in several streams, to be reassembled by the sink
+Part = Optional[IO[bytes]]
+
+
+def close_parts(parts: List[Part]) -> None:
+    for part in parts:
+        if part is not None:
+            part.close()
+
+
+class DownloadSink:
+    """
+    Destination of the body of a streamed download.
+    Sinks return the number of bytes read, which is the size of the download.
+
+    Downloads in several ranged streams are consumed part by part, then the
+    parts are reassembled in order.
+    """
+
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+
+    @classmethod
+    def from_config(cls, config: CaseConfig) -> "DownloadSink":
+        chunk_size = config.get("download_chunk_size", DEFAULT_CHUNK_SIZE)
+        if config.get("download_sink", SinkType.FILE.value) == SinkType.DISCARD.value:
+            return DiscardSink(chunk_size)
+        return FileSink(chunk_size, config.get("keep_downloads", False), config.get("download_dir"))
+
+    def consume(self, response: "requests.Response") -> int:
+        raise NotImplementedError
+
+    async def aconsume(self, response: "AsyncResponse") -> int:
+        raise NotImplementedError
+
+    def consume_part(self, response: "requests.Response") -> Tuple[int, Part]:
+        return self.consume(response), None
+
+    async def aconsume_part(self, response: "AsyncResponse") -> Tuple[int, Part]:
+        return await self.aconsume(response), None
+
+    def assemble(self, response: "requests.Response", parts: List[Part]) -> None:
+        """Reassembles the given parts, closing them. Nothing to do if the parts are not kept."""
+        close_parts(parts)
+
+
+class DiscardSink(DownloadSink):
+    """
+    Reads the body and throws it away, so that the throughput of the server is
+    not capped by the local disk.
+    The body is read into a buffer allocated once per thread and reused by all
+    the downloads: straight from the socket file when the body is not
+    content-encoded, as the `readinto` of urllib3 allocates each chunk it reads.
+    Errors reading the socket file are then translated as urllib3 does, e.g. a
+    read timeout raises a ReadTimeoutError and not a socket.timeout.
+    """
+
+    _buffers = threading.local()
+
+    def _buffer(self) -> memoryview:
+        buffer = getattr(self._buffers, "buffer", None)
+        if buffer is None or len(buffer) != self.chunk_size:
+            buffer = memoryview(bytearray(self.chunk_size))
+            self._buffers.buffer = buffer
+        return buffer
+
+    def consume(self, response: "requests.Response") -> int:
+        buffer = self._buffer()
+        size = 0
+        raw = response.raw
+        fp = getattr(raw, "_fp", None)
+        if fp is None or not hasattr(fp, "readinto") or raw.headers.get("Content-Encoding", "identity") != "identity":
+            while read := raw.readinto(buffer):
+                size += read
+            return size
+        try:
+            while read := fp.readinto(buffer):
+                size += read
+        except socket.timeout as exc:
+            # Only the runs need urllib3, not the CLI reading the sink types
+            from urllib3.exceptions import ReadTimeoutError
+
+            # The connection is closed, not released to the pool with a partly read body
+            raw.close()
+            raise ReadTimeoutError(getattr(raw, "_pool", None), None, "Read timed out.") from exc
+        except (HTTPException, OSError) as exc:
+            from urllib3.exceptions import ProtocolError
+
+            raw.close()
+            raise ProtocolError(f"Connection broken: {exc!r}", exc) from exc
+        # Lets urllib3 see the end of the body, releasing the connection to the pool
+        raw.read()
+        return size
+
+    async def aconsume(self, response: "AsyncResponse") -> int:
+        size = 0
+        async for chunk in response.iter_content(self.chunk_size):
+            size += len(chunk)
+        return size
+
+
+class FileSink(DownloadSink):
+    """
+    Writes the body to a temporary file, deleted once the download is over
+    unless the file is to be kept.
+    """
+
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE, keep_file: bool = False, directory: Optional[str] = None):
+        super().__init__(chunk_size)
+        self.keep_file = keep_file
+        self.directory = directory
+
+    def _open(self, response):
+        return NamedTemporaryFile(dir=self.directory, suffix=f"_{urlfilename(response)}", delete=not self.keep_file)
+
+    def _log_kept(self, fp):
+        if self.keep_file:
+            # Only the runs need Prefect, not the CLI reading the sink types
+            import prefect
+
+            logger = prefect.context.get("logger")
+            logger.info(f"Download kept in {fp.name}")
+
+    def consume(self, response: "requests.Response") -> int:
+        with self._open(response) as fp:
+            copyfileobj(response.raw, fp, length=self.chunk_size)
+            self._log_kept(fp)
+            return fp.tell()
+
+    async def aconsume(self, response: "AsyncResponse") -> int:
+        with self._open(response) as fp:
+            async for chunk in response.iter_content(self.chunk_size):
+                fp.write(chunk)
+            self._log_kept(fp)
+            return fp.tell()
+
+    def consume_part(self, response: "requests.Response") -> Tuple[int, Part]:
+        part = NamedTemporaryFile(dir=self.directory)
+        try:
+            copyfileobj(response.raw, part, length=self.chunk_size)
+        except BaseException:
+            part.close()
+            raise
+        return part.tell(), part
+
+    async def aconsume_part(self, response: "AsyncResponse") -> Tuple[int, Part]:
+        part = NamedTemporaryFile(dir=self.directory)
+        try:
+            async for chunk in response.iter_content(self.chunk_size):
+                part.write(chunk)
+        except BaseException:
+            part.close()
+            raise
+        return part.tell(), part
+
+    def assemble(self, response: "requests.Response", parts: List[Part]) -> None:
+        try:
+            with self._open(response) as fp:
+                for part in parts:
+                    part.seek(0)
+                    copyfileobj(part, fp, length=self.chunk_size)
+                self._log_kept(fp)
+        finally:
+            close_parts(parts)
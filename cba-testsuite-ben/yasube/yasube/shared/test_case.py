@@ -1,12 +1,23 @@
+from contextvars import ContextVar
 from datetime import timedelta
+from typing import Optional
 
 import prefect
 from prefect import Task
 
+from yasube.shared.arrivals import ArrivalSchedule
+from yasube.shared.concurrency import InFlight
+from yasube.shared.histograms import Histogram
 from yasube.shared.platforms import Platform
 from yasube.shared.typed_dicts import CaseConfig
 
 
+# Run count of a test case executed outside of a Prefect flow.
+# Prefect keeps it in a thread-local context, which cannot tell apart
+# coroutines sharing the same event loop.
+task_run_count: ContextVar[Optional[int]] = ContextVar("task_run_count", default=None)
+
+
 class MaxRetryExceeded(Exception):
     def __init__(self, max_retries, original):
         self.max_retries = max_retries
@@ -39,13 +50,24 @@ class TestCase(Task):
         )
         self.config = config
         self.platform = platform
+        self.arrival_schedule = ArrivalSchedule.from_config(config)
+        # Fed as requests complete, it is shared by all the mapped runs of the test case
+        self.response_times = Histogram()
+        self.in_flight = InFlight()
+
+    @property
+    def run_count(self) -> int:
+        run_count = task_run_count.get()
+        if run_count is None:
+            run_count = prefect.context.get("task_run_count")
+        return run_count
 
     def get_client(self):
         raise NotImplementedError
 
     def reraise_until_exhausted(self, exception: Exception):
         if self.max_retries is not None:
-            if prefect.context.get("task_run_count") <= self.max_retries:
+            if self.run_count <= self.max_retries:
                 raise exception
             else:
                 raise MaxRetryExceeded(self.max_retries, exception)
@@ -1,10 +1,17 @@
-from typing import Any, Dict, List
+from datetime import datetime, timezone
+from functools import cached_property
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
 from prefect import Flow, Parameter
 
+from yasube.cases.common import build_test_results, result_location, save_results
+from yasube.shared.metrics import Metric
 from yasube.shared.platforms import Platform
 from yasube.shared.typed_dicts import CaseConfig, GlobalConfig
 
+if TYPE_CHECKING:
+    from yasube.engines.base import Engine
+
 
 class TestScenario:
     def __init__(
@@ -22,21 +29,42 @@ class TestScenario:
         self.cases = cases
         self.platform = platform
         self.config = config
-        self.flow: Flow = self.get_flow()
+        self.result_location = None
         if self.config is not None:
             result_basepath = self.config.get("result_basepath", "~")
             result_filename = self.config.get("result_filename", "yasube_results.json")
             self.result_basepath = Parameter("result_basepath", default=result_basepath)
             self.result_filename = Parameter("result_filename", default=result_filename)
+            self.result_location = result_location(result_basepath, result_filename)
+
+    @cached_property
+    def flow(self) -> Flow:
+        """The Prefect flow of the scenario, only built when run by Prefect."""
+        return self.get_flow()
 
     def get_flow(self) -> Flow:
         """Implemented by subclasses"""
         pass
 
+    def get_metrics(self, engine: "Engine") -> Optional[List[Metric]]:
+        """Implemented by subclasses.
+        Same as `get_flow`, but test cases are run by the given engine.
+        Returns the reduced metrics, or None if nothing should be written."""
+        pass
+
     def run(self, executor):
         # This will just add the Parameter to the flow.
         # It will be used later to configure the LocalResult
         # location path.
         self.flow.add_task(self.result_basepath)
         self.flow.add_task(self.result_filename)
-        return self.flow.run(executor=executor)
+        # The key of the scenario is written to the results file by write_metrics
+        return self.flow.run(executor=executor, context={"scenario": self.key})
+
+    def execute(self, engine: "Engine") -> None:
+        """Runs the scenario on the given engine instead of a Prefect flow,
+        writing the same results file."""
+        start_date = datetime.now(timezone.utc)
+        metrics = self.get_metrics(engine)
+        if metrics is not None and self.result_location is not None:
+            save_results(self.result_location, build_test_results(self.name, start_date, metrics, self.key))
@@ -0,0 +1,154 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+from weakref import WeakSet
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+Token = Dict
+TokenFetcher = Callable[[], Token]
+
+# Tokens are refreshed this many seconds before they expire, or halfway
+# through their lifetime if shorter
+REFRESH_MARGIN = 60
+# Delay before retrying a failed background refresh
+RETRY_DELAY = 10
+
+
+class TokenCache:
+    """
+    OAuth tokens shared by all the platforms authenticating with the same
+    token url, client and user, so that the execution plan authenticates once.
+    Tokens can also be stored on disk, to be reused by the next runs.
+
+    Tokens are refreshed in the background shortly before they expire, and
+    handed over to the sessions using them: requests never wait on a token fetch.
+    """
+
+    def __init__(self, path: Optional[str] = None, margin: float = REFRESH_MARGIN):
+        self.path = path
+        self.margin = margin
+        self._lock = threading.RLock()
+        self._tokens: Dict[str, Token] = {}
+        self._fetchers: Dict[str, TokenFetcher] = {}
+        self._sessions: Dict[str, WeakSet] = {}
+        self._timers: Dict[str, threading.Timer] = {}
+
+    @staticmethod
+    def key(credentials: Dict) -> str:
+        return "|".join(
+            [credentials["token_url"], credentials.get("client_id") or "", credentials.get("username") or ""]
+        )
+
+    def get(self, credentials: Dict, fetch: TokenFetcher) -> Token:
+        """
+        Returns the token for the given credentials, fetching it if none is cached
+        or the cached one is about to expire.
+        The fetcher is kept to refresh the token in the background.
+        """
+        key = self.key(credentials)
+        with self._lock:
+            self._fetchers[key] = fetch
+            token = self._tokens.get(key) or self._load(key)
+            if token is None or self._refresh_delay(token) <= 0:
+                token = fetch()
+            self.put(credentials, token)
+            return token
+
+    def subscribe(self, credentials: Dict, session: requests.Session) -> None:
+        """The session will be given the tokens refreshed for the given credentials."""
+        with self._lock:
+            self._sessions.setdefault(self.key(credentials), WeakSet()).add(session)
+
+    def put(self, credentials: Dict, token: Token) -> None:
+        self._store(self.key(credentials), token)
+
+    def clear(self) -> None:
+        with self._lock:
+            for timer in self._timers.values():
+                timer.cancel()
+            self._tokens.clear()
+            self._fetchers.clear()
+            self._sessions.clear()
+            self._timers.clear()
+
+    def _refresh_delay(self, token: Token) -> float:
+        """Seconds before the token should be refreshed, or infinity if it does not expire."""
+        expires_at = token.get("expires_at")
+        if expires_at is None:
+            return float("inf")
+        margin = self.margin
+        if token.get("expires_in") is not None:
+            margin = min(margin, float(token["expires_in"]) / 2)
+        return float(expires_at) - margin - time.time()
+
+    def _store(self, key: str, token: Token) -> None:
+        with self._lock:
+            if self._tokens.get(key) is not token:
+                self._tokens[key] = token
+                self._save(key, token)
+            self._schedule(key, self._refresh_delay(token))
+
+    def _schedule(self, key: str, delay: float) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        if delay == float("inf") or key not in self._fetchers:
+            return
+        timer = threading.Timer(max(0.0, delay), self._refresh, args=(key,))
+        timer.daemon = True
+        self._timers[key] = timer
+        timer.start()
+
+    def _refresh(self, key: str) -> None:
+        try:
+            token = self._fetchers[key]()
+        except Exception as exc:
+            logger.warning(f"Token refresh failed, retrying in {RETRY_DELAY} seconds: {repr(exc)}")
+            with self._lock:
+                self._schedule(key, RETRY_DELAY)
+            return
+
+        with self._lock:
+            self._store(key, token)
+            for session in list(self._sessions.get(key, ())):
+                session.token = token
+
+    def _load(self, key: str) -> Optional[Token]:
+        if self.path is None or not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path) as f:
+                token = json.load(f).get(key)
+        except (OSError, ValueError) as exc:
+            logger.warning(f"Cannot read the token cache {self.path}: {repr(exc)}")
+            return None
+        if token is not None:
+            self._tokens[key] = token
+        return token
+
+    def _save(self, key: str, token: Token) -> None:
+        if self.path is None:
+            return
+        tokens = {}
+        try:
+            if os.path.exists(self.path):
+                with open(self.path) as f:
+                    tokens = json.load(f)
+            tokens[key] = token
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # Tokens are credentials: the file is only readable by its owner
+            fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as f:
+                json.dump(tokens, f)
+        except (OSError, ValueError) as exc:
+            logger.warning(f"Cannot write the token cache {self.path}: {repr(exc)}")
+
+
+# Shared by all the platforms of the execution plan
+token_cache = TokenCache()
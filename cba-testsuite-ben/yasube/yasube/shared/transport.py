@@ -0,0 +1,143 @@
+import socket
+from timeit import default_timer as timer
+from typing import Optional
+
+import requests
+from requests.adapters import DEFAULT_POOLSIZE, HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+
+
+class RequestTimings:
+    """
+    Durations in seconds of the phases of a request: DNS resolution, TCP connect
+    and TLS handshake, only measured when a new connection is opened, then the
+    time to first byte, i.e. until the response headers are received.
+    `new_connection` tells whether the request opened a connection or reused one.
+    The transfer of the body is timed by the reader of the response, from
+    `headers_received`, on the same clock as `timeit.default_timer`.
+    """
+
+    __slots__ = ("dns", "connect", "tls", "ttfb", "headers_received", "new_connection")
+
+    def __init__(
+        self, dns: float = 0.0, connect: float = 0.0, tls: float = 0.0, new_connection: Optional[bool] = None
+    ):
+        self.dns = dns
+        self.connect = connect
+        self.tls = tls
+        self.new_connection = new_connection
+        self.ttfb: Optional[float] = None
+        self.headers_received: Optional[float] = None
+
+    def received(self, sent: float):
+        self.headers_received = timer()
+        self.ttfb = self.headers_received - sent
+
+
+class TimedConnectionMixin:
+    """
+    Times the phases of the requests sent on the connection.
+    The host is resolved before connecting, so that DNS resolution and TCP
+    connect are told apart.
+    """
+
+    _pending_timings: Optional[RequestTimings] = None
+
+    def _new_conn(self):
+        host = self._dns_host
+        start = timer()
+        try:
+            addresses = socket.getaddrinfo(host, self.port, allowed_gai_family(), socket.SOCK_STREAM)
+        except socket.error as e:
+            raise NewConnectionError(self, "Failed to establish a new connection: %s" % e)
+        resolved = timer()
+
+        try:
+            for i, (*_, sockaddr) in enumerate(addresses):
+                # The host is the resolved address only while connecting:
+                # the Host header and the TLS server name are left untouched
+                self._dns_host = sockaddr[0]
+                try:
+                    conn = super()._new_conn()
+                    break
+                except (ConnectTimeoutError, NewConnectionError):
+                    if i == len(addresses) - 1:
+                        raise
+        finally:
+            self._dns_host = host
+
+        self._pending_timings = RequestTimings(dns=resolved - start, connect=timer() - resolved, new_connection=True)
+        return conn
+
+    def connect(self):
+        start = timer()
+        super().connect()
+        timings = self._pending_timings
+        if timings is not None and isinstance(self, HTTPSConnection):
+            timings.tls = max(0.0, timer() - start - timings.dns - timings.connect)
+
+    def _timed(self, method, *args, **kwargs):
+        # Plain connections are opened by the first request sent on them,
+        # so the time to first byte is measured once the request is sent
+        method(*args, **kwargs)
+        self._sent = timer()
+
+    def request(self, *args, **kwargs):
+        self._timed(super().request, *args, **kwargs)
+
+    def request_chunked(self, *args, **kwargs):
+        self._timed(super().request_chunked, *args, **kwargs)
+
+    def getresponse(self, *args, **kwargs):
+        response = super().getresponse(*args, **kwargs)
+        timings = self._pending_timings or RequestTimings(new_connection=False)
+        timings.received(self._sent)
+        self._pending_timings = None
+        self.timings = timings
+        return response
+
+
+class TimedHTTPConnection(TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """
+    Transport adapter setting the `timings` of each response, a RequestTimings.
+    Requests through a proxy are not timed.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
+
+    def send(self, request, **kwargs) -> requests.Response:
+        response = super().send(request, **kwargs)
+        # The connection is released once the body is read, so it is still
+        # attached to the response at this point
+        connection = response.raw.connection
+        response.timings = getattr(connection, "timings", None)
+        return response
+
+
+def mount_timed_adapters(session: requests.Session, pool_maxsize: int = DEFAULT_POOLSIZE, pool_block: bool = False) -> None:
+    for prefix in ("http://", "https://"):
+        session.mount(prefix, TimedHTTPAdapter(pool_maxsize=pool_maxsize, pool_block=pool_block))
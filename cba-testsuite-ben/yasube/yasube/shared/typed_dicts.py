@@ -1,10 +1,12 @@
-from typing import Dict, List, TypedDict
+from typing import Dict, List, NamedTuple, Optional, TypedDict
 from typing_extensions import NotRequired
 
 
 class GlobalConfig(TypedDict):
     result_basepath: str
     result_filename: str
+    token_cache: NotRequired[str]
+    sample_log: NotRequired[str]
 
 
 class CaseConfig(TypedDict):
@@ -13,6 +15,22 @@ class CaseConfig(TypedDict):
     requests_timeout: float
     max_retries: int
     retry_delay: int
+    arrival_rate: NotRequired[float]
+    arrival_process: NotRequired[str]
+    metrics: NotRequired[List[str]]
+    download_sink: NotRequired[str]
+    download_chunk_size: NotRequired[int]
+    download_streams: NotRequired[int]
+    download_dir: NotRequired[str]
+    keep_downloads: NotRequired[bool]
+    pagination: NotRequired[str]
+    page_size: NotRequired[int]
+    pages_in_flight: NotRequired[int]
+    max_pages: NotRequired[int]
+    filter: NotRequired[str]
+    polling_duration: NotRequired[float]
+    polling_interval: NotRequired[float]
+    polling_lookback: NotRequired[float]
 
 
 class PlatformConfig(TypedDict):
@@ -20,8 +38,12 @@ class PlatformConfig(TypedDict):
     label: str
     root_uri: str
     num_workers: int
+    engine: NotRequired[str]
     verify_ssl: bool
     location_trusted: NotRequired[bool]
+    pool_maxsize: NotRequired[int]
+    pool_block: NotRequired[bool]
+    keep_alive: NotRequired[bool]
     compatible_platforms: List[str]
     auth: dict
     scenarios: Dict[str, CaseConfig]
@@ -32,7 +54,24 @@ class ScenarioConfig(TypedDict):
     name: str
     path: str
     num_workers: NotRequired[int]
+    engine: NotRequired[str]
     default_platform: PlatformConfig
     compatible_platforms: List[str]
     services: List[str]
     cases: Dict[str, CaseConfig]
+
+
+class ResolvedScenario(TypedDict):
+    cases: Dict[str, CaseConfig]
+    num_workers: NotRequired[int]
+    engine: NotRequired[str]
+
+
+class Execution(NamedTuple):
+    scenario: ScenarioConfig
+    platform: PlatformConfig
+    # Resolved from the configurations if missing
+    resolved: Optional[ResolvedScenario] = None
+
+
+ExecutionPlan = List[Execution]
@@ -2,12 +2,14 @@ import os
 import re
 import urllib.parse
 from datetime import datetime
-from random import choice, randint
+from functools import lru_cache
+from itertools import product
+from random import choice
+from typing import Callable, List, Optional, Tuple, Union
 
-import geopandas
 from dateutil.relativedelta import relativedelta
 
-from yasube.data.product_types import PRODUCT_TYPES, PRODUCT_TYPES_PATTERN
+from yasube.data.product_types import PRODUCT_TYPES
 
 PATTERNS = {
     "date": re.compile("{{\s*NOW\s*((?P<action>(\+|-))\s*(?P<amount>[\d]+)(?P<unit>(d|D|m|M|y|Y))){0,1}\s*}}"),
@@ -16,6 +18,15 @@ PATTERNS = {
 }
 
 
+@lru_cache(maxsize=None)
+def load_shapes(shapes_file: str):
+    """Reads the shapes file once per process.
+    geopandas is imported here, as only random countries need it."""
+    import geopandas
+
+    return geopandas.read_file(shapes_file)
+
+
 class ShapeHelper:
 
     SHAPES_FILE = "../data/borders/TM_WORLD_BORDERS-0.3.shp"
@@ -52,8 +63,18 @@ class ShapeHelper:
     POINT_PATTERN = re.compile("[\d]+.[\d]+")
 
     def __init__(self):
-        shapes_file = os.path.join(os.path.dirname(__file__), self.SHAPES_FILE)
-        self.shapes = geopandas.read_file(shapes_file)
+        self.shapes_file = os.path.join(os.path.dirname(__file__), self.SHAPES_FILE)
+
+    @property
+    def shapes(self):
+        return load_shapes(self.shapes_file)
+
+    @classmethod
+    @lru_cache(maxsize=None)
+    def get_country_polygons(cls) -> Tuple[str, ...]:
+        """Returns the polygons of the ISO2 countries, computed once per process."""
+        shape_helper = cls()
+        return tuple(shape_helper.adapt_polygon(shape_helper.get_iso_polygon(iso2)) for iso2 in cls.ISO2)
 
     def adapt_polygon(self, polygon: str) -> str:
         """Returns the polygon string in a format compatible with the API."""
@@ -64,8 +85,7 @@ class ShapeHelper:
         return polygon.replace("POLYGON ", "Polygon").replace(", ", ",")
 
     def get_random_country(self) -> str:
-        iso2 = choice(self.ISO2)
-        return self.adapt_polygon(self.get_iso_polygon(iso2))
+        return choice(self.get_country_polygons())
 
     def get_iso_polygon(self, iso2: str) -> str:
         shape = self.shapes[self.shapes.ISO2 == iso2]
@@ -76,18 +96,73 @@ class ShapeHelper:
         return polygon
 
 
+# A segment of a compiled template: either a literal or a generator called on each rendering
+Segment = Union[str, Callable[[], str]]
+
+# Sub-patterns of the product types, e.g. [1..6] or [X|Y|Z]
+PRODUCT_TYPE_SUBPATTERN = re.compile(r"\[([^\]]+)\]")
+
+
+def expand_product_type(rule: str) -> Tuple[str, ...]:
+    """Returns all the product types matching the given rule, e.g.
+    'S[1..2]_RAW__0[S|C]' gives S1_RAW__0S, S1_RAW__0C, S2_RAW__0S and S2_RAW__0C."""
+    parts = PRODUCT_TYPE_SUBPATTERN.split(rule)
+    # Literals and sub-patterns alternate, the latter at odd indexes
+    candidates = []
+    for i, part in enumerate(parts):
+        if i % 2 == 0:
+            candidates.append((part,))
+        elif ".." in part:
+            start, end = map(int, part.split(".."))
+            candidates.append(tuple(str(n) for n in range(start, end + 1)))
+        else:
+            candidates.append(tuple(part.split("|")))
+    return tuple("".join(product_type) for product_type in product(*candidates))
+
+
+@lru_cache(maxsize=None)
+def product_type_table(sat: Optional[str], level: Optional[str]) -> Tuple[Tuple[str, ...], ...]:
+    """
+    Returns the product types of the given satellite and level, if any, expanded
+    rule by rule. Picking a rule, then one of its product types, gives each rule
+    and each sub-pattern value the same chance, as the rules are written.
+    """
+    rules = [
+        rule
+        for sat_, levels in PRODUCT_TYPES.items()
+        if sat is None or sat_ == sat
+        for level_, rules_ in levels.items()
+        if level is None or level_ == level
+        for rule in rules_
+    ]
+    return tuple(expand_product_type(rule) for rule in rules)
+
+
+class CompiledTemplate:
+    """
+    A template parsed into literal and generator segments, so that each
+    rendering only calls the generators and joins the segments.
+    """
+
+    def __init__(self, segments: List[Segment]):
+        self.segments = segments
+
+    def render(self) -> str:
+        return "".join(segment if isinstance(segment, str) else segment() for segment in self.segments)
+
+
 class Template:
     @staticmethod
-    def _date(value: str, match: re.Match, pattern: re.Pattern) -> str:
-        """Replaces a date template with an iso formatted date string.
+    def _date(match: re.Match) -> Segment:
+        """Compiles a date template into an iso formatted date string generator.
         Templates are expected to be in the following format:
         {{ NOW [+|-] XY }}
         where Y can be 'd' or 'D' for days, 'm' or 'M' for months and 'y' or 'Y'
         for years and X the amount of those.
         """
         action = match.groupdict()["action"]
-        amount = int(match.groupdict()["amount"])
-        unit = match.groupdict()["unit"]
+        amount = int(match.groupdict()["amount"] or 0)
+        unit = match.groupdict()["unit"] or "d"
 
         if unit in "dD":
             delta = relativedelta(days=amount)
@@ -96,63 +171,56 @@ class Template:
         elif unit in "yY":
             delta = relativedelta(years=amount)
 
-        if action == "+":
-            out = datetime.now() + delta
-        else:
-            out = datetime.now() - delta
+        if action == "-":
+            delta = -delta
 
-        return re.sub(pattern, f"{out.isoformat(timespec='seconds')}Z", value)
+        return lambda: f"{(datetime.now() + delta).isoformat(timespec='seconds')}Z"
 
     @staticmethod
-    def _product_type(value: str, match: re.Match, pattern: re.Pattern) -> str:
-        """Replaces a product type template with a random product type.
+    def _product_type(match: re.Match) -> Segment:
+        """Compiles a product type template into a random product type generator.
         See the docstring for the PRODUCT_TYPES constant.
         """
-        sat = match.groupdict().get("sat")
-        level = match.groupdict().get("level")
-        if sat is not None and level is not None:
-            rules = PRODUCT_TYPES.get(sat, {}).get(level, [])
-        elif sat is not None and level is None:
-            rules = [t for i in PRODUCT_TYPES.get(sat, {}).values() for t in i]
-        elif sat is None and level is not None:
-            rules = []
-            # There must be a more pythonic way, but at list is half-readable...
-            types = [PRODUCT_TYPES[k] for k in PRODUCT_TYPES.keys()]
-            for type_ in types:
-                rules.extend([types_ for level_, types_ in type_.items() if level_ == level])
-
-            rules = [rule for i in rules for rule in i]
-
-        rule = choice(rules)
-        matches = PRODUCT_TYPES_PATTERN.finditer(rule)
-        for match in matches:
-            pattern_ = match.groupdict()["pattern"]
-            if "|" in pattern_:
-                choices = pattern_.split("|")
-                rule = rule.replace(pattern_, choice(choices))
-            elif ".." in pattern_:
-                start, end = map(int, pattern_.split(".."))
-                rule = rule.replace(pattern_, str(randint(start, end)))
-        rule = rule.replace("[", "").replace("]", "")
-        return re.sub(pattern, rule, value)
+        table = product_type_table(match.groupdict().get("sat"), match.groupdict().get("level"))
+        return lambda: choice(choice(table))
 
     @staticmethod
-    def _geo(value: str, match: re.Match, pattern: re.Pattern) -> str:
-        """Replaces a geo template with one of the provided preset.
+    def _geo(match: re.Match) -> Segment:
+        """Compiles a geo template into one of the provided preset.
         It can be:
         - MED: It will return an approximated polygon for the Mediterranean sea.
         - EUR: It will return an approximated polygon for EC.
         - RANDOM: It will return a convex_hull for a random European country.
+        The polygons of the countries are computed here, not on each rendering.
         """
-        shape_helper = ShapeHelper()
         preset = match.groupdict()["preset"]
         if preset == "MED":
-            polygon = shape_helper.MED
+            return ShapeHelper.MED
         elif preset == "EUR":
-            polygon = shape_helper.EUR
-        else:
-            polygon = shape_helper.get_random_country()
-        return re.sub(pattern, polygon, value)
+            return ShapeHelper.EUR
+        polygons = ShapeHelper.get_country_polygons()
+        return lambda: choice(polygons)
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def compile(value: str) -> CompiledTemplate:
+        """Parses the value once into a CompiledTemplate, cached for the next calls.
+        Refer to the PATTERNS constant for the available templates."""
+        matches = sorted(
+            (match.start(), match.end(), method_name, match)
+            for method_name, pattern in PATTERNS.items()
+            for match in pattern.finditer(value)
+        )
+        segments: List[Segment] = []
+        position = 0
+        for start, end, method_name, match in matches:
+            if start > position:
+                segments.append(value[position:start])
+            segments.append(getattr(Template, f"_{method_name}")(match))
+            position = end
+        if position < len(value):
+            segments.append(value[position:])
+        return CompiledTemplate(segments)
 
     @staticmethod
     def replace(value: str) -> str:
@@ -164,13 +232,7 @@ class Template:
 
         Refer to the PATTERNS constant for the available options.
         """
-        for method_name, pattern in PATTERNS.items():
-            match = pattern.search(value)
-            if match is not None:
-                method = getattr(Template, f"_{method_name}")
-                return method(value, match, pattern)
-
-        return value
+        return Template.compile(value).render()
 
 
 class UrlHelper:
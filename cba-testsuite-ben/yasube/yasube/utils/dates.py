@@ -0,0 +1,27 @@
+import re
+from datetime import datetime, timezone
+from typing import Optional
+
+# Fractions of a second, padded or truncated to microseconds as expected by fromisoformat
+FRACTION = re.compile(r"\.(\d+)")
+
+
+def parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    """
+    Parses an OData date, e.g. 2024-01-01T00:00:00.000Z, as an aware datetime.
+    Returns None if the value is missing or not a date.
+    """
+    if not isinstance(value, str):
+        return None
+    value = FRACTION.sub(lambda m: "." + m.group(1)[:6].ljust(6, "0"), value.replace("Z", "+00:00"), count=1)
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+
+def format_datetime(value: datetime) -> str:
+    """Formats the date as an OData date literal, in UTC with milliseconds."""
+    value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return f"{value.isoformat(timespec='milliseconds')}Z"
@@ -1,4 +1,12 @@
 import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+PAYLOAD_ATTRIBUTE = "_yasube_payload"
 
 
 class ExtendedJSONEncoder(json.JSONEncoder):
@@ -11,3 +19,32 @@ class ExtendedJSONEncoder(json.JSONEncoder):
     def dump(self):
         # Only callable from direct children
         return json.dumps(self, cls=self.__class__.__base__)
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Decodes the given JSON document, with orjson if installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(data: Any) -> bytes:
+    """Encodes the given object as a compact JSON document, with orjson if installed."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":")).encode()
+
+
+def response_json(response) -> Any:
+    """
+    Returns the decoded JSON payload of the given response.
+    The payload is decoded once and cached on the response itself, so that
+    every task sharing the response reuses it.
+    The payload must not be modified by the callers.
+    """
+    try:
+        return getattr(response, PAYLOAD_ATTRIBUTE)
+    except AttributeError:
+        payload = loads(response.content)
+        setattr(response, PAYLOAD_ATTRIBUTE, payload)
+        return payload
@@ -0,0 +1,43 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+from requests import Response
+
+CONTENT_RANGE_RE = re.compile(r"bytes\s+\d+-\d+/(\d+)")
+
+
+def split_range(size: int, count: int) -> List[Tuple[int, int]]:
+    """
+    Splits `size` bytes into at most `count` contiguous byte ranges of about
+    the same length. Bounds are inclusive, as in the Range header: an empty
+    resource has no range.
+    """
+    if size <= 0:
+        return []
+    count = max(1, min(count, size))
+    length, remainder = divmod(size, count)
+    ranges = []
+    start = 0
+    for i in range(count):
+        end = start + length + (1 if i < remainder else 0)
+        ranges.append((start, end - 1))
+        start = end
+    return ranges
+
+
+def range_header(start: int, end: int) -> Dict[str, str]:
+    return {"Range": f"bytes={start}-{end}"}
+
+
+def content_range_size(response: Response) -> Optional[int]:
+    """
+    Returns the complete length of the resource from the Content-Range header
+    of a partial response. Returns None if the response is not partial or the
+    length is unknown, i.e. the server does not serve the requested range.
+    """
+    if response.status_code != 206:
+        return None
+    match = CONTENT_RANGE_RE.match(response.headers.get("Content-Range", ""))
+    if match is None:
+        return None
+    return int(match.group(1))
@@ -1,9 +1,11 @@
+from typing import TYPE_CHECKING
 from urllib.parse import urlparse
 
-from requests import Response
+if TYPE_CHECKING:
+    from requests import Response
 
 
-def urlfilename(response: Response) -> str:
+def urlfilename(response: "Response") -> str:
     """
     Extracts the file name from the given response.
     It is expected to have a content-disposition header with